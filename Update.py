@@ -6,9 +6,18 @@ import os
 from actions.clear_downloads import clear_downloads_action, clear_downloads_contents
 from actions.add_repository import add_repository_action
 from actions.add_github_token import add_github_token_action
-from actions.process_downloads import process_downloads_action
+from actions.process_downloads import ask_overwrite, process_downloads, report_extraction_failures
+from actions.pipeline import download_and_process
 from actions.download import start_download
-from actions.config import DOWNLOADS_DIR_NAME, get_project_root, load_config
+from actions.background_task import BackgroundTask
+from actions.progress_window import ProgressWindow
+from actions import metrics
+from actions.release_cache import clear_release_cache_action
+from actions.asset_store import clear_asset_store_action
+from actions.cleanup import purge_workspace_tombstones
+from actions.sd_sync import ask_sync_target, report_sync_result, sync_output_to_target
+from actions.profiles import build_profiles, load_profiles
+from actions.config import ConfigError, DOWNLOADS_DIR_NAME, get_project_root, load_config
 
 class App(tk.Tk):
     def __init__(self, files_to_download, github_token=None):
@@ -16,6 +25,8 @@ class App(tk.Tk):
 
         self.files_to_download = files_to_download
         self.github_token = github_token
+        # The download or processing run in progress, if any.
+        self.task = None
 
         self.title("GitHub Release Downloader")
         self.geometry("600x400")
@@ -28,7 +39,7 @@ class App(tk.Tk):
                 # Keep running if this platform does not support .ico window icons.
                 pass
 
-        # Repo names can repeat across config entries, so repo-only keys can overwrite checkbox state.
+        # Checkbox state keyed by RepoEntry.key; load_config rejects duplicate entries, so keys are unique.
         self.check_vars = {}
         self.displayed_items = []
         self.create_widgets()
@@ -43,31 +54,40 @@ class App(tk.Tk):
 
         self.check_vars = {}
         self.displayed_items = []
-        for index, file in enumerate(self.files_to_download):
-            item_id = index
+        for entry in self.files_to_download:
+            item_id = entry.key
             var = tk.BooleanVar(value=True)
             self.check_vars[item_id] = var
-            self.displayed_items.append((item_id, file))
+            self.displayed_items.append((item_id, entry))
 
-            pattern_text = f" ({file['pattern']})" if file.get("pattern") else " (Download All)"
+            pattern_text = f" ({entry.pattern})" if entry.pattern else " (Download All)"
             check = ttk.Checkbutton(
                 frame,
-                text=f"{file['repo']}{pattern_text}",
+                text=f"{entry.release_key}{pattern_text}",
                 variable=var
             )
             check.pack(anchor=tk.W, pady=2)
 
-        download_button = ttk.Button(
+        self.download_button = ttk.Button(
             frame, text="Download Selected", command=self.download_selected
         )
-        download_button.pack(pady=10)
+        self.download_button.pack(pady=(10, 0))
+
+        self.download_and_process_button = ttk.Button(
+            frame, text="Download && Process Selected", command=self.download_and_process_selected
+        )
+        self.download_and_process_button.pack(pady=10)
 
     def create_menu(self):
         menu_bar = tk.Menu(self)
 
         file_menu = tk.Menu(menu_bar, tearoff=0)
-        file_menu.add_command(label="Clear Downloads", command=clear_downloads_action)
-        file_menu.add_command(label="Process Downloads", command=process_downloads_action)
+        file_menu.add_command(label="Clear Downloads", command=lambda: self._when_idle(clear_downloads_action))
+        file_menu.add_command(label="Process Downloads", command=self.process_downloads)
+        file_menu.add_command(label="Build Profiles", command=self.build_profiles)
+        file_menu.add_command(label="Clear Release Cache", command=lambda: self._when_idle(clear_release_cache_action))
+        file_menu.add_command(label="Clear Asset Store", command=lambda: self._when_idle(clear_asset_store_action))
+        file_menu.add_command(label="Sync Output to SD Card...", command=self.sync_output)
         file_menu.add_separator()
         file_menu.add_command(label="Exit", command=self.quit)
 
@@ -87,8 +107,8 @@ class App(tk.Tk):
     def _confirm_existing_downloads_behavior(self):
         prompt_message = (
             "Files already exist in Downloads.\n\n"
-            "Yes = Download anyways (overwrite/merge into existing files).\n"
-            "No = Clear downloads before downloading.\n"
+            "Yes = Update (download only new or changed files).\n"
+            "No = Clear downloads before downloading (assets in the asset store are linked back, not re-downloaded).\n"
             "Cancel = Stop and keep current files."
         )
         selection = messagebox.askyesnocancel("Downloads Already Exist", prompt_message)
@@ -98,24 +118,174 @@ class App(tk.Tk):
             clear_downloads_contents(show_message=False)
         return True
 
-    def download_selected(self):
+    def _selected_files(self):
         selected_files = [
             file for item_id, file in self.displayed_items if self.check_vars.get(item_id) and self.check_vars[item_id].get()
         ]
         if not selected_files:
             messagebox.showwarning("No Selection", "No files selected for download.")
-            return
+            return None
 
         if self._downloads_has_content() and not self._confirm_existing_downloads_behavior():
+            return None
+        return selected_files
+
+    def _report_download_results(self, results):
+        failed = [result for result in results if result["status"] == "error"]
+        failed_assets = [
+            f"{result['repo']}: {asset['name']}"
+            for result in results
+            for asset in result["assets"]
+            if asset["status"] == "failed"
+        ]
+        if failed or failed_assets:
+            details = [f"{result['repo']}: {result['error']}" for result in failed if not result["assets"]]
+            details.extend(failed_assets)
+            messagebox.showwarning(
+                "Download Finished With Errors",
+                "Some downloads failed:\n\n" + "\n".join(details),
+            )
+        else:
+            skipped = sum(
+                1 for result in results for asset in result["assets"] if asset["status"] == "skipped"
+            )
+            message = "Selected files have been downloaded."
+            if skipped:
+                message += f"\n\n{skipped} file(s) were already up to date and were skipped."
+            messagebox.showinfo("Download Complete", message)
+
+    def _is_busy(self):
+        if self.task is not None and not self.task.done:
+            messagebox.showwarning("Busy", "Wait for the current run to finish, or cancel it.")
+            return True
+        return False
+
+    def _when_idle(self, action):
+        if not self._is_busy():
+            action()
+
+    def _ask_overwrite(self, dest_path):
+        # Called from the worker thread; the dialog itself must run on the Tk main thread.
+        return self.task.call_in_main_thread(ask_overwrite, dest_path)
+
+    def _start_task(self, title, on_done, target, *args, **kwargs):
+        """Run target on a worker thread behind a progress window, then call on_done(task) on the main thread."""
+        self.task = BackgroundTask(target, *args, **kwargs)
+        for button in (self.download_button, self.download_and_process_button):
+            button.config(state=tk.DISABLED)
+
+        def finished(task):
+            metrics.finish_run()
+            for button in (self.download_button, self.download_and_process_button):
+                button.config(state=tk.NORMAL)
+            if task.error is not None:
+                messagebox.showerror(title, f"The run stopped with an error:\n\n{task.error}")
+            elif task.cancelled:
+                messagebox.showinfo(title, "Cancelled. Partial files and extraction folders were removed.")
+            else:
+                on_done(task.result)
+
+        ProgressWindow(self, self.task, title, finished)
+        metrics.start_run(title)
+        self.task.start()
+
+    def download_selected(self):
+        if self._is_busy():
+            return
+        selected_files = self._selected_files()
+        if not selected_files:
             return
 
-        start_download(selected_files, self.github_token)
-        messagebox.showinfo("Download Complete", "Selected files have been downloaded.")
+        self._start_task(
+            "Download",
+            self._report_download_results,
+            start_download,
+            selected_files,
+            self.github_token,
+            output_dir=os.path.join(get_project_root(), DOWNLOADS_DIR_NAME),
+        )
+
+    def download_and_process_selected(self):
+        if self._is_busy():
+            return
+        selected_files = self._selected_files()
+        if not selected_files:
+            return
+
+        def on_done(result):
+            results, extraction_results = result
+            report_extraction_failures(extraction_results)
+            self._report_download_results(results)
+
+        self._start_task(
+            "Download & Process",
+            on_done,
+            download_and_process,
+            selected_files,
+            self.github_token,
+            on_conflict=self._ask_overwrite,
+        )
+
+    def process_downloads(self):
+        if self._is_busy():
+            return
+
+        def on_done(result):
+            if result is None:
+                messagebox.showinfo("Process Downloads", "No downloads to process.")
+            else:
+                report_extraction_failures(result["extraction_results"])
+
+        self._start_task("Process Downloads", on_done, process_downloads, on_conflict=self._ask_overwrite)
+
+    def build_profiles(self):
+        if self._is_busy():
+            return
+        try:
+            profiles = load_profiles()
+        except ValueError as error:
+            messagebox.showerror("Build Profiles", str(error))
+            return
+        if not profiles:
+            messagebox.showinfo("Build Profiles", "No profiles are defined in profiles.ini.")
+            return
+
+        def on_done(result):
+            lines = [
+                f"{name}: {build['status']} ({build['output_dir']})" for name, build in result["builds"].items()
+            ]
+            report_extraction_failures(
+                [r for build in result["builds"].values() for r in build.get("extraction_results", [])]
+            )
+            messagebox.showinfo("Build Profiles", "Profile builds finished:\n\n" + "\n".join(lines))
+
+        # Builds run in separate processes, which cannot show overwrite dialogs.
+        self._start_task("Build Profiles", on_done, build_profiles, profiles, self.github_token)
+
+    def sync_output(self):
+        if self._is_busy():
+            return
+        request = ask_sync_target()
+        if request is None:
+            return
+        output_dir, target_dir, delete_stale = request
+        self._start_task(
+            "Sync to SD Card",
+            report_sync_result,
+            sync_output_to_target,
+            output_dir,
+            target_dir,
+            delete_stale=delete_stale,
+        )
 
 def main():
     # Load repositories and patterns from config file
     config_file = "config.txt"
-    files_to_download = load_config(config_file)
+    try:
+        files_to_download = load_config(config_file)
+    except ConfigError as error:
+        print(f"Invalid config file:\n{error}")
+        exit(1)
 
     if not files_to_download:
         print("No valid entries found in config file. Exiting.")
@@ -125,6 +295,9 @@ def main():
     github_token = os.getenv("GITHUB_TOKEN")
     github_token = None if github_token == "None" else github_token
 
+    # Finish deleting anything a previous session was still clearing when it closed
+    purge_workspace_tombstones()
+
     global app
     app = App(files_to_download, github_token)
     app.mainloop()
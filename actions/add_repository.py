@@ -1,7 +1,9 @@
+import os
 import tkinter as tk
 import tkinter.messagebox as messagebox
 
-from actions.config import get_config_path
+from actions.config import ConfigError, get_config_path, load_config
+from actions.repo_entry import RepoEntry
 
 def add_repository_action():
     add_window = tk.Toplevel()
@@ -19,12 +21,30 @@ def add_repository_action():
     def save_repository():
         repo = repo_entry.get().strip()
         pattern = pattern_entry.get().strip() or None
-        if repo:
-            with open(get_config_path("config.txt"), "a") as config_file:
-                config_file.write(f"{repo}:{pattern}\\n" if pattern else f"{repo}\\n")
-            messagebox.showinfo("Add Repository", "Repository added successfully.")
-            add_window.destroy()
-        else:
+        if not repo:
             messagebox.showwarning("Add Repository", "Repository cannot be empty.")
+            return
+        line = f"{repo}:{pattern}" if pattern else repo
+        try:
+            entry = RepoEntry.parse(line)
+            existing = load_config("config.txt")
+        except ConfigError as error:
+            messagebox.showwarning("Add Repository", str(error))
+            return
+        if entry in existing:
+            messagebox.showwarning("Add Repository", f"'{line}' is already in config.txt.")
+            return
+
+        config_path = get_config_path("config.txt")
+        # Start a new line if the file does not end with one.
+        needs_newline = False
+        if os.path.exists(config_path) and os.path.getsize(config_path):
+            with open(config_path, "rb") as config_file:
+                config_file.seek(-1, os.SEEK_END)
+                needs_newline = config_file.read(1) not in (b"\n", b"\r")
+        with open(config_path, "a") as config_file:
+            config_file.write(("\n" if needs_newline else "") + line + "\n")
+        messagebox.showinfo("Add Repository", "Repository added successfully.")
+        add_window.destroy()
 
     tk.Button(add_window, text="Add", command=save_repository).grid(row=2, column=0, columnspan=2, pady=10)
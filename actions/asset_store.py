@@ -0,0 +1,310 @@
+import json
+import os
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+
+from actions.cleanup import discard
+from actions.config import get_project_root
+from actions.release_cache import CACHE_DIR_NAME
+
+STORE_DIR_NAME = "store"
+STORE_INDEX_FILE_NAME = "index.json"
+STORE_LOCK_FILE_NAME = "index.lock"
+BLOBS_DIR_NAME = "blobs"
+# Least recently used blobs are removed once the store grows beyond this many bytes.
+STORE_MAX_BYTES = 4 * 1024 * 1024 * 1024
+# Blobs the index does not know are only removed once they are this old, since another
+# run may have stored them and not saved its index yet.
+ORPHAN_BLOB_GRACE_SECONDS = 24 * 60 * 60
+# Linux ioctl that clones a file's extents (a reflink) on btrfs, XFS and similar filesystems.
+_FICLONE = 0x40049409
+
+
+def get_store_dir():
+    """Return the absolute path to the asset store."""
+    return os.path.join(get_project_root(), CACHE_DIR_NAME, STORE_DIR_NAME)
+
+
+def _asset_key(repo, tag, asset_name):
+    return f"{repo}@{tag}/{asset_name}"
+
+
+def _reflink(src, dest):
+    """Clone src to dest without copying data; return False where the filesystem cannot."""
+    try:
+        import fcntl
+    except ImportError:
+        return False
+    try:
+        with open(src, "rb") as src_file, open(dest, "wb") as dest_file:
+            fcntl.ioctl(dest_file.fileno(), _FICLONE, src_file.fileno())
+        return True
+    except OSError:
+        if os.path.exists(dest):
+            os.remove(dest)
+        return False
+
+
+@contextmanager
+def _locked_file(path):
+    """Hold an exclusive lock on path, so processes sharing the store take turns with its index."""
+    with open(path, "a+b") as lock_file:
+        if os.name == "nt":
+            import msvcrt
+
+            lock_file.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    # LK_LOCK gives up after 10 seconds; keep waiting.
+                    continue
+            try:
+                yield
+            finally:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+def link_or_copy(src, dest):
+    """
+    Place the contents of src at dest as cheaply as the filesystem allows.
+
+    Tries a reflink (an independent copy-on-write clone), then a hard link, then a plain copy.
+    dest is replaced atomically, so readers never see a partial file.
+
+    :return: "reflink", "hardlink" or "copy".
+    """
+    temp_path = f"{dest}.{threading.get_ident()}.tmp"
+    if os.path.exists(temp_path):
+        os.remove(temp_path)
+    if _reflink(src, temp_path):
+        method = "reflink"
+    else:
+        try:
+            os.link(src, temp_path)
+            method = "hardlink"
+        except OSError:
+            shutil.copyfile(src, temp_path)
+            method = "copy"
+    os.replace(temp_path, dest)
+    return method
+
+
+class AssetStore:
+    """
+    Content-addressed store of downloaded release assets, shared by every run and workspace.
+
+    Blobs are named by their SHA-256 under blobs/<first two hex digits>/. The
+    index maps "<repo>@<tag>/<asset name>" to the blob holding that asset and
+    records when each blob was last used, so a size cap can drop the least
+    recently used ones. Downloads/ receives links to the blobs, so clearing it
+    never means downloading the same bytes again.
+
+    Several runs may use the store at once (the GUI, cli.py, profile builds).
+    The index is saved under a file lock and merged with what the others saved
+    in the meantime, so no run drops another's entries.
+    """
+
+    def __init__(self, store_dir=None, max_bytes=STORE_MAX_BYTES):
+        self.store_dir = store_dir or get_store_dir()
+        self.path = os.path.join(self.store_dir, STORE_INDEX_FILE_NAME)
+        self.max_bytes = max_bytes
+        self._index = None
+        self._dirty = False
+        self._lock = threading.Lock()
+        # Changes made since the index was last read, replayed onto the saved index when merging.
+        self._changed_assets = {}
+        self._changed_blobs = {}
+        self._removed_blobs = set()
+
+    def _read_index(self):
+        index = {"assets": {}, "blobs": {}}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "r") as index_file:
+                    data = json.load(index_file)
+                if isinstance(data, dict):
+                    index["assets"] = data.get("assets", {})
+                    index["blobs"] = data.get("blobs", {})
+            except (OSError, ValueError) as error:
+                print(f"Ignoring unreadable asset store index '{self.path}': {error}")
+        return index
+
+    def _load(self):
+        if self._index is None:
+            self._index = self._read_index()
+        return self._index
+
+    @contextmanager
+    def _locked_index(self):
+        """Hold the store's file lock with the index re-read from disk and this run's changes applied."""
+        os.makedirs(self.store_dir, exist_ok=True)
+        with _locked_file(os.path.join(self.store_dir, STORE_LOCK_FILE_NAME)):
+            index = self._read_index()
+            for sha256 in self._removed_blobs:
+                index["blobs"].pop(sha256, None)
+            for sha256, blob in self._changed_blobs.items():
+                saved = index["blobs"].get(sha256)
+                if saved is None or saved.get("last_used", 0) <= blob.get("last_used", 0):
+                    index["blobs"][sha256] = blob
+            index["assets"].update(self._changed_assets)
+            if self._removed_blobs:
+                index["assets"] = {
+                    key: entry for key, entry in index["assets"].items() if entry["sha256"] not in self._removed_blobs
+                }
+            self._index = index
+            yield index
+
+    def _write_index(self):
+        """Write the index; call with the file lock held (see _locked_index)."""
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w") as index_file:
+            json.dump(self._index, index_file)
+        os.replace(temp_path, self.path)
+        self._changed_assets.clear()
+        self._changed_blobs.clear()
+        self._removed_blobs.clear()
+        self._dirty = False
+
+    def blob_path(self, sha256):
+        return os.path.join(self.store_dir, BLOBS_DIR_NAME, sha256[:2], sha256)
+
+    def lookup(self, repo, tag, asset):
+        """
+        Return the SHA-256 of the stored copy of a release asset, or None if it is not stored.
+
+        The stored copy must match the asset's id, size and update time.
+        """
+        with self._lock:
+            index = self._load()
+            entry = index["assets"].get(_asset_key(repo, tag, asset["name"]))
+            if (
+                entry is None
+                or entry.get("asset_id") != asset.get("id")
+                or entry.get("size") != asset.get("size")
+                or entry.get("updated_at") != asset.get("updated_at")
+            ):
+                return None
+            sha256 = entry["sha256"]
+            try:
+                if os.path.getsize(self.blob_path(sha256)) != entry["size"]:
+                    return None
+            except OSError:
+                return None
+            blob = index["blobs"].setdefault(sha256, {"size": entry["size"]})
+            blob["last_used"] = time.time()
+            self._changed_blobs[sha256] = blob
+            self._dirty = True
+            return sha256
+
+    def link_to(self, sha256, dest_path):
+        """Place a stored blob at dest_path and return how it was placed (see link_or_copy)."""
+        return link_or_copy(self.blob_path(sha256), dest_path)
+
+    def add(self, repo, tag, asset, file_path, sha256):
+        """Store a verified download and remember which release asset it is."""
+        blob_path = self.blob_path(sha256)
+        size = os.path.getsize(file_path)
+        if not os.path.exists(blob_path):
+            os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+            link_or_copy(file_path, blob_path)
+        with self._lock:
+            index = self._load()
+            key = _asset_key(repo, tag, asset["name"])
+            index["assets"][key] = self._changed_assets[key] = {
+                "sha256": sha256,
+                "asset_id": asset.get("id"),
+                "size": size,
+                "updated_at": asset.get("updated_at"),
+            }
+            index["blobs"][sha256] = self._changed_blobs[sha256] = {"size": size, "last_used": time.time()}
+            self._removed_blobs.discard(sha256)
+            self._dirty = True
+
+    def collect_garbage(self, max_bytes=None):
+        """
+        Remove least recently used blobs until the store fits in max_bytes, plus old blobs the index does not know.
+
+        Runs under the store's file lock against the latest saved index, and saves the result.
+
+        :return: Number of bytes freed.
+        """
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        freed = 0
+        blobs_dir = os.path.join(self.store_dir, BLOBS_DIR_NAME)
+        if not os.path.isdir(blobs_dir):
+            return freed
+        with self._lock, self._locked_index() as index:
+            blobs = index["blobs"]
+            orphan_cutoff = time.time() - ORPHAN_BLOB_GRACE_SECONDS
+            for fan_out in os.scandir(blobs_dir):
+                if not fan_out.is_dir():
+                    continue
+                for blob in os.scandir(fan_out.path):
+                    # ".tmp" files are blobs another run is still writing.
+                    if blob.name in blobs or blob.name.endswith(".tmp"):
+                        continue
+                    stat = blob.stat()
+                    if stat.st_mtime < orphan_cutoff:
+                        freed += stat.st_size
+                        os.remove(blob.path)
+
+            total = sum(blob["size"] for blob in blobs.values())
+            for sha256 in sorted(blobs, key=lambda digest: blobs[digest].get("last_used", 0)):
+                if total <= max_bytes:
+                    break
+                try:
+                    os.remove(self.blob_path(sha256))
+                except FileNotFoundError:
+                    pass
+                total -= blobs[sha256]["size"]
+                freed += blobs.pop(sha256)["size"]
+                self._changed_blobs.pop(sha256, None)
+                self._removed_blobs.add(sha256)
+                self._dirty = True
+            index["assets"] = {key: entry for key, entry in index["assets"].items() if entry["sha256"] in blobs}
+            if self._dirty:
+                self._write_index()
+        return freed
+
+    def clear(self):
+        """Remove every stored blob and the index; the blobs are deleted in the background."""
+        with self._lock:
+            discard(self.store_dir)
+            self._index = {"assets": {}, "blobs": {}}
+            self._changed_assets.clear()
+            self._changed_blobs.clear()
+            self._removed_blobs.clear()
+            self._dirty = False
+
+    def save(self):
+        """Merge this run's changes into the saved index and write it, if anything changed."""
+        with self._lock:
+            if not self._dirty or self._index is None:
+                return
+            with self._locked_index():
+                self._write_index()
+
+
+def clear_asset_store():
+    """Remove every stored release asset."""
+    AssetStore().clear()
+
+
+def clear_asset_store_action():
+    import tkinter.messagebox as messagebox
+
+    clear_asset_store()
+    messagebox.showinfo("Clear Asset Store", "All stored release assets have been removed.")
@@ -0,0 +1,71 @@
+import queue
+import threading
+
+from actions.progress import ProgressTracker, TaskCancelled
+
+
+class BackgroundTask:
+    """
+    Runs one long operation on a worker thread so the Tk main loop stays responsive.
+
+    The worker receives the task's ProgressTracker and cancel event. Anything
+    that must run on the main thread (such as a dialog) goes through
+    call_in_main_thread, which the GUI services from its after() polling.
+    """
+
+    def __init__(self, target, *args, **kwargs):
+        self.progress = ProgressTracker()
+        self.cancel_event = threading.Event()
+        self.result = None
+        self.error = None
+        self.cancelled = False
+        self._target = target
+        self._args = args
+        self._kwargs = kwargs
+        self._main_thread_calls = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="background-task", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _run(self):
+        try:
+            self.result = self._target(
+                *self._args, progress=self.progress, cancel_event=self.cancel_event, **self._kwargs
+            )
+        except TaskCancelled:
+            self.cancelled = True
+        except Exception as error:
+            print(f"Background task failed: {error}")
+            self.error = error
+        if self.cancel_event.is_set():
+            self.cancelled = True
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    @property
+    def done(self):
+        return not self._thread.is_alive()
+
+    def call_in_main_thread(self, func, *args):
+        """Run func(*args) on the main thread and wait for its return value (call from the worker)."""
+        reply = queue.Queue(maxsize=1)
+        self._main_thread_calls.put((func, args, reply))
+        value, error = reply.get()
+        if error is not None:
+            raise error
+        return value
+
+    def run_main_thread_calls(self):
+        """Run the calls the worker is waiting on (call from the main thread)."""
+        while True:
+            try:
+                func, args, reply = self._main_thread_calls.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                reply.put((func(*args), None))
+            except Exception as error:
+                reply.put((None, error))
@@ -0,0 +1,83 @@
+import fnmatch
+import re
+
+# Release assets that carry SHA-256 checksums for other assets of the same release.
+# "<asset>.sha256" style files cover one asset; the others are lists covering several.
+SINGLE_CHECKSUM_SUFFIXES = (".sha256", ".sha256sum", ".sha256.txt")
+CHECKSUM_LIST_PATTERNS = ("sha256sums*", "*checksums*", "*_sha256.txt", "*-sha256.txt")
+# Checksum files larger than this are not fetched.
+MAX_CHECKSUM_FILE_SIZE = 1024 * 1024
+
+_SHA256_RE = re.compile(r"^[0-9a-fA-F]{64}$")
+# "SHA256 (file.zip) = <hex>", as written by BSD sha256 and openssl.
+_BSD_LINE_RE = re.compile(r"^SHA2?-?256\s*\((?P<name>.+)\)\s*=\s*(?P<digest>[0-9a-fA-F]{64})$", re.IGNORECASE)
+
+
+def checksum_target(name):
+    """Return the asset name a single-asset checksum file covers, or None if it is not one."""
+    lower_name = name.lower()
+    for suffix in SINGLE_CHECKSUM_SUFFIXES:
+        if lower_name.endswith(suffix) and len(name) > len(suffix):
+            return name[: -len(suffix)]
+    return None
+
+
+def is_checksum_asset(name):
+    lower_name = name.lower()
+    return checksum_target(name) is not None or any(
+        fnmatch.fnmatch(lower_name, pattern) for pattern in CHECKSUM_LIST_PATTERNS
+    )
+
+
+def select_checksum_assets(assets, asset_names):
+    """
+    Return the checksum assets of a release that can cover any of asset_names.
+
+    :param assets: Every asset of the release.
+    :param asset_names: Names of the assets about to be downloaded.
+    """
+    wanted = set(asset_names)
+    selected = []
+    for asset in assets:
+        name = asset["name"]
+        if name in wanted or (asset.get("size") or 0) > MAX_CHECKSUM_FILE_SIZE:
+            continue
+        target = checksum_target(name)
+        if target is not None:
+            if target in wanted:
+                selected.append(asset)
+        elif is_checksum_asset(name):
+            selected.append(asset)
+    return selected
+
+
+def parse_checksums(text, checksum_name=None):
+    """
+    Parse sha256sum, BSD-style or bare-digest checksum text.
+
+    :param text: Contents of the checksum file.
+    :param checksum_name: Name of the checksum file; a bare digest in "<asset>.sha256" is assigned to <asset>.
+    :return: Dict mapping file names to lowercase SHA-256 hex digests.
+    """
+    checksums = {}
+    target = checksum_target(checksum_name) if checksum_name else None
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        bsd_match = _BSD_LINE_RE.match(line)
+        if bsd_match:
+            name, digest = bsd_match.group("name"), bsd_match.group("digest")
+        else:
+            digest, _, name = line.partition(" ")
+            # sha256sum marks binary mode with "*" in front of the name.
+            name = name.strip().lstrip("*")
+            if not _SHA256_RE.match(digest):
+                continue
+            if not name:
+                if target is None:
+                    continue
+                name = target
+        # Lists sometimes include a path; assets are matched by file name.
+        checksums[name.replace("\\", "/").rsplit("/", 1)[-1]] = digest.lower()
+    return checksums
@@ -0,0 +1,267 @@
+import os
+import stat
+import threading
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from actions.config import get_project_root
+from actions.release_cache import CACHE_DIR_NAME
+
+# Folders being deleted are first renamed to ".deleting-<name>-<id>", normally next to where they were.
+TOMBSTONE_PREFIX = ".deleting-"
+# Deleting is bound by filesystem metadata calls, so more threads than cores still help.
+DELETE_WORKERS = min(16, (os.cpu_count() or 1) * 2)
+# Partial downloads are kept so they can be resumed; ones untouched for this long are removed.
+STALE_PARTIAL_SECONDS = 7 * 24 * 60 * 60
+PARTIAL_SUFFIXES = (".part", ".part.json")
+
+_background_deletes = []
+_background_lock = threading.Lock()
+
+
+def is_tombstone(name):
+    return name.startswith(TOMBSTONE_PREFIX)
+
+
+def _remove_file(path):
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+    except PermissionError:
+        # Read-only files (common in extracted archives on Windows) cannot be unlinked until made writable.
+        os.chmod(path, stat.S_IWRITE)
+        os.unlink(path)
+
+
+def _is_link(entry):
+    """True for symlinks and Windows junctions, whose targets must never be deleted."""
+    if entry.is_symlink():
+        return True
+    if hasattr(entry, "is_junction"):
+        return entry.is_junction()
+    if os.name != "nt":
+        return False
+    # Before Python 3.12 a junction looks like an ordinary folder; its reparse-point attribute gives it away.
+    return bool(entry.stat(follow_symlinks=False).st_file_attributes & stat.FILE_ATTRIBUTE_REPARSE_POINT)
+
+
+def is_link(path):
+    """True if path is a symlink or a Windows junction."""
+    if os.path.islink(path):
+        return True
+    if hasattr(os.path, "isjunction"):
+        return os.path.isjunction(path)
+    if os.name != "nt" or not os.path.lexists(path):
+        return False
+    return bool(os.lstat(path).st_file_attributes & stat.FILE_ATTRIBUTE_REPARSE_POINT)
+
+
+def _remove_link(path):
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+    except OSError:
+        # A directory link that unlink refuses is removed like an empty folder, leaving its target alone.
+        os.rmdir(path)
+
+
+def _clear_folder(path):
+    """Remove the files and links directly inside a folder and return its subfolders."""
+    subfolders = []
+    with os.scandir(path) as entries:
+        for entry in entries:
+            if _is_link(entry):
+                _remove_link(entry.path)
+            elif entry.is_dir(follow_symlinks=False):
+                subfolders.append(entry.path)
+            else:
+                _remove_file(entry.path)
+    return subfolders
+
+
+def delete_tree(path, max_workers=DELETE_WORKERS):
+    """
+    Delete a folder and everything in it, clearing its subfolders in parallel.
+
+    Every folder is scanned once with os.scandir; its files are removed by the
+    worker that scanned it and its subfolders are handed to the other workers.
+    The emptied folders are then removed deepest first.
+
+    :param path: Folder (or file) to delete; a missing path is ignored.
+    :param max_workers: Number of deleting threads.
+    :return: List of "path: error" strings for anything that could not be removed.
+    """
+    if not os.path.lexists(path):
+        return []
+    if is_link(path):
+        try:
+            _remove_link(path)
+        except OSError as error:
+            return [f"{path}: {error}"]
+        return []
+    if not os.path.isdir(path):
+        try:
+            _remove_file(path)
+        except OSError as error:
+            return [f"{path}: {error}"]
+        return []
+
+    errors = []
+    # Folders in discovery order: every folder comes after its parent.
+    folders = [path]
+    with ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="delete") as executor:
+        pending = {executor.submit(_clear_folder, path): path}
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                folder = pending.pop(future)
+                try:
+                    subfolders = future.result()
+                except OSError as error:
+                    errors.append(f"{folder}: {error}")
+                    continue
+                folders.extend(subfolders)
+                for subfolder in subfolders:
+                    pending[executor.submit(_clear_folder, subfolder)] = subfolder
+
+    for folder in reversed(folders):
+        try:
+            os.rmdir(folder)
+        except FileNotFoundError:
+            pass
+        except OSError as error:
+            errors.append(f"{folder}: {error}")
+    return errors
+
+
+def move_to_tombstone(path, tombstone_dir=None):
+    """
+    Rename path to a tombstone, so it disappears at once and can be deleted later.
+
+    :param tombstone_dir: Folder on the same filesystem that receives the tombstone (default: path's parent).
+    :return: Path of the tombstone, or None if path does not exist.
+    :raises OSError: If path cannot be renamed (e.g. a file in it is open on Windows).
+    """
+    if not os.path.lexists(path):
+        return None
+    path = os.path.normpath(os.path.abspath(path))
+    parent, name = os.path.split(path)
+    tombstone = os.path.join(tombstone_dir or parent, f"{TOMBSTONE_PREFIX}{name}-{uuid.uuid4().hex[:8]}")
+    os.rename(path, tombstone)
+    return tombstone
+
+
+def _delete_quietly(path, max_workers):
+    errors = delete_tree(path, max_workers)
+    if errors:
+        print(f"Could not delete everything in '{path}'; it will be retried on the next start:\n  " + "\n  ".join(errors))
+
+
+def _start_background_delete(path, max_workers):
+    thread = threading.Thread(target=_delete_quietly, args=(path, max_workers), name="cleanup", daemon=True)
+    with _background_lock:
+        _background_deletes[:] = [running for running in _background_deletes if running.is_alive()]
+        _background_deletes.append(thread)
+    thread.start()
+    return thread
+
+
+def discard(path, background=True, max_workers=DELETE_WORKERS, tombstone_dir=None):
+    """
+    Remove a file or folder, returning as soon as it is out of the way.
+
+    The path is renamed to a tombstone and, with background set, deleted by a
+    background thread. If it cannot be renamed it is deleted in place instead.
+    Tombstones left behind by an interrupted delete are removed by purge_tombstones.
+
+    :param path: File or folder to remove; a missing path is ignored.
+    :param background: Delete the tombstone on a background thread instead of before returning.
+    :param max_workers: Number of deleting threads.
+    :param tombstone_dir: Where the tombstone is placed (see move_to_tombstone).
+    :return: True if path existed.
+    """
+    try:
+        tombstone = move_to_tombstone(path, tombstone_dir)
+    except OSError as error:
+        print(f"Could not move '{path}' aside ({error}); deleting it in place.")
+        _delete_quietly(path, max_workers)
+        return True
+    if tombstone is None:
+        return False
+    if background:
+        _start_background_delete(tombstone, max_workers)
+    else:
+        _delete_quietly(tombstone, max_workers)
+    return True
+
+
+def wait_for_cleanup(timeout=None):
+    """
+    Wait for background deletes started by discard to finish.
+
+    :param timeout: Seconds to wait in total, or None to wait until they finish.
+    :return: True if every background delete has finished.
+    """
+    deadline = None if timeout is None else time.monotonic() + timeout
+    with _background_lock:
+        threads = list(_background_deletes)
+    for thread in threads:
+        thread.join(None if deadline is None else max(0.0, deadline - time.monotonic()))
+    return not any(thread.is_alive() for thread in threads)
+
+
+def purge_tombstones(folders, background=True, max_workers=DELETE_WORKERS):
+    """
+    Delete tombstones left in folders by a delete that was interrupted (e.g. the app was closed).
+
+    :param folders: Folders to look in; missing folders are skipped.
+    :return: Number of tombstones found.
+    """
+    tombstones = []
+    for folder in folders:
+        if not os.path.isdir(folder):
+            continue
+        with os.scandir(folder) as entries:
+            tombstones.extend(entry.path for entry in entries if is_tombstone(entry.name))
+    for tombstone in tombstones:
+        if background:
+            _start_background_delete(tombstone, max_workers)
+        else:
+            _delete_quietly(tombstone, max_workers)
+    return len(tombstones)
+
+
+def remove_stale_partials(folder, max_age=STALE_PARTIAL_SECONDS):
+    """
+    Remove partial downloads in folder that have not been written to for max_age seconds.
+
+    :return: Paths of the removed files.
+    """
+    if not os.path.isdir(folder):
+        return []
+    cutoff = time.time() - max_age
+    removed = []
+    with os.scandir(folder) as entries:
+        for entry in entries:
+            if not entry.name.endswith(PARTIAL_SUFFIXES) or not entry.is_file(follow_symlinks=False):
+                continue
+            try:
+                if entry.stat(follow_symlinks=False).st_mtime < cutoff:
+                    os.remove(entry.path)
+                    removed.append(entry.path)
+            except FileNotFoundError:
+                pass
+    return removed
+
+
+def purge_workspace_tombstones(extra_folders=(), background=True):
+    """
+    Delete tombstones left in the project root, .cache and extra_folders (e.g. profile build folders).
+
+    :return: Number of tombstones found.
+    """
+    root = get_project_root()
+    return purge_tombstones([root, os.path.join(root, CACHE_DIR_NAME), *extra_folders], background)
@@ -1,21 +1,36 @@
 import os
-import shutil
-import tkinter.messagebox as messagebox
 
+from actions.cleanup import delete_tree, discard, is_link
 from actions.config import DOWNLOADS_DIR_NAME
+from actions.download_manifest import get_manifest_path
 
 
 def clear_downloads_contents(show_message=True):
-    """Clear all files and folders in the Downloads directory."""
+    """
+    Clear all files and folders in the Downloads directory.
+
+    Downloads is renamed out of the way and recreated empty at once; the old
+    contents are deleted in the background (see actions.cleanup.discard).
+
+    :param show_message: Report the result in a dialog.
+    :return: True if Downloads existed and was cleared.
+    """
+    if show_message:
+        import tkinter.messagebox as messagebox
+
     base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "../"))
     downloads_dir = os.path.join(base_dir, DOWNLOADS_DIR_NAME)
     if os.path.exists(downloads_dir):
-        for entry in os.listdir(downloads_dir):
-            entry_path = os.path.join(downloads_dir, entry)
-            if os.path.isfile(entry_path):
-                os.remove(entry_path)
-            elif os.path.isdir(entry_path):
-                shutil.rmtree(entry_path)
+        if is_link(downloads_dir):
+            # Keep a linked Downloads folder in place and clear what it points to.
+            for entry in os.listdir(downloads_dir):
+                delete_tree(os.path.join(downloads_dir, entry))
+        else:
+            discard(downloads_dir)
+            os.makedirs(downloads_dir, exist_ok=True)
+        manifest_path = get_manifest_path(downloads_dir)
+        if os.path.exists(manifest_path):
+            os.remove(manifest_path)
         if show_message:
             messagebox.showinfo("Clear Downloads", "All contents in Downloads have been fully cleared.")
         return True
@@ -1,6 +1,15 @@
 import os
 
+from actions.repo_entry import ConfigError, RepoEntry
+
 DOWNLOADS_DIR_NAME = "Downloads"
+# Override the GitHub endpoints, e.g. for GitHub Enterprise or a local test server.
+GITHUB_API_URL_ENV = "GITHUB_API_URL"
+GITHUB_GRAPHQL_URL_ENV = "GITHUB_GRAPHQL_URL"
+DEFAULT_GITHUB_API_URL = "https://api.github.com"
+
+# Parsed config files keyed by path, with the (mtime, size) they were parsed at.
+_config_cache = {}
 
 
 def get_project_root():
@@ -8,6 +17,16 @@ def get_project_root():
     return os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 
 
+def get_github_api_url():
+    """Return the GitHub REST API base URL (GITHUB_API_URL, or api.github.com)."""
+    return (os.getenv(GITHUB_API_URL_ENV) or DEFAULT_GITHUB_API_URL).rstrip("/")
+
+
+def get_github_graphql_url():
+    """Return the GitHub GraphQL endpoint (GITHUB_GRAPHQL_URL, or /graphql below the API base URL)."""
+    return os.getenv(GITHUB_GRAPHQL_URL_ENV) or f"{get_github_api_url()}/graphql"
+
+
 def get_config_path(config_file="config.txt"):
     """Return an absolute path to the configuration file."""
     if os.path.isabs(config_file):
@@ -18,28 +37,60 @@ def load_config(config_file="config.txt"):
     """
     Load repositories and patterns from a configuration file.
 
+    The parsed entries are cached until the file's modification time or size changes.
+
     :param config_file: Path to the configuration file.
-    :return: List of repositories and patterns.
+    :return: List of RepoEntry objects.
+    :raises ConfigError: If any entry is malformed or duplicated.
     """
-    files_to_download = []
     config_path = get_config_path(config_file)
-    
-    if not os.path.exists(config_path):
+
+    try:
+        stat = os.stat(config_path)
+    except OSError:
         print(f"Config file '{config_path}' not found. Exiting.")
-        return files_to_download
+        return []
+
+    signature = (stat.st_mtime_ns, stat.st_size)
+    cached = _config_cache.get(config_path)
+    if cached is None or cached[0] != signature:
+        with open(config_path, "r") as f:
+            cached = (signature, parse_config_lines(f, config_path))
+        _config_cache[config_path] = cached
+
+    return list(cached[1])
 
-    with open(config_path, "r") as f:
-        for line in f:
-            line = line.strip()
-            if not line or line.startswith("#"):
-                continue
+def parse_config_lines(lines, source="config"):
+    """
+    Parse and validate config.txt-style lines ("owner/repo[@tag][+pre][:patterns]").
+
+    :param lines: Iterable of lines; blank lines and # comments are ignored.
+    :param source: Name used in error messages.
+    :return: List of RepoEntry objects.
+    :raises ConfigError: Listing every malformed or duplicated line.
+    """
+    entries = []
+    seen = {}
+    errors = []
+    for line_number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
 
-            parts = line.split(":", 1)
-            repo = parts[0].strip()
-            pattern = parts[1].strip() if len(parts) > 1 else None
-            files_to_download.append({"repo": repo, "pattern": pattern})
+        try:
+            entry = RepoEntry.parse(line)
+        except ConfigError as error:
+            errors.append(f"{source}, line {line_number}: {error}")
+            continue
+        if entry.key in seen:
+            errors.append(f"{source}, line {line_number}: '{line}' duplicates line {seen[entry.key]}.")
+            continue
+        seen[entry.key] = line_number
+        entries.append(entry)
 
-    return files_to_download
+    if errors:
+        raise ConfigError("\n".join(errors))
+    return entries
 
 def get_env_path():
     """
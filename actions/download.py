@@ -1,85 +1,939 @@
 import requests
 import os
-import fnmatch
-from tqdm import tqdm
+import hashlib
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from urllib.parse import quote, urlparse
 
-from actions.config import DOWNLOADS_DIR_NAME
+from actions import metrics
+from actions.asset_store import AssetStore
+from actions.checksums import parse_checksums, select_checksum_assets
+from actions.cleanup import remove_stale_partials
+from actions.config import DOWNLOADS_DIR_NAME, get_github_api_url
+from actions.download_manifest import DownloadManifest
+from actions.graphql_releases import fetch_latest_releases
+from actions.http_session import DEFAULT_CHUNK_SIZE, HttpTransport
+from actions.progress import TaskCancelled, raise_if_cancelled
+from actions.release_cache import ReleaseCache, trim_release_data
+from actions.repo_entry import merge_entries
 
-def download_github_release(repo, pattern, output_dir=DOWNLOADS_DIR_NAME, token=None):
+# Caps shared by every lookup and asset transfer in a single start_download run.
+MAX_CONNECTIONS = 8
+MAX_CONNECTIONS_PER_HOST = 4
+# Assets at least this large are split across parallel Range requests when segmented downloads are enabled.
+SEGMENTED_DOWNLOAD_MIN_SIZE = 32 * 1024 * 1024
+# Releases requested when an entry follows pre-releases; the newest non-draft one is used.
+RELEASE_LIST_PAGE_SIZE = 10
+# Transfers of one asset per run; a file that fails verification or arrives incomplete is fetched again.
+MAX_TRANSFER_ATTEMPTS = 3
+
+
+class ConnectionLimiter:
+    """Limit how many connections are open in total and to any single host."""
+
+    def __init__(self, max_connections=MAX_CONNECTIONS, max_connections_per_host=MAX_CONNECTIONS_PER_HOST):
+        self._total = threading.BoundedSemaphore(max(1, max_connections))
+        self._max_per_host = max(1, max_connections_per_host)
+        self._per_host = {}
+        self._lock = threading.Lock()
+
+    def _host_semaphore(self, url):
+        host = urlparse(url).netloc.lower()
+        with self._lock:
+            semaphore = self._per_host.get(host)
+            if semaphore is None:
+                semaphore = threading.BoundedSemaphore(self._max_per_host)
+                self._per_host[host] = semaphore
+            return semaphore
+
+    @contextmanager
+    def connection(self, url):
+        # Take the host slot first so a busy host never holds global slots while it waits.
+        with self._host_semaphore(url):
+            with self._total:
+                yield
+
+
+def _asset_result(asset_name, file_path):
+    return {"name": asset_name, "path": file_path, "status": "pending", "bytes": 0, "attempts": 0, "error": None}
+
+
+class DownloadVerificationError(Exception):
+    """Raised when a downloaded file does not match the published asset."""
+
+
+class IncompleteDownloadError(requests.RequestException):
+    """Raised when a response ends before all of its bytes arrived; the partial file can be resumed."""
+
+
+class _AssetClaims:
+    """Track which release owns each file in the download folder during one run."""
+
+    def __init__(self):
+        self._owners = {}
+        self._lock = threading.Lock()
+
+    def claim(self, file_path, release_key):
+        """Claim file_path for release_key and return the release that owns it."""
+        with self._lock:
+            return self._owners.setdefault(os.path.normcase(os.path.abspath(file_path)), release_key)
+
+
+class _TransferSettings:
+    """Options shared by every asset transfer of one release download."""
+
+    def __init__(
+        self,
+        transport,
+        headers,
+        limiter,
+        timeout,
+        manifest=None,
+        segments=1,
+        on_asset_ready=None,
+        repo=None,
+        progress=None,
+        cancel_event=None,
+        checksums=None,
+        store=None,
+    ):
+        self.transport = transport
+        self.headers = headers
+        self.limiter = limiter
+        self.timeout = timeout
+        self.manifest = manifest
+        self.segments = max(1, segments)
+        self.on_asset_ready = on_asset_ready
+        self.repo = repo
+        self.progress = progress
+        self.cancel_event = cancel_event
+        # SHA-256 digests listed by the release's checksum assets, keyed by asset name.
+        self.checksums = checksums or {}
+        self.store = store
+
+    def start_asset(self, asset_name, total, initial):
+        if self.progress is not None:
+            self.progress.start_asset(self.repo, asset_name, total, initial)
+
+    def report(self, asset_name, byte_count):
+        """Record transferred bytes, stopping the transfer if the run was cancelled."""
+        if self.progress is not None:
+            self.progress.advance(self.repo, asset_name, byte_count)
+        raise_if_cancelled(self.cancel_event)
+
+    def set_asset_status(self, asset_name, status):
+        if self.progress is not None:
+            self.progress.set_asset_status(self.repo, asset_name, status)
+
+
+def _part_state_path(temp_file_path):
+    return f"{temp_file_path}.json"
+
+
+def _asset_identity(asset):
+    return {"asset_id": asset.get("id"), "size": asset.get("size"), "updated_at": asset.get("updated_at")}
+
+
+def _load_part_state(temp_file_path, asset):
+    """
+    Return the saved state of a partial download of asset, or None.
+
+    Partial files left by a different asset version are discarded.
+    """
+    state_path = _part_state_path(temp_file_path)
+    state = None
+    if os.path.exists(temp_file_path) and os.path.exists(state_path):
+        try:
+            with open(state_path, "r") as state_file:
+                state = json.load(state_file)
+        except (OSError, ValueError):
+            state = None
+    if state is not None and state.get("asset") == _asset_identity(asset):
+        return state
+
+    _remove_partial(temp_file_path)
+    return None
+
+
+def _save_part_state(temp_file_path, asset, segments=None):
+    state = {"asset": _asset_identity(asset), "segments": segments}
+    with open(_part_state_path(temp_file_path), "w") as state_file:
+        json.dump(state, state_file)
+
+
+def _remove_partial(temp_file_path):
+    for path in (temp_file_path, _part_state_path(temp_file_path)):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def _hash_file(path, digest=None, limit=None):
+    digest = digest or hashlib.sha256()
+    remaining = limit
+    with open(path, "rb") as file:
+        while remaining is None or remaining > 0:
+            chunk = file.read(1024 * 1024 if remaining is None else min(1024 * 1024, remaining))
+            if not chunk:
+                break
+            digest.update(chunk)
+            if remaining is not None:
+                remaining -= len(chunk)
+    return digest
+
+
+def _stream_download(url, temp_file_path, asset, settings, result):
+    """
+    Download url into temp_file_path, resuming from an existing partial file when the server allows it.
+
+    :return: SHA-256 hex digest of the complete file.
+    """
+    expected_size = asset.get("size") or 0
+    offset = os.path.getsize(temp_file_path) if os.path.exists(temp_file_path) else 0
+    if expected_size and offset > expected_size:
+        offset = 0
+
+    digest = hashlib.sha256()
+    if offset:
+        _hash_file(temp_file_path, digest, limit=offset)
+        if offset == expected_size:
+            return digest.hexdigest()
+
+    request_headers = dict(settings.headers)
+    if offset:
+        request_headers["Range"] = f"bytes={offset}-"
+    _save_part_state(temp_file_path, asset)
+
+    with settings.limiter.connection(url):
+        with settings.transport.get(
+            url, headers=request_headers, stream=True, timeout=settings.timeout
+        ) as file_response:
+            if offset and file_response.status_code == 416:
+                # The partial file already reaches the end of the asset, or goes past it.
+                if file_response.headers.get("Content-Range", "").rpartition("/")[2] == str(offset):
+                    return digest.hexdigest()
+                _remove_partial(temp_file_path)
+                raise IncompleteDownloadError(f"the server cannot resume at {offset} bytes; starting over")
+            file_response.raise_for_status()
+            if offset and file_response.status_code == 206:
+                content_range = file_response.headers.get("Content-Range", "")
+                if not content_range.startswith(f"bytes {offset}-"):
+                    raise DownloadVerificationError(f"resume returned the wrong range ({content_range or 'none'})")
+                print(f"Resuming {asset['name']} at {offset} bytes.")
+                mode = "ab"
+            else:
+                # The server ignored the range, so start over.
+                offset = 0
+                digest = hashlib.sha256()
+                mode = "wb"
+            # Content-Length only counts the bytes iter_content yields when the body is not re-encoded.
+            content_length = None
+            if "content-length" in file_response.headers and not file_response.headers.get("content-encoding"):
+                content_length = int(file_response.headers["content-length"])
+            total_size = offset + (content_length or 0)
+            if content_length is not None and expected_size and total_size != expected_size:
+                raise DownloadVerificationError(f"server is sending {total_size} bytes, expected {expected_size}")
+            settings.start_asset(asset["name"], total_size, offset)
+            received = 0
+            from tqdm import tqdm
+
+            with open(temp_file_path, mode) as file:
+                with tqdm(total=total_size, initial=offset, unit="B", unit_scale=True, desc=asset["name"]) as pbar:
+                    for chunk in file_response.iter_content(chunk_size=settings.transport.chunk_size):
+                        if not chunk:
+                            continue
+                        file.write(chunk)
+                        digest.update(chunk)
+                        received += len(chunk)
+                        result["bytes"] += len(chunk)
+                        pbar.update(len(chunk))
+                        settings.report(asset["name"], len(chunk))
+            if content_length is not None and received != content_length:
+                raise IncompleteDownloadError(f"Connection closed after {received} of {content_length} bytes")
+    return digest.hexdigest()
+
+
+def _split_segments(size, count):
+    segment_size = -(-size // count)
+    return [[start, min(start + segment_size, size) - 1, start] for start in range(0, size, segment_size)]
+
+
+def _download_segment(url, temp_file_path, segment, settings, result, pbar, lock, first_response=None):
+    start, end, position = segment
+    if position > end:
+        return
+    request_headers = dict(settings.headers)
+    request_headers["Range"] = f"bytes={position}-{end}"
+    with settings.limiter.connection(url):
+        response = first_response or settings.transport.get(
+            url, headers=request_headers, stream=True, timeout=settings.timeout
+        )
+        with response:
+            if response.status_code != 206:
+                response.raise_for_status()
+                raise requests.RequestException(f"Server ignored range request for bytes {position}-{end}")
+            with open(temp_file_path, "r+b") as file:
+                file.seek(position)
+                for chunk in response.iter_content(chunk_size=settings.transport.chunk_size):
+                    if not chunk:
+                        continue
+                    chunk = chunk[: end + 1 - segment[2]]
+                    file.write(chunk)
+                    with lock:
+                        segment[2] += len(chunk)
+                        result["bytes"] += len(chunk)
+                        pbar.update(len(chunk))
+                    settings.report(result["name"], len(chunk))
+                    if segment[2] > end:
+                        break
+    if segment[2] <= end:
+        raise IncompleteDownloadError(f"Connection closed early for bytes {segment[2]}-{end}")
+
+
+def _segmented_download(url, temp_file_path, asset, settings, result, state):
+    """
+    Download a large asset over several parallel Range requests into a preallocated file.
+
+    :return: SHA-256 hex digest of the complete file, or None if the server does not support ranges.
+    """
+    size = asset["size"]
+    segments = (state or {}).get("segments") or _split_segments(size, settings.segments)
+
+    first_response = None
+    if not state or not state.get("segments"):
+        # The first segment doubles as the range-support probe.
+        first_segment = segments[0]
+        with settings.limiter.connection(url):
+            first_response = settings.transport.get(
+                url,
+                headers=dict(settings.headers, Range=f"bytes={first_segment[0]}-{first_segment[1]}"),
+                stream=True,
+                timeout=settings.timeout,
+            )
+        if first_response.status_code != 206:
+            first_response.close()
+            return None
+        with open(temp_file_path, "wb") as file:
+            file.truncate(size)
+
+    _save_part_state(temp_file_path, asset, segments)
+    lock = threading.Lock()
+    done = sum(segment[2] - segment[0] for segment in segments)
+    settings.start_asset(asset["name"], size, done)
+    from tqdm import tqdm
+
+    try:
+        with tqdm(total=size, initial=done, unit="B", unit_scale=True, desc=asset["name"]) as pbar:
+            with ThreadPoolExecutor(max_workers=len(segments), thread_name_prefix="segment") as executor:
+                futures = [
+                    executor.submit(
+                        _download_segment,
+                        url,
+                        temp_file_path,
+                        segment,
+                        settings,
+                        result,
+                        pbar,
+                        lock,
+                        first_response if index == 0 else None,
+                    )
+                    for index, segment in enumerate(segments)
+                ]
+                for future in futures:
+                    future.result()
+    finally:
+        # Record per-segment progress so an interrupted transfer resumes where each segment stopped.
+        _save_part_state(temp_file_path, asset, segments)
+    return _hash_file(temp_file_path).hexdigest()
+
+
+def _verify_download(temp_file_path, asset, sha256, listed_sha256=None):
+    """
+    Check a finished download against the published size and digest, and the release's checksum files.
+
+    :param listed_sha256: SHA-256 listed for the asset by a checksum asset of the release (optional).
+    :raises DownloadVerificationError: If any of them does not match.
     """
-    Downloads all release assets matching a pattern from a GitHub repository.
+    expected_size = asset.get("size")
+    actual_size = os.path.getsize(temp_file_path)
+    if expected_size and actual_size != expected_size:
+        raise DownloadVerificationError(f"expected {expected_size} bytes, got {actual_size}")
+    published_digest = asset.get("digest") or ""
+    if published_digest.startswith("sha256:") and published_digest[len("sha256:"):].lower() != sha256:
+        raise DownloadVerificationError("SHA-256 does not match the published digest")
+    if listed_sha256 and listed_sha256 != sha256:
+        raise DownloadVerificationError("SHA-256 does not match the release's checksum file")
+
 
-    :param repo: GitHub repository in the format "owner/repo".
-    :param pattern: Wildcard pattern to match the desired files, or None to download all files.
+def _transfer_verified(download_url, temp_file_path, asset, settings, result):
+    """
+    Download an asset into temp_file_path and verify it, fetching it again when it is incomplete or corrupt.
+
+    :return: SHA-256 hex digest of the verified file.
+    :raises DownloadVerificationError: If the last attempt still did not match.
+    :raises requests.RequestException: If the last attempt could not be completed.
+    """
+    asset_name = asset["name"]
+    for attempt in range(1, MAX_TRANSFER_ATTEMPTS + 1):
+        raise_if_cancelled(settings.cancel_event)
+        result["attempts"] = attempt
+        try:
+            state = _load_part_state(temp_file_path, asset)
+            sha256 = None
+            if settings.segments > 1 and (asset.get("size") or 0) >= SEGMENTED_DOWNLOAD_MIN_SIZE:
+                sha256 = _segmented_download(download_url, temp_file_path, asset, settings, result, state)
+            elif state is not None and state.get("segments"):
+                # A segmented partial cannot be resumed as a single stream.
+                _remove_partial(temp_file_path)
+            if sha256 is None:
+                sha256 = _stream_download(download_url, temp_file_path, asset, settings, result)
+            _verify_download(temp_file_path, asset, sha256, settings.checksums.get(asset_name))
+            return sha256
+        except DownloadVerificationError as error:
+            # Nothing of a bad file can be trusted, so the next attempt starts from zero.
+            _remove_partial(temp_file_path)
+            if attempt == MAX_TRANSFER_ATTEMPTS:
+                raise
+            print(f"Rejected {asset_name} ({error}); downloading it again.")
+        except (IncompleteDownloadError, requests.ConnectionError, requests.exceptions.ChunkedEncodingError) as error:
+            # The partial file stays, so the next attempt resumes it.
+            if attempt == MAX_TRANSFER_ATTEMPTS:
+                raise
+            print(f"Transfer of {asset_name} was interrupted ({error}); resuming.")
+
+
+def _notify_asset_ready(settings, repo, result):
+    if settings.on_asset_ready is None:
+        return
+    try:
+        settings.on_asset_ready(repo, result)
+    except Exception as error:
+        print(f"Failed to hand off {result['name']} from {repo}: {error}")
+
+
+def _restore_from_store(store, sha256, file_path):
+    try:
+        store.link_to(sha256, file_path)
+        return True
+    except OSError as error:
+        print(f"Could not use the stored copy of {os.path.basename(file_path)}: {error}")
+        return False
+
+
+def _add_to_store(store, repo, tag, asset, file_path, sha256):
+    # The download already succeeded, so a store failure only costs a future re-download.
+    try:
+        store.add(repo, tag, asset, file_path, sha256)
+    except OSError as error:
+        print(f"Could not add {asset['name']} to the asset store: {error}")
+
+
+def _download_asset(repo, tag, asset, output_dir, settings):
+    asset_name = asset["name"]
+    download_url = asset["browser_download_url"]
+    file_path = os.path.join(output_dir, asset_name)
+    temp_file_path = f"{file_path}.part"
+    result = _asset_result(asset_name, file_path)
+    manifest = settings.manifest
+
+    if manifest is not None and manifest.is_current(repo, tag, asset, file_path):
+        print(f"Skipping {asset_name} from {repo}: already up to date.")
+        result["status"] = "skipped"
+        settings.set_asset_status(asset_name, "skipped")
+        metrics.record_asset(repo, asset_name, status="skipped", bytes=0, seconds=0.0)
+        _notify_asset_ready(settings, repo, result)
+        return result
+
+    if settings.store is not None:
+        stored_sha256 = settings.store.lookup(repo, tag, asset)
+        if stored_sha256 is not None and _restore_from_store(settings.store, stored_sha256, file_path):
+            print(f"Linked {asset_name} from {repo} out of the asset store.")
+            result["status"] = "downloaded"
+            result["source"] = "store"
+            settings.set_asset_status(asset_name, "stored")
+            if manifest is not None:
+                manifest.record(repo, tag, asset, file_path, stored_sha256)
+            metrics.record_asset(repo, asset_name, status="stored", bytes=0, seconds=0.0)
+            _notify_asset_ready(settings, repo, result)
+            return result
+
+    print(f"Downloading {asset_name} from {repo}...")
+    started = time.perf_counter()
+    with metrics.stage("asset transfer"):
+        try:
+            sha256 = _transfer_verified(download_url, temp_file_path, asset, settings, result)
+
+            os.replace(temp_file_path, file_path)
+            _remove_partial(temp_file_path)
+            # The stored copy is shared with other builds, so make sure nothing else rewrote the file.
+            if _hash_file(file_path).hexdigest() != sha256:
+                raise DownloadVerificationError(f"{file_path} changed while it was being saved")
+            print(f"Downloaded: {file_path}")
+            result["status"] = "downloaded"
+            if manifest is not None:
+                manifest.record(repo, tag, asset, file_path, sha256)
+            if settings.store is not None:
+                _add_to_store(settings.store, repo, tag, asset, file_path, sha256)
+        except TaskCancelled:
+            print(f"Cancelled download of '{asset_name}' from {repo}.")
+            result["status"] = "cancelled"
+            result["error"] = "Cancelled"
+            _remove_partial(temp_file_path)
+        except requests.RequestException as error:
+            # Keep the partial file so the next attempt can resume it.
+            print(f"Failed to download asset '{asset_name}' from {repo}: {error}")
+            result["status"] = "failed"
+            result["error"] = str(error)
+        except DownloadVerificationError as error:
+            print(f"Discarding asset '{asset_name}' from {repo}: {error}")
+            result["status"] = "failed"
+            result["error"] = str(error)
+            _remove_partial(temp_file_path)
+        except OSError as error:
+            print(f"Failed to save asset '{asset_name}' from {repo}: {error}")
+            result["status"] = "failed"
+            result["error"] = str(error)
+            _remove_partial(temp_file_path)
+    settings.set_asset_status(asset_name, result["status"])
+    elapsed = time.perf_counter() - started
+    metrics.add("asset transfer", result["bytes"], 1 if result["status"] == "downloaded" else 0)
+    metrics.add("download", result["bytes"], 1 if result["status"] == "downloaded" else 0)
+    metrics.record_asset(
+        repo,
+        asset_name,
+        status=result["status"],
+        bytes=result["bytes"],
+        seconds=round(elapsed, 3),
+        bytes_per_second=round(result["bytes"] / elapsed) if elapsed > 0 else None,
+        attempts=result["attempts"],
+    )
+    if result["status"] == "downloaded":
+        _notify_asset_ready(settings, repo, result)
+    return result
+
+
+def _fetch_checksums(checksum_assets, settings):
+    """
+    Download and parse the checksum assets of a release.
+
+    :return: Dict mapping asset names to the SHA-256 digests listed for them.
+    """
+    checksums = {}
+    for checksum_asset in checksum_assets:
+        raise_if_cancelled(settings.cancel_event)
+        url = checksum_asset["browser_download_url"]
+        try:
+            with settings.limiter.connection(url):
+                response = settings.transport.get(url, headers=settings.headers, timeout=settings.timeout)
+            response.raise_for_status()
+        except requests.RequestException as error:
+            print(f"Could not fetch checksum file {checksum_asset['name']}: {error}")
+            continue
+        checksums.update(parse_checksums(response.text, checksum_asset["name"]))
+    return checksums
+
+
+def _release_api_url(entry):
+    """Return the REST URL that resolves the release a RepoEntry follows."""
+    repo_url = f"{get_github_api_url()}/repos/{entry.repo}"
+    if entry.tag is not None:
+        return f"{repo_url}/releases/tags/{quote(entry.tag, safe='')}"
+    if entry.prerelease:
+        # /releases/latest skips pre-releases; the release list is newest first and includes them.
+        return f"{repo_url}/releases?per_page={RELEASE_LIST_PAGE_SIZE}"
+    return f"{repo_url}/releases/latest"
+
+
+def _newest_release(release_list):
+    return next((release for release in release_list if not release.get("draft")), None)
+
+
+def _fetch_release_data(repo, api_url, transport, headers, limiter, timeout, cache):
+    """
+    Return (release_data, error) for a release lookup, revalidating cached metadata when possible.
+
+    :param repo: Release key (see RepoEntry.release_key), used for the cache and messages.
+    """
+    entry = cache.get(repo) if cache else None
+    if cache and cache.is_fresh(entry):
+        print(f"Using cached release information for {repo}.")
+        metrics.record_repo(repo, lookup="cache")
+        return entry["release"], None
+
+    request_headers = dict(headers)
+    request_headers.update(ReleaseCache.conditional_headers(entry))
+    try:
+        with limiter.connection(api_url):
+            response = transport.get(api_url, headers=request_headers, timeout=timeout)
+    except requests.RequestException as error:
+        print(f"Failed to fetch releases for {repo}: {error}")
+        return None, str(error)
+
+    if response.status_code == 304 and entry is not None:
+        print(f"Release information for {repo} is unchanged.")
+        metrics.record_repo(repo, lookup="revalidated")
+        cache.touch(repo)
+        return entry["release"], None
+
+    if response.status_code != 200:
+        print(f"Failed to fetch releases for {repo}: {response.status_code} {response.text}")
+        return None, f"HTTP {response.status_code}"
+
+    try:
+        release_data = response.json()
+    except ValueError:
+        print(f"Failed to fetch releases for {repo}: the response is not JSON.")
+        return None, "invalid JSON"
+    if isinstance(release_data, list):
+        release_data = _newest_release(release_data)
+        if release_data is None:
+            print(f"No releases found for {repo}.")
+            return None, "No releases found"
+    metrics.record_repo(repo, lookup="api")
+    if cache:
+        cache.store(
+            repo,
+            release_data,
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified"),
+        )
+    return trim_release_data(release_data), None
+
+
+def download_github_release(
+    entry,
+    output_dir=DOWNLOADS_DIR_NAME,
+    token=None,
+    limiter=None,
+    executor=None,
+    cache=None,
+    manifest=None,
+    segments=1,
+    transport=None,
+    release_data=None,
+    on_asset_ready=None,
+    progress=None,
+    cancel_event=None,
+    store=None,
+    claims=None,
+):
+    """
+    Downloads all release assets an entry wants from a GitHub repository.
+
+    :param entry: RepoEntry naming the repository, the release to follow and the assets to match.
     :param output_dir: Directory to save the downloaded files.
     :param token: GitHub Personal Access Token (optional for higher rate limits).
+    :param limiter: ConnectionLimiter shared with other downloads (optional).
+    :param executor: Executor used to transfer matching assets in parallel (optional).
+    :param cache: ReleaseCache used to skip or revalidate the release lookup (optional).
+    :param manifest: DownloadManifest used to skip assets that are already up to date (optional).
+    :param segments: Number of parallel Range requests used for large assets (1 disables segmenting).
+    :param transport: HttpTransport shared with other downloads (optional).
+    :param release_data: Already resolved latest-release data, which skips the REST lookup (optional).
+    :param on_asset_ready: Callback(repo, asset_result) run as soon as each asset is on disk (optional).
+    :param progress: ProgressTracker that receives per-asset byte counts (optional).
+    :param cancel_event: threading.Event that stops the download when set; partial files are removed (optional).
+    :param store: AssetStore that assets are linked from when already stored, and added to once downloaded (optional).
+    :param claims: _AssetClaims shared with the other releases of the run; an asset whose file
+                   another release already claimed is not downloaded (optional).
+    :return: Dict describing the repo lookup and the outcome of each matching asset.
     """
-    api_url = f"https://api.github.com/repos/{repo}/releases/latest"
+    limiter = limiter or ConnectionLimiter()
+    if transport is None:
+        with HttpTransport() as transport:
+            return download_github_release(
+                entry,
+                output_dir,
+                token,
+                limiter,
+                executor,
+                cache,
+                manifest,
+                segments,
+                transport,
+                release_data,
+                on_asset_ready,
+                progress,
+                cancel_event,
+                store,
+                claims,
+            )
+    repo = entry.repo
+    release_key = entry.release_key
+    result = {
+        "repo": repo,
+        "release": release_key,
+        "pattern": entry.pattern,
+        "status": "ok",
+        "error": None,
+        "assets": [],
+    }
+    if cancel_event is not None and cancel_event.is_set():
+        result.update(status="cancelled", error="Cancelled")
+        return result
+
+    api_url = _release_api_url(entry)
     headers = {"Authorization": f"token {token}"} if token else {}
 
     api_timeout_seconds = 15
     asset_timeout_seconds = 60
 
-    response = requests.get(api_url, headers=headers, timeout=api_timeout_seconds)
-    if response.status_code != 200:
-        print(f"Failed to fetch releases for {repo}: {response.status_code} {response.text}")
-        return
+    error = None
+    if progress is not None:
+        progress.set_repo_status(repo, "resolving")
+    if release_data is None:
+        started = time.perf_counter()
+        with metrics.stage("release lookup"):
+            release_data, error = _fetch_release_data(
+                release_key, api_url, transport, headers, limiter, api_timeout_seconds, cache
+            )
+        metrics.record_repo(release_key, lookup_seconds=round(time.perf_counter() - started, 3))
+    else:
+        metrics.record_repo(release_key, lookup="graphql")
+    if release_data is None:
+        result.update(status="error", error=error)
+        metrics.record_repo(release_key, status="error", rate_limit_remaining=transport.rate_limit_remaining)
+        if progress is not None:
+            progress.set_repo_status(repo, "error")
+        return result
 
-    release_data = response.json()
     assets = release_data.get("assets", [])
 
     if not assets:
         print(f"No assets found for {repo}.")
-        return
+        result["status"] = "no_assets"
+        metrics.record_repo(release_key, status="no_assets")
+        return result
+
+    matching_assets = [asset for asset in assets if entry.matches(asset["name"])]
+    if not matching_assets:
+        print(f"No files found matching pattern: {entry.pattern} for {release_key}.")
+        result["status"] = "no_match"
+        metrics.record_repo(release_key, status="no_match")
+        return result
+
+    conflicts = []
+    if claims is not None:
+        owned = []
+        for asset in matching_assets:
+            file_path = os.path.join(output_dir, asset["name"])
+            owner = claims.claim(file_path, release_key)
+            if owner == release_key:
+                owned.append(asset)
+                continue
+            print(f"Not downloading {asset['name']} for {release_key}: {owner} already saves a file with that name.")
+            conflict = _asset_result(asset["name"], file_path)
+            conflict.update(status="failed", error=f"Same file name as an asset of {owner}")
+            conflicts.append(conflict)
+        matching_assets = owned
+    if not matching_assets:
+        result.update(status="error", error="No assets were downloaded", assets=conflicts)
+        metrics.record_repo(release_key, status="error")
+        if progress is not None:
+            progress.set_repo_status(repo, "error")
+        return result
 
     os.makedirs(output_dir, exist_ok=True)
 
-    downloaded_any = False
-    for asset in tqdm(assets, desc=f"Downloading assets from {repo}"):
-        asset_name = asset["name"]
-        if not pattern or fnmatch.fnmatch(asset_name, pattern):
-            download_url = asset["browser_download_url"]
-            print(f"Downloading {asset_name} from {repo}...")
-
-            file_path = os.path.join(output_dir, asset_name)
-
-            temp_file_path = f"{file_path}.part"
-
-            try:
-                # Download the file
-                with requests.get(
-                    download_url,
-                    headers=headers,
-                    stream=True,
-                    timeout=asset_timeout_seconds,
-                ) as file_response:
-                    file_response.raise_for_status()
-                    total_size = int(file_response.headers.get("content-length", 0))
-                    with open(temp_file_path, "wb") as file:
-                        with tqdm(total=total_size, unit="B", unit_scale=True, desc=asset_name) as pbar:
-                            for chunk in file_response.iter_content(chunk_size=8192):
-                                if not chunk:
-                                    continue
-                                file.write(chunk)
-                                pbar.update(len(chunk))
-
-                os.replace(temp_file_path, file_path)
-                print(f"Downloaded: {file_path}")
-                downloaded_any = True
-            except requests.RequestException as error:
-                print(f"Failed to download asset '{asset_name}' from {repo}: {error}")
-                if os.path.exists(temp_file_path):
-                    os.remove(temp_file_path)
-            except OSError as error:
-                print(f"Failed to save asset '{asset_name}' from {repo}: {error}")
-                if os.path.exists(temp_file_path):
-                    os.remove(temp_file_path)
-
-    if not downloaded_any:
-        print(f"No files found matching pattern: {pattern} for {repo}.")
-
-def start_download(selected_files, github_token=None):
-    for file in selected_files:
-        repo = file["repo"]
-        pattern = file.get("pattern", None)
-        download_github_release(repo, pattern, token=github_token)
+    tag = release_data.get("tag_name")
+    settings = _TransferSettings(
+        transport,
+        headers,
+        limiter,
+        asset_timeout_seconds,
+        manifest,
+        segments,
+        on_asset_ready,
+        repo,
+        progress,
+        cancel_event,
+        store=store,
+    )
+    # Checksum assets are fetched even when the pattern does not match them, but only
+    # when something is actually going to be downloaded.
+    pending_names = [
+        asset["name"]
+        for asset in matching_assets
+        if (manifest is None or not manifest.is_current(repo, tag, asset, os.path.join(output_dir, asset["name"])))
+        and (store is None or store.lookup(repo, tag, asset) is None)
+    ]
+    checksum_assets = select_checksum_assets(assets, pending_names) if pending_names else []
+    if checksum_assets:
+        try:
+            settings.checksums = _fetch_checksums(checksum_assets, settings)
+        except TaskCancelled:
+            result.update(status="cancelled", error="Cancelled")
+            return result
+
+    if progress is not None:
+        progress.set_repo_status(repo, "downloading")
+        for asset in matching_assets:
+            progress.set_asset_status(repo, asset["name"], "queued")
+    if executor is None:
+        result["assets"] = [_download_asset(repo, tag, asset, output_dir, settings) for asset in matching_assets]
+    else:
+        futures = [
+            executor.submit(_download_asset, repo, tag, asset, output_dir, settings) for asset in matching_assets
+        ]
+        result["assets"] = [future.result() for future in futures]
+    result["assets"].extend(conflicts)
+
+    if any(asset["status"] == "cancelled" for asset in result["assets"]):
+        result.update(status="cancelled", error="Cancelled")
+    elif all(asset["status"] == "failed" for asset in result["assets"]):
+        result.update(status="error", error="No assets were downloaded")
+    metrics.record_repo(release_key, status=result["status"], rate_limit_remaining=transport.rate_limit_remaining)
+    if progress is not None:
+        progress.set_repo_status(repo, "done" if result["status"] == "ok" else result["status"])
+    return result
+
+
+def _download_releases(entries, prefetched, *args, **kwargs):
+    """Download releases one after another, so the first one listed claims any shared file names."""
+    return [
+        download_github_release(entry, *args, release_data=prefetched.get(entry.release_key), **kwargs)
+        for entry in entries
+    ]
+
+
+def _prefetch_releases(selected_files, github_token, transport, cache):
+    """Resolve latest-release lookups that the cache cannot answer with batched GraphQL queries."""
+    repos = []
+    for entry in selected_files:
+        # GraphQL's latestRelease cannot answer pinned tags or pre-releases; those use REST.
+        if entry.tag is not None or entry.prerelease:
+            continue
+        if cache and cache.is_fresh(cache.get(entry.repo)):
+            continue
+        repos.append(entry.repo)
+    if not repos:
+        return {}
+
+    releases = fetch_latest_releases(repos, github_token, transport)
+    if cache:
+        for repo, release_data in releases.items():
+            cache.store(repo, release_data)
+    return releases
+
+
+def start_download(
+    selected_files,
+    github_token=None,
+    output_dir=DOWNLOADS_DIR_NAME,
+    max_connections=MAX_CONNECTIONS,
+    max_connections_per_host=MAX_CONNECTIONS_PER_HOST,
+    use_cache=True,
+    segments=1,
+    chunk_size=DEFAULT_CHUNK_SIZE,
+    use_graphql=True,
+    on_asset_ready=None,
+    progress=None,
+    cancel_event=None,
+    release_cache=None,
+    asset_store=None,
+    use_store=True,
+):
+    """
+    Download the latest release assets of every selected entry concurrently.
+
+    Release lookups and asset transfers run in parallel over one pooled HTTP
+    session, bounded by the total and per-host connection caps. Assets recorded in the download
+    manifest as unchanged are skipped. Entries that follow the same release are merged, so
+    each release is looked up once.
+
+    :param selected_files: RepoEntry objects to download.
+    :param github_token: GitHub Personal Access Token (optional).
+    :param output_dir: Directory to save the downloaded files.
+    :param max_connections: Maximum number of simultaneous connections.
+    :param max_connections_per_host: Maximum number of simultaneous connections to one host.
+    :param use_cache: Reuse and revalidate cached release metadata.
+    :param segments: Number of parallel Range requests used for large assets (1 disables segmenting).
+    :param chunk_size: Bytes read from the network per write while streaming an asset.
+    :param use_graphql: With a token, resolve all release lookups through batched GraphQL queries.
+    :param on_asset_ready: Callback(repo, asset_result) run from the download thread as soon as
+                           each asset is downloaded or found up to date (optional).
+    :param progress: ProgressTracker that receives per-repo and per-asset progress (optional).
+    :param cancel_event: threading.Event that cancels the remaining transfers when set (optional).
+    :param release_cache: ReleaseCache to use instead of the project's .cache (optional).
+    :param asset_store: AssetStore to use instead of the project's .cache/store (optional).
+    :param use_store: Link assets from the asset store instead of downloading them again,
+                      and add new downloads to it.
+    :return: List of per-release result dicts, in the order the releases first appear in selected_files.
+    """
+    if not selected_files:
+        return []
+    selected_files = merge_entries(selected_files)
+    for path in remove_stale_partials(output_dir):
+        print(f"Removed stale partial download: {path}")
+
+    limiter = ConnectionLimiter(max_connections, max_connections_per_host)
+    cache = (release_cache or ReleaseCache()) if use_cache else None
+    manifest = DownloadManifest(output_dir)
+    store = (asset_store or AssetStore()) if use_store else None
+    # Releases of one repository tend to publish the same file names, so they run in config order on one worker.
+    release_groups = {}
+    for entry in selected_files:
+        release_groups.setdefault(entry.repo.lower(), []).append(entry)
+    release_groups = list(release_groups.values())
+    # Separate pools keep repo workers, which wait on their assets, from starving the asset transfers.
+    with metrics.stage("download"), HttpTransport(
+        pool_size=max_connections, chunk_size=chunk_size
+    ) as transport, ThreadPoolExecutor(
+        max_workers=max_connections, thread_name_prefix="asset"
+    ) as asset_executor, ThreadPoolExecutor(
+        max_workers=min(len(release_groups), max_connections), thread_name_prefix="release"
+    ) as release_executor:
+        if progress is not None:
+            progress.set_stage("Downloading")
+            for entry in selected_files:
+                progress.set_repo_status(entry.repo, "waiting")
+        prefetched = {}
+        if github_token and use_graphql:
+            with metrics.stage("graphql prefetch"):
+                prefetched = _prefetch_releases(selected_files, github_token, transport, cache)
+        claims = _AssetClaims()
+        futures = [
+            release_executor.submit(
+                _download_releases,
+                group,
+                prefetched,
+                output_dir,
+                github_token,
+                limiter,
+                asset_executor,
+                cache,
+                manifest,
+                segments,
+                transport,
+                on_asset_ready=on_asset_ready,
+                progress=progress,
+                cancel_event=cancel_event,
+                store=store,
+                claims=claims,
+            )
+            for group in release_groups
+        ]
+        results = {result["release"]: result for future in futures for result in future.result()}
+        results = [results[entry.release_key] for entry in selected_files]
+        metrics.record_http(transport)
+
+    if cache:
+        try:
+            cache.save()
+        except OSError as error:
+            print(f"Failed to save release cache: {error}")
+    try:
+        manifest.save()
+    except OSError as error:
+        print(f"Failed to save download manifest: {error}")
+    if store is not None:
+        try:
+            freed = store.collect_garbage()
+            if freed:
+                print(f"Removed {freed} bytes of least recently used assets from the asset store.")
+            store.save()
+        except OSError as error:
+            print(f"Failed to update the asset store: {error}")
+    return results
@@ -0,0 +1,94 @@
+import json
+import os
+import threading
+
+from actions.config import DOWNLOADS_DIR_NAME
+
+MANIFEST_SUFFIX = ".manifest.json"
+
+
+def get_manifest_path(downloads_dir=DOWNLOADS_DIR_NAME):
+    """Return the path of the manifest stored next to a downloads directory."""
+    return os.path.normpath(os.path.abspath(downloads_dir)) + MANIFEST_SUFFIX
+
+
+class DownloadManifest:
+    """
+    Record of the release assets currently present in a downloads directory.
+
+    Entries are keyed by file name and remember which release asset produced
+    the file, so unchanged assets can be skipped on the next download.
+    """
+
+    def __init__(self, downloads_dir=DOWNLOADS_DIR_NAME, path=None):
+        self.downloads_dir = downloads_dir
+        self.path = path or get_manifest_path(downloads_dir)
+        self._entries = None
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._entries is not None:
+            return self._entries
+        self._entries = {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "r") as manifest_file:
+                    data = json.load(manifest_file)
+                if isinstance(data, dict):
+                    self._entries = data
+            except (OSError, ValueError) as error:
+                print(f"Ignoring unreadable download manifest '{self.path}': {error}")
+        return self._entries
+
+    def get(self, file_name):
+        with self._lock:
+            return self._load().get(file_name)
+
+    def is_current(self, repo, tag, asset, file_path):
+        """Return True if file_path already holds this exact release asset."""
+        entry = self.get(os.path.basename(file_path))
+        if entry is None:
+            return False
+        if (
+            entry.get("repo") != repo
+            or entry.get("tag") != tag
+            or entry.get("asset_id") != asset.get("id")
+            or entry.get("size") != asset.get("size")
+            or entry.get("updated_at") != asset.get("updated_at")
+        ):
+            return False
+        try:
+            return os.path.getsize(file_path) == entry["size"]
+        except OSError:
+            return False
+
+    def record(self, repo, tag, asset, file_path, sha256):
+        """Remember that file_path now holds the given release asset."""
+        entry = {
+            "repo": repo,
+            "tag": tag,
+            "asset_id": asset.get("id"),
+            "size": os.path.getsize(file_path),
+            "updated_at": asset.get("updated_at"),
+            "sha256": sha256,
+        }
+        with self._lock:
+            self._load()[os.path.basename(file_path)] = entry
+            self._dirty = True
+
+    def forget(self, file_name):
+        with self._lock:
+            if self._load().pop(file_name, None) is not None:
+                self._dirty = True
+
+    def save(self):
+        """Write the manifest to disk if it changed."""
+        with self._lock:
+            if not self._dirty or self._entries is None:
+                return
+            temp_path = f"{self.path}.tmp"
+            with open(temp_path, "w") as manifest_file:
+                json.dump(self._entries, manifest_file, indent=2, sort_keys=True)
+            os.replace(temp_path, self.path)
+            self._dirty = False
@@ -0,0 +1,107 @@
+import requests
+
+from actions.config import get_github_graphql_url
+
+# Repositories resolved per GraphQL query; each aliased lookup adds to the query cost.
+GRAPHQL_BATCH_SIZE = 25
+RELEASE_ASSETS_PAGE_SIZE = 100
+
+_REPOSITORY_FIELDS = """
+    latestRelease {
+      tagName
+      releaseAssets(first: %d) {
+        pageInfo { hasNextPage }
+        nodes { databaseId name size updatedAt downloadUrl digest }
+      }
+    }
+""" % RELEASE_ASSETS_PAGE_SIZE
+
+
+def _build_query(repos):
+    """Return a query with one aliased repository lookup per repo, plus its variables."""
+    declarations = []
+    selections = []
+    variables = {}
+    for index, repo in enumerate(repos):
+        owner, name = repo.split("/", 1)
+        variables[f"owner{index}"] = owner
+        variables[f"name{index}"] = name
+        declarations.append(f"$owner{index}: String!, $name{index}: String!")
+        selections.append(f"  r{index}: repository(owner: $owner{index}, name: $name{index}) {{{_REPOSITORY_FIELDS}  }}")
+    query = "query(%s) {\n%s\n}" % (", ".join(declarations), "\n".join(selections))
+    return query, variables
+
+
+def _to_rest_release(repository):
+    """
+    Convert a GraphQL repository node into the shape of the REST releases/latest payload.
+
+    :return: Release dict, or None when the node cannot stand in for the REST response.
+    """
+    release = (repository or {}).get("latestRelease")
+    if not release:
+        return None
+    release_assets = release["releaseAssets"]
+    if release_assets["pageInfo"]["hasNextPage"]:
+        # Let REST handle the rare release with more assets than one page.
+        return None
+    return {
+        "tag_name": release["tagName"],
+        "assets": [
+            {
+                "id": node["databaseId"],
+                "name": node["name"],
+                "size": node["size"],
+                "updated_at": node["updatedAt"],
+                "browser_download_url": node["downloadUrl"],
+                # "sha256:<hex>", checked after download like the REST field of the same name.
+                "digest": node.get("digest"),
+            }
+            for node in release_assets["nodes"]
+        ],
+    }
+
+
+def fetch_latest_releases(repos, token, transport, timeout=30, batch_size=GRAPHQL_BATCH_SIZE):
+    """
+    Resolve the latest release of several repositories with batched GraphQL queries.
+
+    The GraphQL API requires authentication, so this needs a token.
+
+    :param repos: Repositories in the format "owner/repo".
+    :param token: GitHub Personal Access Token.
+    :param transport: HttpTransport used to send the queries.
+    :return: Dict mapping each resolved repo to REST-shaped release data. Repos that
+             could not be resolved are left out so callers can fall back to REST.
+    """
+    releases = {}
+    unique_repos = [repo for repo in dict.fromkeys(repos) if repo.count("/") == 1]
+    headers = {"Authorization": f"bearer {token}"}
+    for start in range(0, len(unique_repos), batch_size):
+        batch = unique_repos[start:start + batch_size]
+        query, variables = _build_query(batch)
+        try:
+            response = transport.post(
+                get_github_graphql_url(), json={"query": query, "variables": variables}, headers=headers, timeout=timeout
+            )
+        except requests.RequestException as error:
+            print(f"GraphQL release lookup failed: {error}")
+            continue
+        if response.status_code != 200:
+            print(f"GraphQL release lookup failed: {response.status_code} {response.text}")
+            continue
+
+        try:
+            payload = response.json()
+        except ValueError:
+            print("GraphQL release lookup failed: the response is not JSON.")
+            continue
+        data = (payload.get("data") if isinstance(payload, dict) else None) or {}
+        resolved = 0
+        for index, repo in enumerate(batch):
+            release = _to_rest_release(data.get(f"r{index}"))
+            if release is not None:
+                releases[repo] = release
+                resolved += 1
+        print(f"Resolved {resolved} of {len(batch)} release lookup(s) with one GraphQL query.")
+    return releases
@@ -0,0 +1,127 @@
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+USER_AGENT = "Switch-Homebrew-Updater"
+# Connections kept alive per host (api.github.com, github.com, the release-asset host, ...).
+DEFAULT_POOL_SIZE = 8
+DEFAULT_CHUNK_SIZE = 256 * 1024
+DEFAULT_RETRIES = 4
+DEFAULT_BACKOFF_SECONDS = 1.0
+# Waits longer than this (e.g. an exhausted hourly rate limit) fail the request instead of stalling the run.
+MAX_RETRY_WAIT_SECONDS = 90
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+def _retry_after_seconds(value):
+    """Parse a Retry-After header given either as seconds or as an HTTP date."""
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class HttpTransport:
+    """
+    Shared HTTP session for all GitHub API lookups and asset downloads.
+
+    Connections are pooled and kept alive across repositories and assets, and
+    requests are retried with exponential backoff. Retry-After and the GitHub
+    rate-limit headers decide how long to wait before a retry.
+    """
+
+    def __init__(
+        self,
+        pool_size=DEFAULT_POOL_SIZE,
+        retries=DEFAULT_RETRIES,
+        backoff_seconds=DEFAULT_BACKOFF_SECONDS,
+        chunk_size=DEFAULT_CHUNK_SIZE,
+        max_retry_wait_seconds=MAX_RETRY_WAIT_SECONDS,
+    ):
+        self.retries = retries
+        self.backoff_seconds = backoff_seconds
+        self.chunk_size = chunk_size
+        self.max_retry_wait_seconds = max_retry_wait_seconds
+        self.retry_count = 0
+        self.rate_limit_remaining = None
+        self._lock = threading.Lock()
+
+        self.session = requests.Session()
+        self.session.headers["User-Agent"] = USER_AGENT
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def _record_rate_limit(self, response):
+        remaining = response.headers.get("X-RateLimit-Remaining")
+        if remaining is not None and remaining.isdigit():
+            with self._lock:
+                self.rate_limit_remaining = int(remaining)
+
+    def _backoff(self, attempt):
+        return self.backoff_seconds * (2 ** attempt) + random.uniform(0, self.backoff_seconds)
+
+    def _retry_delay(self, response, attempt):
+        """Return how long to wait before retrying response, or None if it should not be retried."""
+        headers = response.headers
+        rate_limited = response.status_code in (403, 429) and (
+            headers.get("Retry-After") is not None or headers.get("X-RateLimit-Remaining") == "0"
+        )
+        if response.status_code not in RETRY_STATUS_CODES and not rate_limited:
+            return None
+
+        delay = None
+        if headers.get("Retry-After") is not None:
+            delay = _retry_after_seconds(headers["Retry-After"])
+        elif headers.get("X-RateLimit-Remaining") == "0" and headers.get("X-RateLimit-Reset", "").isdigit():
+            delay = max(0.0, int(headers["X-RateLimit-Reset"]) - time.time()) + 1
+        if delay is None:
+            delay = self._backoff(attempt)
+        return delay if delay <= self.max_retry_wait_seconds else None
+
+    def request(self, method, url, **kwargs):
+        """Send a request through the shared session, retrying transient failures."""
+        attempt = 0
+        while True:
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as error:
+                if attempt >= self.retries:
+                    raise
+                delay = self._backoff(attempt)
+                print(f"Request to {url} failed ({error}), retrying in {delay:.1f}s...")
+            else:
+                self._record_rate_limit(response)
+                delay = self._retry_delay(response, attempt) if attempt < self.retries else None
+                if delay is None:
+                    return response
+                print(f"Request to {url} returned {response.status_code}, retrying in {delay:.1f}s...")
+                response.close()
+
+            with self._lock:
+                self.retry_count += 1
+            time.sleep(delay)
+            attempt += 1
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
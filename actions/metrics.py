@@ -0,0 +1,261 @@
+import cProfile
+import json
+import os
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from actions.config import get_project_root
+from actions.release_cache import CACHE_DIR_NAME
+
+RUN_REPORT_FILE_NAME = "run_report.json"
+PROFILE_DIR_NAME = "profiles"
+# Stages recorded by the pipeline; any of them can be profiled.
+STAGES = (
+    "download",
+    "graphql prefetch",
+    "release lookup",
+    "asset transfer",
+    "copy downloads",
+    "extract archives",
+    "merge archives",
+    "copy persistent",
+    "sync",
+    "build profiles",
+)
+
+# Metrics of the run in progress (see start_run). Recording is a no-op while this is None.
+_run = None
+_run_lock = threading.Lock()
+
+
+def get_run_report_path():
+    return os.path.join(get_project_root(), CACHE_DIR_NAME, RUN_REPORT_FILE_NAME)
+
+
+class RunMetrics:
+    """
+    Timings and counters for one download or processing run.
+
+    Stages are aggregated by name, so a stage entered once per repo (such as
+    "release lookup") reports its call count and total time. Repos, assets and
+    extracted archives get their own entries with wall time, bytes and status.
+    """
+
+    def __init__(self, name, profile_stages=(), profile_dir=None):
+        self.name = name
+        self.profile_stages = set(profile_stages)
+        self.profile_dir = profile_dir or os.path.join(get_project_root(), CACHE_DIR_NAME, PROFILE_DIR_NAME)
+        self.started_at = datetime.now(timezone.utc)
+        self._started = time.perf_counter()
+        self._stages = {}
+        self._repos = {}
+        self._archives = {}
+        self._http = {"retries": 0, "rate_limit_remaining": None}
+        self._profiles = {}
+        # Only one profiler can run at a time: on Python 3.12+ a second one fails to enable,
+        # and before that a nested one replaces the outer one on its thread.
+        self._profiling = False
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def _stage_entry(self, name):
+        return self._stages.setdefault(name, {"calls": 0, "seconds": 0.0, "bytes": 0, "files": 0})
+
+    @contextmanager
+    def stage(self, name):
+        stack = self._local.__dict__.setdefault("stages", [])
+        stack.append(name)
+        profiler = self._start_profiler() if name in self.profile_stages else None
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            if profiler is not None:
+                profiler.disable()
+                with self._lock:
+                    self._profiling = False
+            stack.pop()
+            with self._lock:
+                entry = self._stage_entry(name)
+                entry["calls"] += 1
+                entry["seconds"] += elapsed
+                if profiler is not None:
+                    self._profiles.setdefault(name, []).append(profiler)
+
+    def _start_profiler(self):
+        """
+        Enable a profiler for a stage, unless another stage is already being profiled.
+
+        Stages that overlap a profiled one (nested, or running on another thread) are
+        covered by it where they share its thread, and otherwise not profiled.
+
+        :return: The enabled profiler, or None.
+        """
+        with self._lock:
+            if self._profiling:
+                return None
+            self._profiling = True
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiling tool (e.g. python -m cProfile) is already active.
+            with self._lock:
+                self._profiling = False
+            return None
+        return profiler
+
+    def save_profiles(self):
+        """Write one merged cProfile file per profiled stage and return {stage: path}."""
+        with self._lock:
+            profiles = {name: list(profilers) for name, profilers in self._profiles.items()}
+        paths = {}
+        for name, profilers in profiles.items():
+            os.makedirs(self.profile_dir, exist_ok=True)
+            stats = pstats.Stats(profilers[0])
+            for profiler in profilers[1:]:
+                stats.add(profiler)
+            paths[name] = os.path.join(self.profile_dir, f"{name.replace(' ', '_')}.prof")
+            stats.dump_stats(paths[name])
+        return paths
+
+    def add(self, stage=None, byte_count=0, files=0):
+        """Add to a stage's counters; stage defaults to the innermost stage running on this thread."""
+        if stage is None:
+            stack = self._local.__dict__.get("stages")
+            if not stack:
+                return
+            stage = stack[-1]
+        with self._lock:
+            entry = self._stage_entry(stage)
+            entry["bytes"] += byte_count
+            entry["files"] += files
+
+    def record_repo(self, repo, **values):
+        with self._lock:
+            self._repos.setdefault(repo, {"assets": {}}).update(values)
+
+    def record_asset(self, repo, asset_name, **values):
+        with self._lock:
+            assets = self._repos.setdefault(repo, {"assets": {}})["assets"]
+            assets.setdefault(asset_name, {}).update(values)
+
+    def record_archive(self, archive, **values):
+        with self._lock:
+            self._archives.setdefault(archive, {}).update(values)
+
+    def record_http(self, transport):
+        """Take the retry count and latest rate-limit headroom from an HttpTransport."""
+        with self._lock:
+            self._http["retries"] += transport.retry_count
+            if transport.rate_limit_remaining is not None:
+                self._http["rate_limit_remaining"] = transport.rate_limit_remaining
+
+    def report(self):
+        with self._lock:
+            return {
+                "run": self.name,
+                "started_at": self.started_at.isoformat(timespec="seconds"),
+                "wall_seconds": round(time.perf_counter() - self._started, 3),
+                "stages": {
+                    name: dict(entry, seconds=round(entry["seconds"], 3)) for name, entry in self._stages.items()
+                },
+                "repos": json.loads(json.dumps(self._repos)),
+                "archives": json.loads(json.dumps(self._archives)),
+                "http": dict(self._http),
+            }
+
+    def save(self, path=None):
+        """Write the profiles and the JSON run report, and return the report's path."""
+        path = path or get_run_report_path()
+        report = self.report()
+        report["profiles"] = self.save_profiles()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w") as report_file:
+            json.dump(report, report_file, indent=2)
+        os.replace(temp_path, path)
+        return path
+
+
+def start_run(name, profile_stages=()):
+    """
+    Start collecting metrics for a run; pipeline code records into it until finish_run.
+
+    :param profile_stages: Stage names to run under cProfile. A profile only covers the thread
+                           running the stage; all runs of a stage are merged into
+                           .cache/profiles/<stage>.prof.
+    """
+    global _run
+    with _run_lock:
+        _run = RunMetrics(name, profile_stages)
+        return _run
+
+
+def finish_run(path=None):
+    """
+    Stop collecting and write the JSON run report.
+
+    :return: Path of the report, or None if no run was active or it could not be written.
+    """
+    global _run
+    with _run_lock:
+        run, _run = _run, None
+    if run is None:
+        return None
+    try:
+        path = run.save(path)
+    except OSError as error:
+        print(f"Failed to save run report: {error}")
+        return None
+    print(f"Run report written to {path}")
+    return path
+
+
+def current_run():
+    return _run
+
+
+@contextmanager
+def stage(name):
+    """Time a pipeline stage of the active run (does nothing without one)."""
+    run = _run
+    if run is None:
+        yield
+        return
+    with run.stage(name):
+        yield
+
+
+def add(stage_name=None, byte_count=0, files=0):
+    run = _run
+    if run is not None:
+        run.add(stage_name, byte_count, files)
+
+
+def record_repo(repo, **values):
+    run = _run
+    if run is not None:
+        run.record_repo(repo, **values)
+
+
+def record_asset(repo, asset_name, **values):
+    run = _run
+    if run is not None:
+        run.record_asset(repo, asset_name, **values)
+
+
+def record_archive(archive, **values):
+    run = _run
+    if run is not None:
+        run.record_archive(archive, **values)
+
+
+def record_http(transport):
+    run = _run
+    if run is not None:
+        run.record_http(transport)
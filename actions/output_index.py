@@ -0,0 +1,135 @@
+import hashlib
+import json
+import os
+import threading
+
+OUTPUT_INDEX_SUFFIX = ".index.json"
+_HASH_READ_SIZE = 1024 * 1024
+
+
+def get_output_index_path(output_dir):
+    """Return the path of the index stored next to an output directory."""
+    return os.path.normpath(os.path.abspath(output_dir)) + OUTPUT_INDEX_SUFFIX
+
+
+def fast_hash_file(path):
+    """Return a fast content hash (BLAKE2b, 128-bit) of a file."""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(_HASH_READ_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def new_fast_hash():
+    """Return an empty hash object of the kind used by fast_hash_file, for hashing while streaming."""
+    return hashlib.blake2b(digest_size=16)
+
+
+class OutputIndex:
+    """
+    Persistent index of the files in an output directory.
+
+    Each entry stores path, size, mtime and a fast content hash, so a file's
+    hash is only recomputed when its size or mtime changed. The index also
+    tracks which files the current run produced, to report what was added,
+    changed and removed compared with the previous run.
+    """
+
+    def __init__(self, output_dir, path=None):
+        self.output_dir = os.path.abspath(output_dir)
+        self.path = path or get_output_index_path(output_dir)
+        self._entries = {}
+        self._previous = set()
+        self._added = set()
+        self._changed = set()
+        self._touched = set()
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r") as index_file:
+                data = json.load(index_file)
+        except (OSError, ValueError) as error:
+            print(f"Ignoring unreadable output index '{self.path}': {error}")
+            return
+        if isinstance(data, dict):
+            self._entries = data
+            self._previous = set(data)
+
+    def _key(self, path):
+        return os.path.relpath(os.path.abspath(path), self.output_dir).replace(os.sep, "/")
+
+    def file_hash(self, path):
+        """Return the content hash of a file under the output directory, reusing the index when it is current."""
+        key = self._key(path)
+        stat = os.stat(path)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+                return entry["hash"]
+        digest = fast_hash_file(path)
+        with self._lock:
+            self._entries[key] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "hash": digest}
+        return digest
+
+    def same_content(self, src_path, dest_path):
+        """Return True if dest_path exists and holds exactly the bytes of src_path."""
+        try:
+            if os.path.getsize(src_path) != os.path.getsize(dest_path):
+                return False
+            return fast_hash_file(src_path) == self.file_hash(dest_path)
+        except OSError:
+            return False
+
+    def record(self, dest_path, digest=None, existed=None):
+        """
+        Record that this run wrote dest_path.
+
+        :param digest: Content hash if it was computed while writing (optional).
+        :param existed: Whether a different file was replaced; detected from the index when None.
+        """
+        key = self._key(dest_path)
+        stat = os.stat(dest_path)
+        digest = digest or fast_hash_file(dest_path)
+        with self._lock:
+            if existed is None:
+                existed = key in self._entries
+            (self._changed if existed else self._added).add(key)
+            self._touched.add(key)
+            self._entries[key] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "hash": digest}
+
+    def keep(self, dest_path):
+        """Record that dest_path is part of this run's output but was left untouched."""
+        key = self._key(dest_path)
+        with self._lock:
+            self._touched.add(key)
+        if os.path.exists(dest_path):
+            self.file_hash(dest_path)
+
+    def diff(self):
+        """Return the files added, changed and no longer produced compared with the previous run."""
+        with self._lock:
+            removed = self._previous - self._touched
+            return {
+                "added": sorted(self._added),
+                "changed": sorted(self._changed),
+                "removed": sorted(removed),
+            }
+
+    def save(self):
+        """Write the index, dropping entries for files that no longer exist."""
+        with self._lock:
+            entries = {
+                key: entry
+                for key, entry in self._entries.items()
+                if os.path.isfile(os.path.join(self.output_dir, *key.split("/")))
+            }
+            temp_path = f"{self.path}.tmp"
+            with open(temp_path, "w") as index_file:
+                json.dump(entries, index_file, indent=1, sort_keys=True)
+            os.replace(temp_path, self.path)
+            self._entries = entries
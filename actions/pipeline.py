@@ -0,0 +1,128 @@
+import os
+import threading
+from concurrent.futures import CancelledError, ProcessPoolExecutor
+
+from actions import metrics
+from actions.config import DOWNLOADS_DIR_NAME, get_project_root
+from actions.download import start_download
+from actions.progress import TaskCancelled
+from actions.routing import load_routing_rules
+from actions.process_downloads import (
+    CONFLICT_ASK,
+    EXTRACT_WORKERS,
+    begin_output_index,
+    copy_loose_download,
+    discard_extraction_dirs,
+    extract_archive,
+    log_extraction_result,
+    finish_output_index,
+    merge_processing,
+    report_output_changes,
+    reset_overwrite_prompts,
+)
+
+
+def download_and_process(
+    selected_files,
+    github_token=None,
+    max_workers=EXTRACT_WORKERS,
+    on_conflict=CONFLICT_ASK,
+    progress=None,
+    cancel_event=None,
+    base_dir=None,
+):
+    """
+    Download the selected entries and process every asset as soon as it is on disk.
+
+    Loose files such as .nro/.ovl are copied into Output from the download thread,
+    and archives are queued for extraction in worker processes while later repos
+    are still downloading. Once everything has arrived the extracted folders are
+    merged into Output.
+
+    :param selected_files: Config entries to download.
+    :param github_token: GitHub Personal Access Token (optional).
+    :param max_workers: Number of extraction worker processes (None uses one per CPU core).
+    :param on_conflict: How files that exist in Output with different content are resolved
+                        (see process_downloads.reset_overwrite_prompts).
+    :param progress: ProgressTracker that receives per-repo and per-asset progress (optional).
+    :param cancel_event: threading.Event that stops downloading and extracting when set (optional).
+    :param base_dir: Folder holding Downloads, Processing, Output and Persistent (default: the project root).
+    :return: Tuple of (download results, extraction results).
+    :raises TaskCancelled: If cancel_event was set; partial downloads and extraction folders are removed first.
+    """
+    base_dir = os.path.abspath(base_dir or get_project_root())
+    downloads_dir = os.path.join(base_dir, DOWNLOADS_DIR_NAME)
+    output_dir = os.path.join(base_dir, "Output")
+    processing_dir = os.path.join(base_dir, "Processing")
+
+    rules = load_routing_rules()
+    reset_overwrite_prompts(on_conflict)
+    os.makedirs(output_dir, exist_ok=True)
+    begin_output_index(output_dir)
+    os.makedirs(processing_dir, exist_ok=True)
+    os.makedirs(os.path.join(output_dir, "switch"), exist_ok=True)
+
+    extraction_futures = []
+    futures_lock = threading.Lock()
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        def on_asset_ready(repo, asset_result):
+            if cancel_event is not None and cancel_event.is_set():
+                return
+            path = asset_result["path"]
+            rule = rules.match_file(asset_result["name"])
+            if rule is None or rule["action"] == "ignore":
+                return
+            if rule["action"] == "copy":
+                copy_loose_download(path, output_dir, rules)
+            else:
+                extract_dir = os.path.join(processing_dir, os.path.splitext(asset_result["name"])[0])
+                future = executor.submit(extract_archive, path, extract_dir)
+                if progress is not None:
+                    progress.set_asset_status(repo, asset_result["name"], "extracting")
+                with futures_lock:
+                    extraction_futures.append((repo, path, extract_dir, future))
+
+        download_results = start_download(
+            selected_files,
+            github_token,
+            output_dir=downloads_dir,
+            on_asset_ready=on_asset_ready,
+            progress=progress,
+            cancel_event=cancel_event,
+        )
+        if progress is not None:
+            progress.set_stage("Extracting archives")
+
+        extraction_results = []
+        # Archives are extracted while downloads run; this stage only times the wait for the last ones.
+        with metrics.stage("extract archives"):
+            for repo, path, extract_dir, future in extraction_futures:
+                archive = os.path.basename(path)
+                if cancel_event is not None and cancel_event.is_set():
+                    future.cancel()
+                try:
+                    result = future.result()
+                except CancelledError:
+                    result = {"archive": archive, "extract_dir": extract_dir, "status": "cancelled", "error": "Cancelled"}
+                except Exception as e:
+                    # The worker process itself died (e.g. BrokenProcessPool).
+                    result = {"archive": archive, "extract_dir": extract_dir, "status": "failed", "error": str(e)}
+                log_extraction_result(result, path)
+                if progress is not None:
+                    progress.set_asset_status(repo, archive, result["status"])
+                extraction_results.append(result)
+
+    if cancel_event is not None and cancel_event.is_set():
+        discard_extraction_dirs(extraction_results, processing_dir)
+        finish_output_index()
+        print("Download and processing cancelled.")
+        raise TaskCancelled()
+
+    if progress is not None:
+        progress.set_stage("Merging into Output")
+
+    merge_processing(output_dir, processing_dir, os.path.join(base_dir, "Persistent"), rules)
+    report_output_changes(finish_output_index())
+    print("Download and processing complete.")
+    return download_results, extraction_results
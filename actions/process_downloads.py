@@ -1,33 +1,153 @@
 import os
 import shutil
+import tempfile
+import time
 import zipfile
-import py7zr
-import tkinter.messagebox as messagebox
+from concurrent.futures import CancelledError, ProcessPoolExecutor, wait
 
+from actions import metrics
+from actions.cleanup import discard
 from actions.config import DOWNLOADS_DIR_NAME
+from actions.output_index import OutputIndex, fast_hash_file, new_fast_hash
+from actions.progress import TaskCancelled
+from actions.routing import (
+    PlanStep,
+    format_plan,
+    load_routing_rules,
+    plan_archive_members,
+    plan_downloads,
+    plan_persistent,
+    plan_processing,
+)
+
+# Worker processes used to extract archives; None uses one per CPU core.
+EXTRACT_WORKERS = None
+# Stream archive members straight into Output instead of staging them in Processing.
+EXTRACT_IN_PLACE = True
+# Members that may match an existing Output file are hashed before they are written;
+# up to this many bytes of such a member are held in memory, the rest in a temporary file.
+MEMBER_SPOOL_BYTES = 8 * 1024 * 1024
+# Progress rows for archives extracted by process_downloads are grouped under this name.
+ARCHIVES_PROGRESS_GROUP = "Archives"
+
+# How a file that exists in Output with different content is resolved.
+CONFLICT_ASK = "ask"
+CONFLICT_OVERWRITE = "overwrite"
+CONFLICT_SKIP = "skip"
+CONFLICT_POLICIES = (CONFLICT_ASK, CONFLICT_OVERWRITE, CONFLICT_SKIP)
 
 _overwrite_prompt_cache = {}
+# Conflict policy of the run in progress: one of CONFLICT_POLICIES or a callable(dest_path) -> bool.
+_conflict_policy = CONFLICT_ASK
+# Index of the Output directory for the run in progress (see begin_output_index).
+_output_index = None
+
+
+def reset_overwrite_prompts(on_conflict=CONFLICT_ASK):
+    """
+    Forget overwrite answers from a previous processing run and set how this run resolves conflicts.
+
+    :param on_conflict: CONFLICT_ASK shows a dialog per file, CONFLICT_OVERWRITE and CONFLICT_SKIP
+                        decide without asking, and a callable(dest_path) -> bool decides per file.
+    :raises ValueError: If on_conflict is not a known policy.
+    """
+    global _conflict_policy
+    if not callable(on_conflict) and on_conflict not in CONFLICT_POLICIES:
+        raise ValueError(f"Unknown conflict policy '{on_conflict}'.")
+    _overwrite_prompt_cache.clear()
+    _conflict_policy = on_conflict
+
+
+def ask_overwrite(dest_path):
+    """Ask the user whether to overwrite dest_path. Must run on the Tk main thread."""
+    import tkinter.messagebox as messagebox
+
+    prompt_message = (
+        f"{dest_path} already exists.\n\n"
+        "Do you want to overwrite it?"
+    )
+    return messagebox.askyesno("Process Downloads", prompt_message)
 
 
 def prompt_user_overwrite(dest_path):
-    """Ask the user to confirm overwriting a file conflict."""
+    """Decide whether a file conflict is overwritten, asking the user unless the run has a fixed policy."""
     normalized_path = os.path.abspath(dest_path)
     if normalized_path in _overwrite_prompt_cache:
         return _overwrite_prompt_cache[normalized_path]
 
-    prompt_message = (
-        f"{normalized_path} already exists.\n\n"
-        "Do you want to overwrite it?"
-    )
-    should_overwrite = messagebox.askyesno("Process Downloads", prompt_message)
+    if callable(_conflict_policy):
+        should_overwrite = bool(_conflict_policy(normalized_path))
+    elif _conflict_policy == CONFLICT_ASK:
+        should_overwrite = ask_overwrite(normalized_path)
+    else:
+        should_overwrite = _conflict_policy == CONFLICT_OVERWRITE
     _overwrite_prompt_cache[normalized_path] = should_overwrite
     return should_overwrite
 
+
+def begin_output_index(output_dir):
+    """Start tracking writes to output_dir so identical files are skipped and changes can be reported."""
+    global _output_index
+    _output_index = OutputIndex(output_dir)
+    return _output_index
+
+
+def finish_output_index():
+    """
+    Save the index of the run in progress and stop tracking.
+
+    :return: Dict with the "added", "changed" and "removed" Output paths, or None if no run was tracked.
+    """
+    global _output_index
+    index, _output_index = _output_index, None
+    if index is None:
+        return None
+    try:
+        index.save()
+    except OSError as error:
+        print(f"Failed to save output index: {error}")
+    return index.diff()
+
+
+def report_output_changes(changes):
+    if changes is None:
+        return
+    for label in ("added", "changed", "removed"):
+        for path in changes[label]:
+            print(f"{label.capitalize()}: {path}")
+    print(
+        f"Output changes: {len(changes['added'])} added, {len(changes['changed'])} changed, "
+        f"{len(changes['removed'])} no longer produced."
+    )
+
+
+def _is_unchanged(src, dest):
+    return _output_index is not None and _output_index.same_content(src, dest)
+
+
+def _record_output(dest, existed, digest=None):
+    metrics.add(byte_count=os.path.getsize(dest), files=1)
+    if _output_index is not None:
+        _output_index.record(dest, digest=digest, existed=existed)
+
+
+def _record_output_tree(dest):
+    for root, dirs, files in os.walk(dest):
+        for file in files:
+            _record_output(os.path.join(root, file), existed=False)
+
+
+def _keep_output(dest):
+    if _output_index is not None:
+        _output_index.keep(dest)
+
+
 def move_or_merge(src, dest):
     """Move or merge a directory/file, asking for overwrite only on file conflicts."""
     if os.path.isdir(src):
         if not os.path.exists(dest):
             shutil.move(src, dest)
+            _record_output_tree(dest)
             print(f"Moved directory: {src} to {dest}")
         else:
             for item in os.listdir(src):
@@ -37,15 +157,22 @@ def move_or_merge(src, dest):
             os.rmdir(src)
     elif os.path.isfile(src):
         if os.path.exists(dest):
-            if prompt_user_overwrite(dest):
+            if _is_unchanged(src, dest):
+                os.remove(src)
+                _keep_output(dest)
+                print(f"Unchanged file: {dest}")
+            elif prompt_user_overwrite(dest):
                 os.remove(dest)
                 shutil.move(src, dest)
+                _record_output(dest, existed=True)
                 print(f"Overwritten file: {dest}")
             else:
                 os.remove(src)
+                _keep_output(dest)
                 print(f"Skipped file: {dest}")
         else:
             shutil.move(src, dest)
+            _record_output(dest, existed=False)
             print(f"Moved file: {src} to {dest}")
 
 def copy_or_merge(src, dest):
@@ -53,6 +180,7 @@ def copy_or_merge(src, dest):
     if os.path.isdir(src):
         if not os.path.exists(dest):
             shutil.copytree(src, dest, dirs_exist_ok=True)
+            _record_output_tree(dest)
             print(f"Copied directory: {src} to {dest}")
         else:
             for item in os.listdir(src):
@@ -61,124 +189,620 @@ def copy_or_merge(src, dest):
                 copy_or_merge(src_item, dest_item)
     elif os.path.isfile(src):
         if os.path.exists(dest):
-            if prompt_user_overwrite(dest):
+            if _is_unchanged(src, dest):
+                _keep_output(dest)
+                print(f"Unchanged file: {dest}")
+            elif prompt_user_overwrite(dest):
                 shutil.copy2(src, dest)
+                _record_output(dest, existed=True)
                 print(f"Overwritten file: {dest}")
             else:
+                _keep_output(dest)
                 print(f"Skipped file: {dest}")
         else:
             shutil.copy2(src, dest)
+            _record_output(dest, existed=False)
             print(f"Copied file: {src} to {dest}")
 
-def process_downloads_action():
-    _overwrite_prompt_cache.clear()
+def extract_archive(archive_path, extract_dir):
+    """
+    Extract a single .zip or .7z archive into extract_dir.
+
+    Runs inside a worker process, so failures are returned rather than raised.
+
+    :return: Dict with the archive name, extraction directory, status and error message.
+    """
+    item = os.path.basename(archive_path)
+    result = {"archive": item, "extract_dir": extract_dir, "status": "extracted", "error": None}
+    started = time.perf_counter()
+    try:
+        if item.lower().endswith(".zip"):
+            with zipfile.ZipFile(archive_path, 'r') as zip_ref:
+                zip_ref.extractall(extract_dir)
+        elif item.lower().endswith(".7z"):
+            import py7zr
+
+            with py7zr.SevenZipFile(archive_path, mode='r') as seven_zip:
+                seven_zip.extractall(extract_dir)
+        else:
+            result.update(status="skipped", error="Not a supported archive")
+    except Exception as e:
+        result.update(status="failed", error=str(e))
+    result["seconds"] = round(time.perf_counter() - started, 3)
+    return result
+
+
+def _unfinished_result(job, status, error):
+    extract_dir = job[1] if isinstance(job[1], str) else None
+    return {"archive": os.path.basename(job[0]), "extract_dir": extract_dir, "status": status, "error": error}
+
+
+def _is_cancelled(cancel_event):
+    return cancel_event is not None and cancel_event.is_set()
+
+
+def _run_extraction_jobs(worker, jobs, max_workers, cancel_event=None):
+    """
+    Run worker(*job) for every job in a process pool and return the results in job order.
+
+    When cancel_event is set, jobs that have not started are dropped with a "cancelled"
+    result; jobs already running in a worker process are allowed to finish.
+    """
+    if not jobs:
+        return []
+
+    workers = min(max_workers or os.cpu_count() or 1, len(jobs))
+    if workers <= 1:
+        return [
+            _unfinished_result(job, "cancelled", "Cancelled") if _is_cancelled(cancel_event) else worker(*job)
+            for job in jobs
+        ]
+
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(worker, *job) for job in jobs]
+        pending = set(futures)
+        while pending:
+            _, pending = wait(pending, timeout=0.25)
+            if _is_cancelled(cancel_event):
+                for future in pending:
+                    future.cancel()
+        for job, future in zip(jobs, futures):
+            try:
+                results.append(future.result())
+            except CancelledError:
+                results.append(_unfinished_result(job, "cancelled", "Cancelled"))
+            except Exception as e:
+                # The worker process itself died (e.g. BrokenProcessPool).
+                results.append(_unfinished_result(job, "failed", str(e)))
+    return results
+
+
+def extract_archives(archive_paths, processing_dir, max_workers=EXTRACT_WORKERS, cancel_event=None):
+    """
+    Extract archives in parallel worker processes, each into Processing/<archive name>.
+
+    :param archive_paths: Paths of the archives to extract.
+    :param processing_dir: Directory that receives one extraction folder per archive.
+    :param max_workers: Number of worker processes (None uses one per CPU core).
+    :param cancel_event: threading.Event that skips archives not yet started when set (optional).
+    :return: List of per-archive result dicts, in the same order as archive_paths.
+    """
+    jobs = [
+        (path, os.path.join(processing_dir, os.path.splitext(os.path.basename(path))[0]))
+        for path in archive_paths
+    ]
+    return _run_extraction_jobs(extract_archive, jobs, max_workers, cancel_event)
+
+
+def read_archive_members(archive_path):
+    """Return (name, is_dir) for every member of a .zip or .7z archive."""
+    if archive_path.lower().endswith(".zip"):
+        with zipfile.ZipFile(archive_path, 'r') as zip_ref:
+            return [(info.filename, info.is_dir()) for info in zip_ref.infolist()]
+    if archive_path.lower().endswith(".7z"):
+        import py7zr
+
+        with py7zr.SevenZipFile(archive_path, mode='r') as seven_zip:
+            return [(info.filename, info.is_directory) for info in seven_zip.list()]
+    raise ValueError("Not a supported archive")
+
+
+def _place_member(temp_path, dest_path, digest, deferred, result):
+    if dest_path in deferred:
+        # The destination already existed; the main process decides whether to replace it.
+        result["pending"][dest_path] = digest
+    else:
+        os.replace(temp_path, dest_path)
+        result["written"][dest_path] = digest
+
+
+def _copy_hashed(src, dest, digest):
+    for chunk in iter(lambda: src.read(1024 * 1024), b""):
+        digest.update(chunk)
+        dest.write(chunk)
+
+
+def _remove_temp(temp_path):
+    try:
+        os.remove(temp_path)
+    except FileNotFoundError:
+        pass
+
+
+def _extract_zip_member(zip_ref, name, temp_path, current_hash=None):
+    """
+    Write one zip member to temp_path while hashing it.
+
+    :param current_hash: Hash of the file at the destination now; a member with the same hash is not written.
+    :return: The member's hash, or None if it matches current_hash.
+    """
+    digest = new_fast_hash()
+    with zip_ref.open(name) as src:
+        if current_hash is None:
+            with open(temp_path, "wb") as dest:
+                _copy_hashed(src, dest, digest)
+            return digest.hexdigest()
+        with tempfile.SpooledTemporaryFile(MEMBER_SPOOL_BYTES) as spool:
+            _copy_hashed(src, spool, digest)
+            if digest.hexdigest() == current_hash:
+                return None
+            spool.seek(0)
+            with open(temp_path, "wb") as dest:
+                shutil.copyfileobj(spool, dest, 1024 * 1024)
+    return digest.hexdigest()
+
+
+def extract_members(archive_path, destinations, deferred=(), temp_suffix=".part", current_hashes=None):
+    """
+    Stream archive members straight to their final paths, without a staging folder.
+
+    Each member is written to "<dest><temp_suffix>" while its content hash is computed.
+    Once the whole archive has been read, new files are moved into place;
+    members whose destination already existed are left as temporary files for
+    the caller to resolve. If any member fails, every temporary file is removed
+    and nothing is placed, so a damaged archive leaves Output as it was.
+    Members with a known current hash are hashed first and only written if
+    their content differs. Runs inside a worker process, so failures are
+    returned rather than raised.
+
+    :param destinations: Dict mapping member names to destination paths.
+    :param deferred: Destination paths that already existed when the extraction was planned.
+    :param temp_suffix: Suffix of the temporary files; archives extracted in the same run use different ones.
+    :param current_hashes: Dict mapping deferred destination paths to the hash of the file there now (optional).
+    :return: Dict with the archive name, status, error message, and the "written", "pending"
+             and "unchanged" destination paths mapped to their content hashes.
+    """
+    item = os.path.basename(archive_path)
+    result = {
+        "archive": item,
+        "extract_dir": None,
+        "status": "extracted",
+        "error": None,
+        "written": {},
+        "pending": {},
+        "unchanged": {},
+    }
+    deferred = set(deferred)
+    current_hashes = current_hashes or {}
+    started = time.perf_counter()
+    try:
+        if item.lower().endswith(".zip"):
+            extracted = []
+            try:
+                with zipfile.ZipFile(archive_path, 'r') as zip_ref:
+                    for name, dest_path in destinations.items():
+                        os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+                        temp_path = f"{dest_path}{temp_suffix}"
+                        try:
+                            digest = _extract_zip_member(zip_ref, name, temp_path, current_hashes.get(dest_path))
+                        except BaseException:
+                            _remove_temp(temp_path)
+                            raise
+                        if digest is None:
+                            result["unchanged"][dest_path] = current_hashes[dest_path]
+                        else:
+                            extracted.append((temp_path, dest_path, digest))
+            except BaseException:
+                for temp_path, _, _ in extracted:
+                    _remove_temp(temp_path)
+                raise
+            for temp_path, dest_path, digest in extracted:
+                _place_member(temp_path, dest_path, digest, deferred, result)
+        elif item.lower().endswith(".7z"):
+            import py7zr
+            from actions.sevenzip_writer import DirectWriterFactory
+
+            factory = DirectWriterFactory(destinations, temp_suffix, current_hashes, MEMBER_SPOOL_BYTES)
+            try:
+                with py7zr.SevenZipFile(archive_path, mode='r') as seven_zip:
+                    seven_zip.extract(targets=list(destinations), factory=factory)
+                for writer in factory.writers:
+                    writer.close()
+            except BaseException:
+                for writer in factory.writers:
+                    writer.discard()
+                raise
+            for writer in factory.writers:
+                if writer.unchanged:
+                    result["unchanged"][writer.dest_path] = writer.hexdigest()
+                else:
+                    _place_member(writer.temp_path, writer.dest_path, writer.hexdigest(), deferred, result)
+        else:
+            result.update(status="skipped", error="Not a supported archive")
+    except Exception as e:
+        result.update(status="failed", error=str(e))
+    result["seconds"] = round(time.perf_counter() - started, 3)
+    return result
+
+
+def _current_hash(dest_path):
+    if _output_index is not None:
+        return _output_index.file_hash(dest_path)
+    return fast_hash_file(dest_path)
+
+
+def _resolve_pending_member(dest_path, digest, temp_path):
+    """Replace an existing Output file with an extracted member, unless it is identical or the user declines."""
+    if not os.path.exists(dest_path):
+        os.replace(temp_path, dest_path)
+        _record_output(dest_path, existed=False, digest=digest)
+        return
+    if _current_hash(dest_path) == digest:
+        os.remove(temp_path)
+        _keep_output(dest_path)
+        print(f"Unchanged file: {dest_path}")
+    elif prompt_user_overwrite(dest_path):
+        os.replace(temp_path, dest_path)
+        _record_output(dest_path, existed=True, digest=digest)
+        print(f"Overwritten file: {dest_path}")
+    else:
+        os.remove(temp_path)
+        _keep_output(dest_path)
+        print(f"Skipped file: {dest_path}")
+
+
+def extract_archives_in_place(archive_paths, output_dir, rules, max_workers=EXTRACT_WORKERS, cancel_event=None):
+    """
+    Extract archives straight into output_dir, mapping each member with the routing rules.
+
+    Member lists are read in this process and the members are streamed to their
+    destinations by worker processes. Members whose destination already exists
+    are hashed before they are written: identical ones are skipped silently and
+    never written, and the user is asked only about real conflicts. Every
+    archive writes its own temporary files, and files that several archives
+    carry are held back like existing ones. Conflicts are resolved in archive
+    order, so later archives are compared with what the earlier ones left, as
+    in the staged merge. If cancel_event is set, those conflicts are left
+    unresolved and their temporary files are removed.
+
+    :return: List of per-archive result dicts, in the same order as archive_paths.
+    """
+    planned = []
+    results = {}
+    for path in archive_paths:
+        archive = os.path.basename(path)
+        try:
+            members = read_archive_members(path)
+        except Exception as e:
+            results[path] = {"archive": archive, "extract_dir": None, "status": "failed", "error": str(e)}
+            continue
+        folders = []
+        destinations = plan_archive_members(members, os.path.splitext(archive)[0], output_dir, rules, folders)
+        planned.append((path, destinations, folders))
+
+    # Archives run at the same time, so a destination more than one of them writes is
+    # deferred in all of them, like one that already exists, and resolved in archive order.
+    archive_counts = {}
+    for _, destinations, _ in planned:
+        for key in {os.path.normcase(dest_path) for dest_path in destinations.values()}:
+            archive_counts[key] = archive_counts.get(key, 0) + 1
+    jobs = []
+    archive_folders = []
+    for path, destinations, folders in planned:
+        deferred = []
+        current_hashes = {}
+        for dest_path in destinations.values():
+            if archive_counts[os.path.normcase(dest_path)] > 1:
+                deferred.append(dest_path)
+            elif os.path.exists(dest_path):
+                deferred.append(dest_path)
+                current_hashes[dest_path] = _current_hash(dest_path)
+        jobs.append((path, destinations, deferred, f".{len(jobs)}.part", current_hashes))
+        archive_folders.append(folders)
+
+    extracted = _run_extraction_jobs(extract_members, jobs, max_workers, cancel_event)
+    for job, folders, result in zip(jobs, archive_folders, extracted):
+        results[job[0]] = result
+        temp_suffix = job[3]
+        if result["status"] == "extracted":
+            # Folders the archive ships empty have no member to create them.
+            for folder in folders:
+                os.makedirs(folder, exist_ok=True)
+        for dest_path, digest in result.get("written", {}).items():
+            _record_output(dest_path, existed=False, digest=digest)
+        for dest_path in result.get("unchanged", {}):
+            _keep_output(dest_path)
+            print(f"Unchanged file: {dest_path}")
+        for dest_path, digest in result.get("pending", {}).items():
+            if _is_cancelled(cancel_event):
+                _keep_output(dest_path)
+                os.remove(f"{dest_path}{temp_suffix}")
+            else:
+                _resolve_pending_member(dest_path, digest, f"{dest_path}{temp_suffix}")
+    return [results[path] for path in archive_paths]
+
+
+def execute_plan(plan):
+    """Run the copy, move and cleanup steps of a routing plan. Extract steps are left to extract_archives."""
+    for step in plan:
+        if step.action == "copy_file":
+            existed = os.path.exists(step.dest)
+            if existed and _is_unchanged(step.src, step.dest):
+                _keep_output(step.dest)
+                print(f"Unchanged file: {step.dest}")
+                continue
+            os.makedirs(os.path.dirname(step.dest), exist_ok=True)
+            shutil.copy2(step.src, step.dest)
+            _record_output(step.dest, existed)
+            print(f"Copied file: {os.path.basename(step.src)} to {step.dest}")
+        elif step.action == "merge_contents":
+            os.makedirs(step.dest, exist_ok=True)
+            for item in os.listdir(step.src):
+                move_or_merge(os.path.join(step.src, item), os.path.join(step.dest, item))
+        elif step.action == "move":
+            move_or_merge(step.src, step.dest)
+        elif step.action in ("copy_tree", "copy_unmatched"):
+            if step.action == "copy_unmatched":
+                print(f"Unprocessed folder {os.path.basename(step.src)} found, assuming switch homebrew app")
+            os.makedirs(os.path.dirname(step.dest), exist_ok=True)
+            copy_or_merge(step.src, step.dest)
+        elif step.action == "rmdir":
+            try:
+                os.rmdir(step.src)
+                print(f"Removed empty folder: {step.src}")
+            except OSError:
+                pass
+
+
+def copy_loose_download(item_path, output_dir, rules=None):
+    """
+    Copy a downloaded file that a routing rule sends straight to Output (e.g. .nro, .ovl).
+
+    :return: True if the file was copied, False if no copy rule matches it.
+    """
+    rules = rules or load_routing_rules()
+    rule = rules.match_file(os.path.basename(item_path))
+    if rule is None or rule["action"] != "copy":
+        return False
+    dest_path = os.path.join(output_dir, rule["dest"], os.path.basename(item_path))
+    execute_plan([PlanStep("copy_file", item_path, dest_path)])
+    return True
+
+
+def log_extraction_result(result, archive_path=None):
+    """Print the outcome of one extraction and add it to the run metrics."""
+    metrics.record_archive(
+        result["archive"],
+        status=result["status"],
+        seconds=result.get("seconds"),
+        archive_bytes=os.path.getsize(archive_path) if archive_path and os.path.exists(archive_path) else None,
+        files=len(result.get("written", {})) + len(result.get("pending", {})) if "written" in result else None,
+    )
+    if result["status"] == "extracted":
+        print(f"Extracted archive: {result['archive']}")
+    elif result["status"] == "cancelled":
+        print(f"Skipped extracting {result['archive']}: cancelled.")
+    else:
+        print(f"Failed to extract {result['archive']}: {result['error']}")
+
+
+def discard_extraction_dirs(extraction_results, processing_dir):
+    """
+    Remove the staging folders of a cancelled run, and Processing itself if that leaves it empty.
+
+    Folders are moved next to Processing and deleted in the background (see actions.cleanup.discard).
+    """
+    if not os.path.isdir(processing_dir):
+        return
+    processing_dir = os.path.abspath(processing_dir)
+    parent_dir = os.path.dirname(processing_dir)
+    extract_dirs = {
+        os.path.normcase(os.path.abspath(result["extract_dir"]))
+        for result in extraction_results
+        if result.get("extract_dir")
+    }
+    remaining = []
+    with os.scandir(processing_dir) as entries:
+        for entry in entries:
+            if os.path.normcase(entry.path) in extract_dirs:
+                discard(entry.path, tombstone_dir=parent_dir)
+                print(f"Removed extraction folder: {entry.path}")
+            else:
+                remaining.append(entry.path)
+    if not remaining:
+        os.rmdir(processing_dir)
+
+
+def report_extraction_failures(extraction_results):
+    """Show one warning listing every archive that failed to extract."""
+    failed_extractions = [result for result in extraction_results if result["status"] == "failed"]
+    if failed_extractions:
+        import tkinter.messagebox as messagebox
+
+        details = "\n".join(f"{result['archive']}: {result['error']}" for result in failed_extractions)
+        messagebox.showwarning("Process Downloads", f"Some archives could not be extracted:\n\n{details}")
+
+
+def merge_processing(output_dir, processing_dir, persistent_dir, rules=None):
+    """
+    Merge extracted archives from processing_dir into output_dir, then copy Persistent.
+
+    These are Steps 3-6 of processing; they expect every archive to be extracted already.
+    """
+    rules = rules or load_routing_rules()
+
+    # Steps 3-5: Route recognised folders, clear empty folders and place unrecognised archives
+    if os.path.isdir(processing_dir):
+        with metrics.stage("merge archives"):
+            execute_plan(plan_processing(processing_dir, output_dir, rules))
+
+    # Step 6: Copy contents of Persistent folder to Output
+    with metrics.stage("copy persistent"):
+        execute_plan(plan_persistent(persistent_dir, output_dir))
+    print("Persistent folder contents have been copied to Output.")
+
+    # Everything left in Processing has been moved or copied into Output, so discard it in the background
+    if discard(processing_dir):
+        print("Processing folder has been cleared.")
+
+
+def process_downloads(
+    extract_in_place=EXTRACT_IN_PLACE,
+    on_conflict=CONFLICT_ASK,
+    progress=None,
+    cancel_event=None,
+    base_dir=None,
+    persistent_dir=None,
+    max_workers=EXTRACT_WORKERS,
+):
+    """
+    Route Downloads into Output: copy loose files, extract archives and merge in Persistent.
+
+    :param extract_in_place: Stream archive members straight into Output instead of staging them in Processing.
+    :param on_conflict: How files that exist in Output with different content are resolved
+                        (see reset_overwrite_prompts).
+    :param progress: ProgressTracker that receives the current stage and per-archive status (optional).
+    :param cancel_event: threading.Event checked between steps (optional).
+    :param base_dir: Folder holding Downloads, Processing, Output and Persistent (default: the project root).
+    :param persistent_dir: Folder copied into Output last (default: Persistent inside base_dir).
+    :param max_workers: Number of extraction worker processes (None uses one per CPU core).
+    :return: Dict with "extraction_results" and "output_changes", or None if there was nothing to process.
+    :raises ValueError: If routing.json cannot be loaded.
+    :raises TaskCancelled: If cancel_event was set; extraction folders and temporary files are removed first.
+    """
+    reset_overwrite_prompts(on_conflict)
 
     # Set directories
-    base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "../"))
+    base_dir = os.path.abspath(base_dir or os.path.join(os.path.dirname(__file__), "../"))
     downloads_dir = os.path.join(base_dir, DOWNLOADS_DIR_NAME)
     output_dir = os.path.join(base_dir, "Output")
     processing_dir = os.path.join(base_dir, "Processing")
 
-    # Specific folder names to look for
-    target_folders = {"atmosphere", "switch", "bootloader"}
+    try:
+        rules = load_routing_rules()
+    except OSError as error:
+        raise ValueError(str(error)) from error
 
     # Ensure necessary directories exist
     os.makedirs(output_dir, exist_ok=True)
-    os.makedirs(processing_dir, exist_ok=True)
+    begin_output_index(output_dir)
+    if not extract_in_place:
+        os.makedirs(processing_dir, exist_ok=True)
     os.makedirs(os.path.join(output_dir, "switch"), exist_ok=True)
 
     # Nothing to process if Downloads is missing or empty
     if not os.path.isdir(downloads_dir) or not os.listdir(downloads_dir):
-        messagebox.showinfo("Process Downloads", "No downloads to process.")
-        return
+        finish_output_index()
+        return None
 
-    # Step 1: Move .NRO files to Output/switch
-    for item in os.listdir(downloads_dir):
-        item_path = os.path.join(downloads_dir, item)
-        if item.lower().endswith(".nro"):
-            switch_dir = os.path.join(output_dir, "switch")
-            os.makedirs(switch_dir, exist_ok=True)
-            shutil.copy2(item_path, os.path.join(switch_dir, item))
-            print(f"Copied .NRO file: {item} to Output/switch")
-
-    # Step 1.5: Move .OVL files to Output/switch/.overlays
-    for item in os.listdir(downloads_dir):
-        item_path = os.path.join(downloads_dir, item)
-        if item.lower().endswith(".ovl"):
-            overlays_dir = os.path.join(output_dir, "switch", ".overlays")
-            os.makedirs(overlays_dir, exist_ok=True)
-            shutil.copy2(item_path, os.path.join(overlays_dir, item))
-            print(f"Copied .OVL file: {item} to Output/switch/.overlays")
-
-    # Step 2: Extract valid archive files into Processing
-    for item in os.listdir(downloads_dir):
-        item_path = os.path.join(downloads_dir, item)
-        extract_dir = os.path.join(processing_dir, os.path.splitext(item)[0])
-        try:
-            if item.lower().endswith(".zip"):
-                with zipfile.ZipFile(item_path, 'r') as zip_ref:
-                    zip_ref.extractall(extract_dir)
-                print(f"Extracted .zip file: {item}")
-            elif item.lower().endswith(".7z"):
-                with py7zr.SevenZipFile(item_path, mode='r') as seven_zip:
-                    seven_zip.extractall(extract_dir)
-                print(f"Extracted .7z file: {item}")
-        except Exception as e:
-            print(f"Failed to extract {item}: {e}")
-
-    # Step 3: Crawl Processing for target folders and move entire directory contents to Output
-    for foldername in os.listdir(processing_dir):
-        folder_path = os.path.join(processing_dir, foldername)
-        if os.path.isdir(folder_path):
-            has_target = False
-            for root, dirs, files in os.walk(folder_path):
-                for dir_name in dirs:
-                    if dir_name in target_folders:
-                        target_path = os.path.join(root, dir_name)
-                        dest_path = os.path.join(output_dir, dir_name)
-                        os.makedirs(dest_path, exist_ok=True)
-                        for item in os.listdir(target_path):
-                            move_or_merge(os.path.join(target_path, item), os.path.join(dest_path, item))
-                        has_target = True
-            if has_target:
-                for item in os.listdir(folder_path):
-                    move_or_merge(os.path.join(folder_path, item), os.path.join(output_dir, item))
-
-    # Step 4: Remove empty folders from Processing
-    def remove_empty_folders(directory):
-        for root, dirs, files in os.walk(directory, topdown=False):
-            for d in dirs:
-                dir_path = os.path.join(root, d)
-                if not os.listdir(dir_path):
-                    os.rmdir(dir_path)
-                    print(f"Removed empty folder: {dir_path}")
-
-    remove_empty_folders(processing_dir)
-
-    # Step 5: Handle remaining unprocessed folders in Processing
-    for foldername in os.listdir(processing_dir):
-        folder_path = os.path.join(processing_dir, foldername)
-        if os.path.isdir(folder_path):
-            switch_dir = os.path.join(output_dir, "switch")
-            os.makedirs(switch_dir, exist_ok=True)
-            print(f"Unprocessed folder {foldername} found, assuming switch homebrew app")
-            copy_or_merge(folder_path, os.path.join(switch_dir, foldername))
+    # Step 1: Classify Downloads in one pass and copy loose files (.nro, .ovl, ...) to Output
+    if progress is not None:
+        progress.set_stage("Copying files")
+    with metrics.stage("copy downloads"):
+        download_plan = plan_downloads(downloads_dir, output_dir, processing_dir, rules)
+        execute_plan(download_plan)
 
-    # Step 6: Copy contents of Persistent folder to Output
-    persistent_dir = os.path.join(base_dir, "Persistent")
-    if os.path.exists(persistent_dir):
-        for item in os.listdir(persistent_dir):
-            src_path = os.path.join(persistent_dir, item)
-            dest_path = os.path.join(output_dir, item)
-            copy_or_merge(src_path, dest_path)
-    print("Persistent folder contents have been copied to Output.")
-    
-    # Check if Processing folder is empty and delete it if so
-    if not os.listdir(processing_dir):  # Check if folder is empty
-        os.rmdir(processing_dir)  # Remove empty folder
-        print("Processing folder was empty and has been deleted.")
-    else:
-        print("Processing folder is not empty, so it was not deleted.")
+    # Step 2: Extract valid archive files, one worker process per archive. In-place extraction
+    # streams members straight to Output; otherwise archives are staged in Processing.
+    archive_paths = [step.src for step in download_plan if step.action == "extract"]
+    extraction_results = []
+    if not _is_cancelled(cancel_event):
+        if progress is not None:
+            progress.set_stage("Extracting archives")
+            for path in archive_paths:
+                progress.set_asset_status(ARCHIVES_PROGRESS_GROUP, os.path.basename(path), "extracting")
+        with metrics.stage("extract archives"):
+            if extract_in_place:
+                extraction_results = extract_archives_in_place(
+                    archive_paths, output_dir, rules, max_workers, cancel_event=cancel_event
+                )
+            else:
+                extraction_results = extract_archives(
+                    archive_paths, processing_dir, max_workers, cancel_event=cancel_event
+                )
+    for path, result in zip(archive_paths, extraction_results):
+        log_extraction_result(result, path)
+        if progress is not None:
+            progress.set_asset_status(ARCHIVES_PROGRESS_GROUP, result["archive"], result["status"])
 
+    if _is_cancelled(cancel_event):
+        discard_extraction_dirs(extraction_results, processing_dir)
+        finish_output_index()
+        print("Processing cancelled.")
+        raise TaskCancelled()
 
+    # Steps 3-6: Merge extracted archives and Persistent into Output
+    if progress is not None:
+        progress.set_stage("Merging into Output")
+    merge_processing(output_dir, processing_dir, persistent_dir or os.path.join(base_dir, "Persistent"), rules)
+    output_changes = finish_output_index()
+    report_output_changes(output_changes)
     print("Processing complete.")
+    return {"extraction_results": extraction_results, "output_changes": output_changes}
+
+
+def preview_processing(base_dir=None, persistent_dir=None):
+    """
+    Describe what process_downloads would do, without changing anything.
+
+    Loose files are listed with their copy destination, and every member of an
+    archive with the Output path the routing rules map it to.
+
+    :param base_dir: Folder holding Downloads and Output (default: the project root).
+    :param persistent_dir: Folder copied into Output last (default: Persistent inside base_dir).
+    :return: One line per planned step (see routing.format_plan).
+    :raises ValueError: If routing.json cannot be loaded.
+    """
+    base_dir = os.path.abspath(base_dir or os.path.join(os.path.dirname(__file__), "../"))
+    downloads_dir = os.path.join(base_dir, DOWNLOADS_DIR_NAME)
+    output_dir = os.path.join(base_dir, "Output")
+    try:
+        rules = load_routing_rules()
+    except OSError as error:
+        raise ValueError(str(error)) from error
+    if not os.path.isdir(downloads_dir):
+        return []
+
+    plan = []
+    for step in plan_downloads(downloads_dir, output_dir, os.path.join(base_dir, "Processing"), rules):
+        if step.action != "extract":
+            plan.append(step)
+            continue
+        archive = os.path.basename(step.src)
+        try:
+            members = read_archive_members(step.src)
+        except Exception as error:
+            print(f"Could not read {archive}: {error}")
+            plan.append(step)
+            continue
+        destinations = plan_archive_members(members, os.path.splitext(archive)[0], output_dir, rules)
+        plan.extend(PlanStep("extract", os.path.join(step.src, name), dest) for name, dest in destinations.items())
+    plan.extend(plan_persistent(persistent_dir or os.path.join(base_dir, "Persistent"), output_dir))
+    return format_plan(plan)
+
+
+def process_downloads_action(extract_in_place=EXTRACT_IN_PLACE):
+    import tkinter.messagebox as messagebox
+
+    try:
+        result = process_downloads(extract_in_place)
+    except ValueError as error:
+        messagebox.showerror("Process Downloads", f"Could not load routing rules:\n\n{error}")
+        return
+    if result is None:
+        messagebox.showinfo("Process Downloads", "No downloads to process.")
+        return
+
+    report_extraction_failures(result["extraction_results"])
+    return result["extraction_results"]
@@ -0,0 +1,217 @@
+import configparser
+import multiprocessing
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from actions import metrics
+from actions.asset_store import link_or_copy
+from actions.cleanup import discard, purge_tombstones, wait_for_cleanup
+from actions.config import DOWNLOADS_DIR_NAME, get_config_path, get_project_root, parse_config_lines
+from actions.download import start_download
+from actions.process_downloads import CONFLICT_OVERWRITE, EXTRACT_IN_PLACE, process_downloads
+from actions.progress import TaskCancelled
+
+PROFILES_FILE_NAME = "profiles.ini"
+BUILDS_DIR_NAME = "Builds"
+PROFILES_PROGRESS_GROUP = "Profiles"
+# How often a multi-profile build checks for cancellation while profiles are building.
+CANCEL_POLL_SECONDS = 0.2
+
+
+def get_profiles_path(profiles_file=PROFILES_FILE_NAME):
+    return get_config_path(profiles_file)
+
+
+def _project_path(path):
+    return path if os.path.isabs(path) else os.path.join(get_project_root(), path)
+
+
+def load_profiles(profiles_file=PROFILES_FILE_NAME):
+    """
+    Load named build profiles from profiles.ini.
+
+    Each section is a profile. "entries" lists config.txt-style lines and "config"
+    names a config.txt-style file; either or both may be given. "build_dir"
+    (default Builds/<name>) holds the profile's Downloads, Processing and Output,
+    and "persistent" (default Persistent) is copied into its Output last.
+
+    :param profiles_file: Path to the profiles file.
+    :return: List of profile dicts with "name", "entries", "build_dir" and "persistent_dir";
+             empty if the file does not exist.
+    :raises ValueError: If the file cannot be parsed or a profile has no entries.
+    :raises ConfigError: If a profile has malformed or duplicated entries.
+    """
+    profiles_path = get_profiles_path(profiles_file)
+    if not os.path.exists(profiles_path):
+        return []
+
+    parser = configparser.ConfigParser(interpolation=None)
+    try:
+        with open(profiles_path, "r") as profiles_handle:
+            parser.read_file(profiles_handle)
+    except (OSError, configparser.Error) as error:
+        raise ValueError(f"Could not read '{profiles_path}': {error}") from error
+
+    profiles = []
+    for name in parser.sections():
+        section = parser[name]
+        lines = section.get("entries", "").splitlines()
+        if section.get("config"):
+            config_path = _project_path(section["config"])
+            try:
+                with open(config_path, "r") as config_handle:
+                    lines.extend(config_handle)
+            except OSError as error:
+                raise ValueError(f"Profile '{name}': could not read '{config_path}': {error}") from error
+        entries = parse_config_lines(lines, f"profile '{name}'")
+        if not entries:
+            raise ValueError(f"Profile '{name}' has no entries.")
+        profiles.append(
+            {
+                "name": name,
+                "entries": entries,
+                "build_dir": _project_path(section.get("build_dir", os.path.join(BUILDS_DIR_NAME, name))),
+                "persistent_dir": _project_path(section.get("persistent", "Persistent")),
+            }
+        )
+    return profiles
+
+
+def union_entries(profiles):
+    """Return the entries of several profiles as one download list, without duplicates."""
+    return list(dict.fromkeys(entry for profile in profiles for entry in profile["entries"]))
+
+
+def link_profile_downloads(profile, download_results):
+    """
+    Fill a profile's own Downloads folder with links to the shared downloads it selects.
+
+    :return: Paths of the linked files.
+    """
+    downloads_dir = os.path.join(profile["build_dir"], DOWNLOADS_DIR_NAME)
+    discard(downloads_dir)
+    os.makedirs(downloads_dir)
+
+    results_by_release = {result["release"]: result for result in download_results}
+    linked = []
+    for entry in profile["entries"]:
+        result = results_by_release.get(entry.release_key)
+        if result is None:
+            continue
+        for asset in result["assets"]:
+            if asset["status"] not in ("downloaded", "skipped") or not entry.matches(asset["name"]):
+                continue
+            dest_path = os.path.join(downloads_dir, asset["name"])
+            if not os.path.exists(dest_path):
+                link_or_copy(asset["path"], dest_path)
+                linked.append(dest_path)
+    return linked
+
+
+def _build_profile(profile, extract_in_place, on_conflict, max_workers, cancel_event):
+    # Runs in its own process, so each build gets its own Output index and conflict policy.
+    print(f"Building profile '{profile['name']}'...")
+    try:
+        result = process_downloads(
+            extract_in_place=extract_in_place,
+            on_conflict=on_conflict,
+            cancel_event=cancel_event,
+            base_dir=profile["build_dir"],
+            persistent_dir=profile["persistent_dir"],
+            max_workers=max_workers,
+        )
+    finally:
+        # Background deletes would be cut short when the pool shuts this process down.
+        wait_for_cleanup()
+    return result or {"extraction_results": [], "output_changes": None}
+
+
+def build_profiles(
+    profiles,
+    github_token=None,
+    on_conflict=CONFLICT_OVERWRITE,
+    max_parallel=None,
+    extract_in_place=EXTRACT_IN_PLACE,
+    progress=None,
+    cancel_event=None,
+):
+    """
+    Download the assets of several profiles once, then build every profile's Output in parallel.
+
+    The union of all entries is downloaded into the shared Downloads folder (and asset
+    store). Each profile then gets its own Downloads folder of links to the files it
+    selects, and is processed in a separate worker process into <build_dir>/Output.
+
+    :param profiles: Profiles from load_profiles.
+    :param github_token: GitHub Personal Access Token (optional).
+    :param on_conflict: How changed files already in a profile's Output are resolved; a build runs in
+                        another process, so this must be a policy name rather than a callable.
+    :param max_parallel: Number of profiles built at once (default: one per profile, up to the CPU count).
+    :param extract_in_place: Stream archive members straight into each Output.
+    :param progress: ProgressTracker that receives download progress and per-profile status (optional).
+    :param cancel_event: threading.Event that stops downloading and building when set (optional).
+    :return: Dict with the shared "downloads" results and "builds" keyed by profile name.
+    :raises TaskCancelled: If cancel_event was set.
+    """
+    purge_tombstones([profile["build_dir"] for profile in profiles])
+    download_results = start_download(
+        union_entries(profiles),
+        github_token,
+        output_dir=os.path.join(get_project_root(), DOWNLOADS_DIR_NAME),
+        progress=progress,
+        cancel_event=cancel_event,
+    )
+    if cancel_event is not None and cancel_event.is_set():
+        raise TaskCancelled()
+
+    cpu_count = os.cpu_count() or 1
+    max_parallel = max(1, min(max_parallel or cpu_count, len(profiles)))
+    # Share the cores between the builds instead of giving every build one worker per core.
+    extract_workers = max(1, cpu_count // max_parallel)
+
+    builds = {}
+    if progress is not None:
+        progress.set_stage("Building profiles")
+    with metrics.stage("build profiles"), multiprocessing.Manager() as manager, ProcessPoolExecutor(
+        max_workers=max_parallel
+    ) as executor:
+        # A plain threading.Event cannot reach the build processes, so cancellation is relayed.
+        build_cancel_event = manager.Event()
+        futures = {}
+        for profile in profiles:
+            link_profile_downloads(profile, download_results)
+            future = executor.submit(
+                _build_profile, profile, extract_in_place, on_conflict, extract_workers, build_cancel_event
+            )
+            futures[future] = profile
+            if progress is not None:
+                progress.set_asset_status(PROFILES_PROGRESS_GROUP, profile["name"], "building")
+
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, timeout=CANCEL_POLL_SECONDS, return_when=FIRST_COMPLETED)
+            if cancel_event is not None and cancel_event.is_set() and not build_cancel_event.is_set():
+                build_cancel_event.set()
+                for future in pending:
+                    future.cancel()
+            for future in done:
+                profile = futures[future]
+                name = profile["name"]
+                build = {"output_dir": os.path.join(profile["build_dir"], "Output")}
+                if future.cancelled():
+                    build.update(status="cancelled")
+                else:
+                    try:
+                        build.update(future.result(), status="done")
+                    except TaskCancelled:
+                        build.update(status="cancelled")
+                    except Exception as error:
+                        print(f"Failed to build profile '{name}': {error}")
+                        build.update(status="failed", error=str(error))
+                builds[name] = build
+                if progress is not None:
+                    progress.set_asset_status(PROFILES_PROGRESS_GROUP, name, build["status"])
+
+    if cancel_event is not None and cancel_event.is_set():
+        raise TaskCancelled()
+    return {"downloads": download_results, "builds": builds}
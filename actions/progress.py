@@ -0,0 +1,97 @@
+import threading
+import time
+
+
+class TaskCancelled(Exception):
+    """Raised inside a download or processing run when the user cancelled it."""
+
+
+def raise_if_cancelled(cancel_event):
+    if cancel_event is not None and cancel_event.is_set():
+        raise TaskCancelled()
+
+
+class ProgressTracker:
+    """
+    Thread-safe record of per-repo and per-asset progress for one run.
+
+    Worker threads report through the start/advance/finish methods, and the GUI
+    reads a snapshot from the main thread to draw it.
+    """
+
+    def __init__(self):
+        self.stage = ""
+        self._repos = {}
+        self._lock = threading.Lock()
+
+    def set_stage(self, stage):
+        with self._lock:
+            self.stage = stage
+
+    def _repo(self, repo):
+        return self._repos.setdefault(repo, {"status": "waiting", "assets": {}})
+
+    def set_repo_status(self, repo, status):
+        with self._lock:
+            self._repo(repo)["status"] = status
+
+    def start_asset(self, repo, name, total=0, initial=0):
+        """Start timing an asset transfer; initial is the size of a partial file being resumed."""
+        with self._lock:
+            self._repo(repo)["assets"][name] = {
+                "status": "downloading",
+                "bytes": initial,
+                "initial": initial,
+                "total": total or 0,
+                "started": time.monotonic(),
+                "finished": None,
+            }
+
+    def advance(self, repo, name, byte_count):
+        with self._lock:
+            asset = self._repo(repo)["assets"].get(name)
+            if asset is not None:
+                asset["bytes"] += byte_count
+
+    def set_asset_status(self, repo, name, status):
+        with self._lock:
+            asset = self._repo(repo)["assets"].setdefault(
+                name, {"bytes": 0, "initial": 0, "total": 0, "started": None, "finished": None}
+            )
+            asset["status"] = status
+            if status not in ("downloading", "queued") and asset["finished"] is None:
+                asset["finished"] = time.monotonic()
+
+    def snapshot(self):
+        """
+        Return the current progress of every repo and asset.
+
+        :return: List of {"repo", "status", "assets"} dicts; each asset has name, status, bytes,
+                 total, speed (bytes per second) and eta (seconds, or None when unknown).
+        """
+        now = time.monotonic()
+        with self._lock:
+            repos = []
+            for repo, repo_state in self._repos.items():
+                assets = []
+                for name, asset in repo_state["assets"].items():
+                    speed = 0.0
+                    if asset["started"] is not None:
+                        elapsed = (asset["finished"] or now) - asset["started"]
+                        if elapsed > 0:
+                            speed = (asset["bytes"] - asset["initial"]) / elapsed
+                    eta = None
+                    if asset["status"] == "downloading" and asset["total"] and speed > 0:
+                        eta = max(0.0, (asset["total"] - asset["bytes"]) / speed)
+                    assets.append(
+                        {
+                            "name": name,
+                            "status": asset["status"],
+                            "bytes": asset["bytes"],
+                            "total": asset["total"],
+                            "speed": speed,
+                            "eta": eta,
+                        }
+                    )
+                repos.append({"repo": repo, "status": repo_state["status"], "assets": assets})
+            return repos
@@ -0,0 +1,103 @@
+import tkinter as tk
+from tkinter import ttk
+
+# How often the window reads the task's progress, in milliseconds.
+POLL_INTERVAL_MS = 200
+
+
+def format_bytes(count):
+    for unit in ("B", "KB", "MB", "GB"):
+        if count < 1024 or unit == "GB":
+            return f"{count:.0f} {unit}" if unit == "B" else f"{count:.1f} {unit}"
+        count /= 1024
+
+
+def format_eta(seconds):
+    if seconds is None:
+        return ""
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes}:{seconds:02d}"
+
+
+class ProgressWindow(tk.Toplevel):
+    """
+    Shows the per-repo and per-asset progress of a BackgroundTask and lets the user cancel it.
+
+    The window polls the task with after(), runs any calls the worker thread
+    needs on the main thread, and calls on_done(task) once the task has finished.
+    """
+
+    def __init__(self, parent, task, title, on_done):
+        super().__init__(parent)
+        self.task = task
+        self.on_done = on_done
+        self._rows = {}
+
+        self.title(title)
+        self.geometry("640x320")
+        self.transient(parent)
+        self.protocol("WM_DELETE_WINDOW", self.cancel)
+
+        frame = ttk.Frame(self)
+        frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+
+        self.stage_label = ttk.Label(frame, text="Starting...")
+        self.stage_label.pack(anchor=tk.W, pady=(0, 5))
+
+        columns = ("status", "progress", "speed", "eta")
+        self.tree = ttk.Treeview(frame, columns=columns)
+        self.tree.heading("#0", text="Repository / Asset")
+        self.tree.heading("status", text="Status")
+        self.tree.heading("progress", text="Downloaded")
+        self.tree.heading("speed", text="Speed")
+        self.tree.heading("eta", text="ETA")
+        self.tree.column("#0", width=240)
+        for column, width in (("status", 90), ("progress", 140), ("speed", 80), ("eta", 60)):
+            self.tree.column(column, width=width, anchor=tk.E if column != "status" else tk.W)
+        self.tree.pack(fill=tk.BOTH, expand=True)
+
+        self.cancel_button = ttk.Button(frame, text="Cancel", command=self.cancel)
+        self.cancel_button.pack(pady=(10, 0))
+
+        self.after(POLL_INTERVAL_MS, self._poll)
+
+    def cancel(self):
+        if self.task.done:
+            return
+        self.task.cancel()
+        self.cancel_button.config(state=tk.DISABLED)
+        self.stage_label.config(text="Cancelling...")
+
+    def _row(self, key, parent, text):
+        item = self._rows.get(key)
+        if item is None:
+            item = self.tree.insert(parent, tk.END, text=text, open=True)
+            self._rows[key] = item
+        return item
+
+    def _refresh(self):
+        if not self.task.cancel_event.is_set():
+            self.stage_label.config(text=self.task.progress.stage or "Working...")
+        for repo in self.task.progress.snapshot():
+            repo_item = self._row(repo["repo"], "", repo["repo"])
+            repo_bytes = sum(asset["bytes"] for asset in repo["assets"])
+            self.tree.item(repo_item, values=(repo["status"], format_bytes(repo_bytes) if repo_bytes else "", "", ""))
+            for asset in repo["assets"]:
+                asset_item = self._row((repo["repo"], asset["name"]), repo_item, asset["name"])
+                progress_text = format_bytes(asset["bytes"]) if asset["bytes"] else ""
+                if asset["total"]:
+                    progress_text = f"{progress_text or '0 B'} / {format_bytes(asset['total'])}"
+                speed_text = f"{format_bytes(asset['speed'])}/s" if asset["speed"] else ""
+                self.tree.item(
+                    asset_item, values=(asset["status"], progress_text, speed_text, format_eta(asset["eta"]))
+                )
+
+    def _poll(self):
+        self.task.run_main_thread_calls()
+        self._refresh()
+        if not self.task.done:
+            self.after(POLL_INTERVAL_MS, self._poll)
+            return
+        self.destroy()
+        self.on_done(self.task)
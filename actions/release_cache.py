@@ -0,0 +1,157 @@
+import json
+import os
+import threading
+import time
+
+from actions.config import get_project_root
+
+CACHE_DIR_NAME = ".cache"
+RELEASE_CACHE_FILE_NAME = "release_cache.json"
+# Inside this window cached release metadata is used without contacting GitHub at all.
+RELEASE_CACHE_TTL_SECONDS = 10 * 60
+RELEASE_CACHE_MAX_ENTRIES = 200
+
+# Only the fields the downloader reads are persisted, which keeps the cache file small.
+_CACHED_ASSET_FIELDS = ("id", "name", "size", "updated_at", "digest", "browser_download_url")
+
+
+def get_release_cache_path():
+    """Return the absolute path to the release metadata cache file."""
+    return os.path.join(get_project_root(), CACHE_DIR_NAME, RELEASE_CACHE_FILE_NAME)
+
+
+def trim_release_data(release_data):
+    """Reduce a GitHub release payload to the fields used for downloading."""
+    return {
+        "tag_name": release_data.get("tag_name"),
+        "assets": [
+            {field: asset.get(field) for field in _CACHED_ASSET_FIELDS}
+            for asset in release_data.get("assets", [])
+        ],
+    }
+
+
+class ReleaseCache:
+    """
+    Persistent cache of release metadata keyed by repository.
+
+    Each entry keeps the validators (ETag / Last-Modified) returned by GitHub
+    so that stale entries can be revalidated with a conditional request.
+    """
+
+    def __init__(self, path=None, ttl_seconds=RELEASE_CACHE_TTL_SECONDS, max_entries=RELEASE_CACHE_MAX_ENTRIES):
+        self.path = path or get_release_cache_path()
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries = None
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._entries is not None:
+            return self._entries
+        self._entries = {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "r") as cache_file:
+                    data = json.load(cache_file)
+                if isinstance(data, dict):
+                    self._entries = data
+            except (OSError, ValueError) as error:
+                print(f"Ignoring unreadable release cache '{self.path}': {error}")
+        return self._entries
+
+    def get(self, key):
+        """Return the cached entry for key, or None."""
+        with self._lock:
+            entry = self._load().get(key)
+            if entry is not None:
+                entry["last_used"] = time.time()
+                self._dirty = True
+            return entry
+
+    def is_fresh(self, entry):
+        """Return True if entry is young enough to skip revalidation."""
+        return entry is not None and time.time() - entry.get("fetched_at", 0) < self.ttl_seconds
+
+    @staticmethod
+    def conditional_headers(entry):
+        """Return the request headers that revalidate entry."""
+        headers = {}
+        if entry is None:
+            return headers
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def store(self, key, release_data, etag=None, last_modified=None):
+        """Cache freshly fetched release data and return the stored entry."""
+        now = time.time()
+        entry = {
+            "etag": etag,
+            "last_modified": last_modified,
+            "fetched_at": now,
+            "last_used": now,
+            "release": trim_release_data(release_data),
+        }
+        with self._lock:
+            entries = self._load()
+            entries[key] = entry
+            self._evict(entries)
+            self._dirty = True
+        return entry
+
+    def touch(self, key):
+        """Mark an entry as revalidated (e.g. after a 304 response)."""
+        with self._lock:
+            entry = self._load().get(key)
+            if entry is not None:
+                entry["fetched_at"] = entry["last_used"] = time.time()
+                self._dirty = True
+            return entry
+
+    def _evict(self, entries):
+        overflow = len(entries) - self.max_entries
+        if overflow <= 0:
+            return
+        least_recent = sorted(entries, key=lambda cache_key: entries[cache_key].get("last_used", 0))
+        for cache_key in least_recent[:overflow]:
+            del entries[cache_key]
+
+    def invalidate(self, key=None):
+        """Drop one entry, or every entry when key is None."""
+        with self._lock:
+            entries = self._load()
+            if key is None:
+                entries.clear()
+            else:
+                entries.pop(key, None)
+            self._dirty = True
+
+    def save(self):
+        """Write the cache to disk if it changed."""
+        with self._lock:
+            if not self._dirty or self._entries is None:
+                return
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            temp_path = f"{self.path}.tmp"
+            with open(temp_path, "w") as cache_file:
+                json.dump(self._entries, cache_file)
+            os.replace(temp_path, self.path)
+            self._dirty = False
+
+
+def clear_release_cache():
+    """Forget all cached release metadata."""
+    cache = ReleaseCache()
+    cache.invalidate()
+    cache.save()
+
+
+def clear_release_cache_action():
+    import tkinter.messagebox as messagebox
+
+    clear_release_cache()
+    messagebox.showinfo("Clear Release Cache", "Cached release information has been cleared.")
@@ -0,0 +1,157 @@
+import fnmatch
+import os
+import re
+
+# GitHub owner and repository names only use these characters, which leaves "@", "+" and ":" free as separators.
+REPO_NAME_RE = re.compile(r"^[A-Za-z0-9](?:[A-Za-z0-9-]*[A-Za-z0-9])?/[A-Za-z0-9._-]+$")
+PATTERN_SEPARATOR = ";"
+REGEX_PREFIX = "re:"
+EXCLUDE_PREFIX = "!"
+PRERELEASE_SUFFIX = "+pre"
+
+
+class ConfigError(ValueError):
+    """Raised when config entries are malformed or duplicated."""
+
+
+class AssetMatcher:
+    """
+    Precompiled asset-name filter parsed from one entry's pattern text.
+
+    The text is a ";"-separated list of shell-style wildcards. A "re:" prefix
+    makes a part a regular expression (searched, not anchored), and a "!" prefix
+    makes it an exclude. Without includes every asset matches; excludes always
+    win. Wildcards follow fnmatch, so they are case-insensitive only where file
+    names are (Windows).
+    """
+
+    __slots__ = ("text", "_includes", "_excludes")
+
+    def __init__(self, text=None):
+        """
+        :param text: Pattern text, or None to match every asset.
+        :raises ConfigError: If a part is empty or a regular expression does not compile.
+        """
+        self.text = text
+        self._includes = []
+        self._excludes = []
+        if not text:
+            return
+        for part in text.split(PATTERN_SEPARATOR):
+            part = part.strip()
+            target = self._includes
+            if part.startswith(EXCLUDE_PREFIX):
+                target = self._excludes
+                part = part[len(EXCLUDE_PREFIX):].strip()
+            if not part:
+                raise ConfigError(f"Empty pattern in '{text}'.")
+            target.append(self._compile(part))
+
+    @staticmethod
+    def _compile(part):
+        if part.startswith(REGEX_PREFIX):
+            try:
+                return re.compile(part[len(REGEX_PREFIX):]).search
+            except re.error as error:
+                raise ConfigError(f"Invalid regular expression '{part}': {error}") from error
+        return re.compile(fnmatch.translate(os.path.normcase(part))).match
+
+    def matches(self, asset_name):
+        normalized = os.path.normcase(asset_name)
+        if self._includes and not any(match(normalized) for match in self._includes):
+            return False
+        return not any(match(normalized) for match in self._excludes)
+
+
+class RepoEntry:
+    """
+    One parsed config.txt line: "owner/repo[@tag][+pre][:patterns]".
+
+    "@tag" pins a release instead of following the latest one, and "+pre" lets
+    the newest pre-release count as the latest release. Entries for the same
+    release can be merged, in which case an asset is wanted when any of the
+    merged patterns matches it.
+    """
+
+    __slots__ = ("repo", "tag", "prerelease", "pattern", "_matchers")
+
+    def __init__(self, repo, pattern=None, tag=None, prerelease=False, matchers=None):
+        self.repo = repo
+        self.pattern = pattern
+        self.tag = tag
+        self.prerelease = prerelease
+        self._matchers = tuple(matchers) if matchers is not None else (AssetMatcher(pattern),)
+
+    @classmethod
+    def parse(cls, line):
+        """
+        Parse and validate one config line.
+
+        :raises ConfigError: If the repository name, tag or pattern is malformed.
+        """
+        source, separator, pattern = line.strip().partition(":")
+        pattern = pattern.strip() if separator else None
+        source = source.strip()
+        prerelease = False
+        tag = None
+        if "@" in source:
+            source, tag = (part.strip() for part in source.split("@", 1))
+        if source.endswith(PRERELEASE_SUFFIX):
+            source = source[: -len(PRERELEASE_SUFFIX)]
+            prerelease = True
+        if not REPO_NAME_RE.match(source):
+            raise ConfigError(f"'{line.strip()}': '{source}' is not an owner/repo name.")
+        if tag is not None and not tag:
+            raise ConfigError(f"'{line.strip()}': the tag after '@' is empty.")
+        if prerelease and tag is not None:
+            raise ConfigError(f"'{line.strip()}': a pinned tag cannot also ask for pre-releases.")
+        return cls(source, pattern or None, tag, prerelease)
+
+    @classmethod
+    def merge(cls, entries):
+        """Combine entries for the same release into one entry that wants every asset any of them wants."""
+        first = entries[0]
+        if len(entries) == 1:
+            return first
+        patterns = [entry.pattern for entry in entries]
+        pattern = None if None in patterns else " | ".join(dict.fromkeys(patterns))
+        matchers = [matcher for entry in entries for matcher in entry._matchers]
+        return cls(first.repo, pattern, first.tag, first.prerelease, matchers)
+
+    @property
+    def release_key(self):
+        """Identifies the release this entry follows; also its release cache key."""
+        if self.tag is not None:
+            return f"{self.repo}@{self.tag}"
+        if self.prerelease:
+            return f"{self.repo}{PRERELEASE_SUFFIX}"
+        return self.repo
+
+    @property
+    def key(self):
+        """Two entries with the same key download the same files."""
+        return (self.repo.lower(), self.tag, self.prerelease, self.pattern)
+
+    def matches(self, asset_name):
+        return any(matcher.matches(asset_name) for matcher in self._matchers)
+
+    def __eq__(self, other):
+        return isinstance(other, RepoEntry) and self.key == other.key
+
+    def __hash__(self):
+        return hash(self.key)
+
+    def __str__(self):
+        text = self.release_key
+        return f"{text}:{self.pattern}" if self.pattern else text
+
+    def __repr__(self):
+        return f"RepoEntry({str(self)!r})"
+
+
+def merge_entries(entries):
+    """Merge entries that follow the same release, keeping the order in which releases first appear."""
+    groups = {}
+    for entry in entries:
+        groups.setdefault((entry.repo.lower(), entry.tag, entry.prerelease), []).append(entry)
+    return [RepoEntry.merge(group) for group in groups.values()]
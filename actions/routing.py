@@ -0,0 +1,260 @@
+import fnmatch
+import json
+import os
+import re
+from collections import namedtuple
+
+from actions.config import get_project_root
+
+ROUTING_RULES_FILE_NAME = "routing.json"
+
+# Rules are checked in order and the first match wins.
+#   extension / glob: applied to files in Downloads; action is "copy", "extract" or "ignore".
+#   folder: applied to folders inside extracted archives; their contents are merged into dest.
+# dest is relative to the Output directory.
+DEFAULT_ROUTING_RULES = [
+    {"match": "extension", "pattern": ".nro", "action": "copy", "dest": "switch"},
+    {"match": "extension", "pattern": ".ovl", "action": "copy", "dest": "switch/.overlays"},
+    {"match": "extension", "pattern": ".zip", "action": "extract"},
+    {"match": "extension", "pattern": ".7z", "action": "extract"},
+    {"match": "folder", "pattern": "atmosphere", "dest": "atmosphere"},
+    {"match": "folder", "pattern": "switch", "dest": "switch"},
+    {"match": "folder", "pattern": "bootloader", "dest": "bootloader"},
+]
+# Where an extracted archive without any recognised folder goes; {name} is the archive name.
+DEFAULT_UNMATCHED_ARCHIVE_DEST = "switch/{name}"
+
+_FILE_MATCH_TYPES = {"extension", "glob"}
+_FILE_ACTIONS = {"copy", "extract", "ignore"}
+
+# One unit of work in a routing plan.
+#   copy_file:      copy the file src to dest
+#   extract:        extract the archive src into the folder dest
+#                   (in preview_processing, src is a member inside the archive and dest its Output path)
+#   merge_contents: merge every item inside the folder src into the folder dest
+#   move:           move or merge src into dest
+#   copy_tree:      copy or merge src into dest
+#   copy_unmatched: copy or merge an extracted archive without recognised folders into dest
+#   rmdir:          remove the folder src if it is empty
+PlanStep = namedtuple("PlanStep", ["action", "src", "dest"])
+
+
+class RoutingRules:
+    """Precompiled routing rules used to classify downloads and extracted folders."""
+
+    def __init__(self, rules=None, unmatched_archive_dest=DEFAULT_UNMATCHED_ARCHIVE_DEST):
+        self.rules = list(DEFAULT_ROUTING_RULES if rules is None else rules)
+        self.unmatched_archive_dest = unmatched_archive_dest
+        self._file_rules = []
+        self._folder_dests = {}
+        for index, rule in enumerate(self.rules):
+            self._compile(index, rule)
+
+    def _compile(self, index, rule):
+        match_type = rule.get("match")
+        pattern = rule.get("pattern")
+        if not pattern:
+            raise ValueError(f"Routing rule {index + 1} has no pattern.")
+
+        if match_type == "folder":
+            if not rule.get("dest"):
+                raise ValueError(f"Routing rule {index + 1} ({pattern}) has no dest.")
+            self._folder_dests.setdefault(pattern, rule["dest"])
+            return
+
+        if match_type not in _FILE_MATCH_TYPES:
+            raise ValueError(f"Routing rule {index + 1} has unknown match type '{match_type}'.")
+        action = rule.get("action", "copy")
+        if action not in _FILE_ACTIONS:
+            raise ValueError(f"Routing rule {index + 1} ({pattern}) has unknown action '{action}'.")
+        if action == "copy" and not rule.get("dest"):
+            raise ValueError(f"Routing rule {index + 1} ({pattern}) has no dest.")
+
+        if match_type == "extension":
+            extension = pattern.lower() if pattern.startswith(".") else f".{pattern.lower()}"
+            matcher = lambda name, extension=extension: name.lower().endswith(extension)
+        else:
+            matcher = re.compile(fnmatch.translate(pattern), re.IGNORECASE).match
+        self._file_rules.append((matcher, dict(rule, action=action)))
+
+    def match_file(self, name):
+        """Return the first file rule matching name, or None."""
+        for matcher, rule in self._file_rules:
+            if matcher(name):
+                return rule
+        return None
+
+    def folder_dest(self, name):
+        """Return the Output-relative destination for a recognised folder name, or None."""
+        return self._folder_dests.get(name)
+
+    def unmatched_dest(self, archive_name):
+        return self.unmatched_archive_dest.format(name=archive_name)
+
+
+def get_routing_rules_path():
+    return os.path.join(get_project_root(), ROUTING_RULES_FILE_NAME)
+
+
+def load_routing_rules(path=None):
+    """
+    Load routing rules from routing.json, falling back to the built-in rules.
+
+    The file holds either a list of rules or an object with "rules" and an
+    optional "unmatched_archive_dest".
+
+    :raises ValueError: If the file exists but does not contain valid rules.
+    """
+    path = path or get_routing_rules_path()
+    if not os.path.exists(path):
+        return RoutingRules()
+
+    with open(path, "r") as rules_file:
+        try:
+            data = json.load(rules_file)
+        except ValueError as error:
+            raise ValueError(f"Routing rules file '{path}' is not valid JSON: {error}") from error
+    if isinstance(data, list):
+        return RoutingRules(data)
+    if isinstance(data, dict) and isinstance(data.get("rules"), list):
+        return RoutingRules(data["rules"], data.get("unmatched_archive_dest", DEFAULT_UNMATCHED_ARCHIVE_DEST))
+    raise ValueError(f"Routing rules file '{path}' must contain a list of rules.")
+
+
+def plan_downloads(downloads_dir, output_dir, processing_dir, rules):
+    """Classify every file in downloads_dir in a single scandir pass."""
+    plan = []
+    with os.scandir(downloads_dir) as entries:
+        for entry in entries:
+            if not entry.is_file():
+                continue
+            rule = rules.match_file(entry.name)
+            if rule is None or rule["action"] == "ignore":
+                continue
+            if rule["action"] == "copy":
+                plan.append(PlanStep("copy_file", entry.path, os.path.join(output_dir, rule["dest"], entry.name)))
+            else:
+                extract_dir = os.path.join(processing_dir, os.path.splitext(entry.name)[0])
+                plan.append(PlanStep("extract", entry.path, extract_dir))
+    return plan
+
+
+def _scan_tree(path, rules, matches, empty_dirs):
+    """
+    Walk an extracted tree once, recording recognised folders and empty folders.
+
+    Recognised folders are not descended into, so the outermost match wins.
+
+    :return: True if the folder holds any file or recognised folder.
+    """
+    has_content = False
+    with os.scandir(path) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                dest = rules.folder_dest(entry.name)
+                if dest is not None:
+                    matches.append((entry.path, dest))
+                    has_content = True
+                elif _scan_tree(entry.path, rules, matches, empty_dirs):
+                    has_content = True
+                else:
+                    empty_dirs.append(entry.path)
+            else:
+                has_content = True
+    return has_content
+
+
+def plan_processing(processing_dir, output_dir, rules):
+    """
+    Plan how every extracted archive in processing_dir is merged into output_dir.
+
+    Archives containing a recognised folder have those folders merged into their
+    destination and their remaining top-level items moved into Output. Archives
+    without one are copied to the unmatched-archive destination.
+    """
+    matched_steps = []
+    unmatched_steps = []
+    with os.scandir(processing_dir) as trees:
+        for tree in trees:
+            if not tree.is_dir():
+                continue
+            matches = []
+            empty_dirs = []
+            has_content = _scan_tree(tree.path, rules, matches, empty_dirs)
+            if not has_content:
+                unmatched_steps.extend(PlanStep("rmdir", path, None) for path in empty_dirs + [tree.path])
+            elif matches:
+                for src, dest in matches:
+                    matched_steps.append(PlanStep("merge_contents", src, os.path.join(output_dir, dest)))
+                with os.scandir(tree.path) as top_level:
+                    for entry in top_level:
+                        matched_steps.append(PlanStep("move", entry.path, os.path.join(output_dir, entry.name)))
+                matched_steps.append(PlanStep("rmdir", tree.path, None))
+            else:
+                unmatched_steps.extend(PlanStep("rmdir", path, None) for path in empty_dirs)
+                unmatched_steps.append(
+                    PlanStep("copy_unmatched", tree.path, os.path.join(output_dir, rules.unmatched_dest(tree.name)))
+                )
+    return matched_steps + unmatched_steps
+
+
+def plan_persistent(persistent_dir, output_dir):
+    """Plan copying every item of the Persistent folder into output_dir."""
+    if not os.path.isdir(persistent_dir):
+        return []
+    with os.scandir(persistent_dir) as entries:
+        return [PlanStep("copy_tree", entry.path, os.path.join(output_dir, entry.name)) for entry in entries]
+
+
+def format_plan(plan):
+    """Return a readable line per plan step."""
+    return [f"{step.action}: {step.src}" + (f" -> {step.dest}" if step.dest else "") for step in plan]
+
+
+def plan_archive_members(members, archive_name, output_dir, rules, folders=None):
+    """
+    Map every file inside an archive straight to its final path under output_dir.
+
+    Uses the same rules as plan_processing: files below a recognised folder go
+    to that folder's destination, other files of an archive with a recognised
+    folder go to the Output root, and archives without one go to the
+    unmatched-archive destination.
+
+    :param members: (name, is_dir) pairs from the archive's member list.
+    :param archive_name: Archive name without extension.
+    :param folders: List that receives the destination of every directory entry in a recognised
+                    folder, so empty ones (e.g. atmosphere/contents/<id>/flags) are created too (optional).
+    :return: Dict mapping member names to destination paths. Directory entries and
+             unsafe names (absolute or containing "..") are left out.
+    """
+    destinations = {}
+    unmatched = []
+    has_match = False
+    for name, is_dir in members:
+        normalized = name.replace("\\", "/")
+        parts = [part for part in normalized.split("/") if part not in ("", ".")]
+        if not parts or ".." in parts or normalized.startswith("/") or ":" in parts[0]:
+            continue
+
+        folder_parts = parts if is_dir else parts[:-1]
+        match = None
+        for index, part in enumerate(folder_parts):
+            dest = rules.folder_dest(part)
+            if dest is not None:
+                match = (index, dest)
+                break
+
+        if match is not None:
+            has_match = True
+            index, dest = match
+            if not is_dir:
+                destinations[name] = os.path.join(output_dir, dest, *parts[index + 1:])
+            elif folders is not None:
+                folders.append(os.path.join(output_dir, dest, *parts[index + 1:]))
+        elif not is_dir:
+            unmatched.append((name, parts))
+
+    unmatched_root = output_dir if has_match else os.path.join(output_dir, rules.unmatched_dest(archive_name))
+    for name, parts in unmatched:
+        destinations[name] = os.path.join(unmatched_root, *parts)
+    return destinations
@@ -0,0 +1,290 @@
+import json
+import os
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from actions import metrics
+from actions.config import get_project_root
+from actions.output_index import fast_hash_file
+from actions.progress import raise_if_cancelled
+
+# Written to the target root; lists the files this tool placed there so stale ones can be removed safely.
+SYNC_STATE_FILE_NAME = ".switch-updater-sync.json"
+SYNC_WORKERS = 4
+# Written files are flushed to the card in batches of this many instead of one at a time.
+FSYNC_BATCH_SIZE = 32
+# FAT32 stores modification times with a two-second resolution.
+MTIME_TOLERANCE_SECONDS = 2
+# Progress of a sync is shown as one row, "Output", under this name.
+SYNC_PROGRESS_GROUP = "SD card"
+
+
+def _scan_files(root, prefix=""):
+    """Return {relative path: os.stat_result} for every file below root, using one scandir per folder."""
+    files = {}
+    with os.scandir(root) as entries:
+        for entry in entries:
+            rel_path = f"{prefix}{entry.name}"
+            if entry.is_dir(follow_symlinks=False):
+                files.update(_scan_files(entry.path, f"{rel_path}/"))
+            elif entry.is_file(follow_symlinks=False):
+                files[rel_path] = entry.stat()
+    return files
+
+
+def _target_path(target_dir, rel_path):
+    return os.path.join(target_dir, *rel_path.split("/"))
+
+
+def _load_sync_state(target_dir):
+    state_path = os.path.join(target_dir, SYNC_STATE_FILE_NAME)
+    if not os.path.exists(state_path):
+        return {}
+    try:
+        with open(state_path, "r") as state_file:
+            data = json.load(state_file)
+        return data if isinstance(data, dict) else {}
+    except (OSError, ValueError) as error:
+        print(f"Ignoring unreadable sync state '{state_path}': {error}")
+        return {}
+
+
+def _save_sync_state(target_dir, state):
+    state_path = os.path.join(target_dir, SYNC_STATE_FILE_NAME)
+    temp_path = f"{state_path}.tmp"
+    with open(temp_path, "w") as state_file:
+        json.dump(state, state_file, indent=1, sort_keys=True)
+    os.replace(temp_path, state_path)
+
+
+def _fsync_paths(paths):
+    for path in paths:
+        try:
+            fd = os.open(path, os.O_RDONLY)
+        except OSError:
+            continue
+        try:
+            os.fsync(fd)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+
+
+class _FsyncBatcher:
+    """Collects written files and flushes them to disk in batches."""
+
+    def __init__(self, batch_size):
+        self.batch_size = max(1, batch_size)
+        self._pending = []
+        self._lock = threading.Lock()
+
+    def add(self, path):
+        with self._lock:
+            self._pending.append(path)
+            if len(self._pending) < self.batch_size:
+                return
+            batch, self._pending = self._pending, []
+        _fsync_paths(batch)
+
+    def flush(self):
+        with self._lock:
+            batch, self._pending = self._pending, []
+        _fsync_paths(batch)
+
+
+def _is_unchanged(src_stat, dest_stat, src_path, dest_path, recorded):
+    """Compare by size and mtime first, then by content hash when only the mtime differs."""
+    if dest_stat is None or src_stat.st_size != dest_stat.st_size:
+        return False
+    if abs(src_stat.st_mtime - dest_stat.st_mtime) <= MTIME_TOLERANCE_SECONDS:
+        return True
+    src_hash = fast_hash_file(src_path)
+    if recorded and recorded.get("size") == dest_stat.st_size and recorded.get("mtime") == dest_stat.st_mtime:
+        # The card copy has not been touched since this tool wrote it.
+        return recorded.get("hash") == src_hash
+    return fast_hash_file(dest_path) == src_hash
+
+
+def _copy_file(src_path, dest_path, batcher, cancel_event=None):
+    # Copies still queued when the sync is cancelled are skipped; one already running finishes.
+    raise_if_cancelled(cancel_event)
+    os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+    temp_path = f"{dest_path}.part"
+    shutil.copy2(src_path, temp_path)
+    os.replace(temp_path, dest_path)
+    batcher.add(dest_path)
+    return os.stat(dest_path)
+
+
+def _remove_empty_parents(path, stop_dir):
+    parent = os.path.dirname(path)
+    stop_dir = os.path.abspath(stop_dir)
+    while os.path.abspath(parent) != stop_dir and parent.startswith(stop_dir):
+        try:
+            os.rmdir(parent)
+        except OSError:
+            return
+        parent = os.path.dirname(parent)
+
+
+def sync_output_to_target(
+    source_dir,
+    target_dir,
+    delete_stale=False,
+    max_workers=SYNC_WORKERS,
+    fsync_batch_size=FSYNC_BATCH_SIZE,
+    dry_run=False,
+    progress=None,
+    cancel_event=None,
+):
+    """
+    Copy only new or changed files from source_dir (normally Output) to target_dir (e.g. an SD card root).
+
+    Files are compared by size and mtime, then by content hash when only the
+    mtime differs. Changed files are written by parallel workers and flushed in
+    batches. Stale files are only ever removed if an earlier sync placed them,
+    according to the sync state file kept in target_dir, so unrelated data on
+    the card is never touched.
+
+    :param delete_stale: Remove files an earlier sync copied that source_dir no longer contains.
+    :param dry_run: Only report what would change.
+    :param progress: ProgressTracker that receives the stage and the bytes copied (optional).
+    :param cancel_event: threading.Event that stops the sync between files when set; files
+                         already copied stay, and the sync state file is left as it was (optional).
+    :return: Dict with "copied", "removed", "kept_modified" and "errors" path lists, plus
+             "unchanged" and "bytes" counts.
+    :raises TaskCancelled: If cancel_event was set.
+    """
+    if progress is not None:
+        progress.set_stage("Comparing files")
+    source_files = _scan_files(source_dir)
+    state = _load_sync_state(target_dir)
+    report = {"copied": [], "unchanged": 0, "removed": [], "kept_modified": [], "errors": [], "bytes": 0}
+
+    to_copy = []
+    new_state = {}
+    for rel_path, src_stat in sorted(source_files.items()):
+        raise_if_cancelled(cancel_event)
+        src_path = os.path.join(source_dir, *rel_path.split("/"))
+        dest_path = _target_path(target_dir, rel_path)
+        try:
+            dest_stat = os.stat(dest_path)
+        except OSError:
+            dest_stat = None
+        if _is_unchanged(src_stat, dest_stat, src_path, dest_path, state.get(rel_path)):
+            report["unchanged"] += 1
+            recorded = state.get(rel_path) or {}
+            new_state[rel_path] = {"size": dest_stat.st_size, "mtime": dest_stat.st_mtime, "hash": recorded.get("hash")}
+        else:
+            to_copy.append((rel_path, src_path, dest_path, src_stat))
+
+    stale = sorted(set(state) - set(source_files))
+
+    if dry_run:
+        report["copied"] = [rel_path for rel_path, _, _, _ in to_copy]
+        report["bytes"] = sum(src_stat.st_size for _, _, _, src_stat in to_copy)
+        report["removed"] = stale if delete_stale else []
+        return report
+
+    os.makedirs(target_dir, exist_ok=True)
+    if progress is not None:
+        progress.set_stage("Copying to SD card")
+        progress.start_asset(SYNC_PROGRESS_GROUP, "Output", sum(src_stat.st_size for _, _, _, src_stat in to_copy))
+    batcher = _FsyncBatcher(fsync_batch_size)
+    with metrics.stage("sync"), ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="sync") as executor:
+        futures = {
+            executor.submit(_copy_file, src_path, dest_path, batcher, cancel_event): (rel_path, src_path, src_stat)
+            for rel_path, src_path, dest_path, src_stat in to_copy
+        }
+        try:
+            for future, (rel_path, src_path, src_stat) in futures.items():
+                try:
+                    dest_stat = future.result()
+                except OSError as error:
+                    print(f"Failed to copy {rel_path}: {error}")
+                    report["errors"].append(rel_path)
+                    continue
+                report["copied"].append(rel_path)
+                report["bytes"] += src_stat.st_size
+                if progress is not None:
+                    progress.advance(SYNC_PROGRESS_GROUP, "Output", src_stat.st_size)
+                new_state[rel_path] = {
+                    "size": dest_stat.st_size,
+                    "mtime": dest_stat.st_mtime,
+                    "hash": fast_hash_file(src_path),
+                }
+                print(f"Synced: {rel_path}")
+        finally:
+            batcher.flush()
+    metrics.add("sync", report["bytes"], len(report["copied"]))
+    if progress is not None:
+        progress.set_asset_status(SYNC_PROGRESS_GROUP, "Output", "done")
+
+    for rel_path in stale:
+        raise_if_cancelled(cancel_event)
+        dest_path = _target_path(target_dir, rel_path)
+        if not delete_stale:
+            if os.path.exists(dest_path):
+                new_state[rel_path] = state[rel_path]
+            continue
+        try:
+            dest_stat = os.stat(dest_path)
+        except OSError:
+            continue
+        if dest_stat.st_size != state[rel_path].get("size"):
+            # Modified on the card since it was synced; leave it alone.
+            report["kept_modified"].append(rel_path)
+            continue
+        try:
+            os.remove(dest_path)
+            _remove_empty_parents(dest_path, target_dir)
+            report["removed"].append(rel_path)
+            print(f"Removed stale file: {rel_path}")
+        except OSError as error:
+            print(f"Failed to remove {rel_path}: {error}")
+            report["errors"].append(rel_path)
+
+    _save_sync_state(target_dir, new_state)
+    _fsync_paths([os.path.join(target_dir, SYNC_STATE_FILE_NAME)])
+    return report
+
+
+def ask_sync_target():
+    """
+    Ask where Output should be synced to; runs on the Tk main thread.
+
+    :return: (output_dir, target_dir, delete_stale), or None if there is nothing to sync or the user cancelled.
+    """
+    import tkinter.filedialog as filedialog
+    import tkinter.messagebox as messagebox
+
+    output_dir = os.path.join(get_project_root(), "Output")
+    if not os.path.isdir(output_dir) or not os.listdir(output_dir):
+        messagebox.showinfo("Sync to SD Card", "Output is empty. Process downloads first.")
+        return None
+
+    target_dir = filedialog.askdirectory(title="Select the SD card (or target folder)")
+    if not target_dir:
+        return None
+
+    delete_stale = messagebox.askyesno(
+        "Sync to SD Card",
+        "Remove files that an earlier sync copied but that are no longer in Output?",
+    )
+    return output_dir, target_dir, delete_stale
+
+
+def report_sync_result(report):
+    """Show the outcome of sync_output_to_target in a dialog."""
+    import tkinter.messagebox as messagebox
+
+    message = (
+        f"Copied {len(report['copied'])} file(s), {report['unchanged']} unchanged, "
+        f"removed {len(report['removed'])} stale file(s)."
+    )
+    if report["errors"]:
+        messagebox.showwarning("Sync to SD Card", message + "\n\nFailed:\n" + "\n".join(report["errors"]))
+    else:
+        messagebox.showinfo("Sync to SD Card", message)
@@ -0,0 +1,103 @@
+import os
+import shutil
+import tempfile
+
+import py7zr.io
+
+from actions.output_index import new_fast_hash
+
+
+class DirectWriter(py7zr.io.Py7zIO):
+    """
+    Writes one 7z member to a temporary file next to its final destination, hashing it as it goes.
+
+    The file is opened on the first write and closed as soon as py7zr finishes the
+    member, so only one member file is open at a time however large the archive is.
+    With current_hash, the member is spooled instead and only written out if its
+    hash differs; otherwise "unchanged" is set and no file is created.
+    """
+
+    def __init__(self, dest_path, temp_suffix=".part", current_hash=None, spool_bytes=0):
+        self.dest_path = dest_path
+        self.temp_path = f"{dest_path}{temp_suffix}"
+        self.current_hash = current_hash
+        self.unchanged = False
+        self._spool_bytes = spool_bytes
+        self._file = None
+        self._closed = False
+        self._size = 0
+        self._digest = new_fast_hash()
+
+    def _open(self):
+        if self._file is None:
+            if self.current_hash is not None:
+                self._file = tempfile.SpooledTemporaryFile(self._spool_bytes)
+            else:
+                os.makedirs(os.path.dirname(self.dest_path), exist_ok=True)
+                self._file = open(self.temp_path, "wb")
+        return self._file
+
+    def write(self, s):
+        self._size += len(s)
+        self._digest.update(s)
+        return self._open().write(s)
+
+    def read(self, size=None):
+        return b""
+
+    def seek(self, offset, whence=0):
+        # py7zr rewinds each member before closing it; nothing is read back.
+        if self._file is None or self._file.closed:
+            return 0
+        return self._file.seek(offset, whence)
+
+    def flush(self):
+        if self._file is not None and not self._file.closed:
+            self._file.flush()
+
+    def size(self):
+        return self._size
+
+    def hexdigest(self):
+        return self._digest.hexdigest()
+
+    def close(self):
+        """Called by py7zr when the member is complete; empty members still get their file."""
+        if self._closed:
+            return
+        self._closed = True
+        if self.current_hash is None:
+            self._open().close()
+            return
+        with self._open() as spool:
+            if self.hexdigest() == self.current_hash:
+                self.unchanged = True
+                return
+            spool.seek(0)
+            os.makedirs(os.path.dirname(self.dest_path), exist_ok=True)
+            with open(self.temp_path, "wb") as temp_file:
+                shutil.copyfileobj(spool, temp_file, 1024 * 1024)
+
+    def discard(self):
+        self._closed = True
+        if self._file is not None:
+            self._file.close()
+        if os.path.exists(self.temp_path):
+            os.remove(self.temp_path)
+
+
+class DirectWriterFactory(py7zr.io.WriterFactory):
+    def __init__(self, destinations, temp_suffix=".part", current_hashes=None, spool_bytes=0):
+        self.destinations = destinations
+        self.temp_suffix = temp_suffix
+        self.current_hashes = current_hashes or {}
+        self.spool_bytes = spool_bytes
+        self.writers = []
+
+    def create(self, filename):
+        dest_path = self.destinations.get(filename)
+        if dest_path is None:
+            return py7zr.io.NullIO()
+        writer = DirectWriter(dest_path, self.temp_suffix, self.current_hashes.get(dest_path), self.spool_bytes)
+        self.writers.append(writer)
+        return writer
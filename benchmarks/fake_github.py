@@ -0,0 +1,267 @@
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import quote, unquote, urlparse
+
+# Bytes written per socket write; bandwidth throttling sleeps between these.
+WRITE_CHUNK_SIZE = 16 * 1024
+
+
+class FakeGitHub:
+    """
+    Local stand-in for the GitHub API and release-asset host.
+
+    Serves repos/<owner>/<repo>/releases/latest, releases/tags/<tag> and the
+    release list (with ETag revalidation), the batched GraphQL latest-release
+    query, and asset downloads with Range
+    support. Knobs add response latency, cap bandwidth per response, and inject
+    error responses. Request counts are kept in stats.
+
+    Point the updater at it with GITHUB_API_URL=<base_url>.
+    """
+
+    def __init__(
+        self, latency=0.0, bandwidth=None, error_rate=0.0, error_status=503, retry_after=0, corrupt_rate=0.0, seed=0
+    ):
+        """
+        :param latency: Seconds to wait before answering any request.
+        :param bandwidth: Bytes per second per asset response, or None for unthrottled.
+        :param error_rate: Fraction of requests (0-1) answered with error_status instead.
+        :param retry_after: Retry-After seconds sent with injected errors, or None to omit the header.
+        :param corrupt_rate: Fraction of asset responses (0-1) sent with one byte flipped.
+        """
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.error_rate = error_rate
+        self.corrupt_rate = corrupt_rate
+        self.error_status = error_status
+        self.retry_after = retry_after
+        self._random = random.Random(seed)
+        self._releases = {}
+        self._assets = {}
+        self._lock = threading.Lock()
+        self._server = None
+        self.stats = {}
+        self.reset_stats()
+
+    def reset_stats(self):
+        with self._lock:
+            self.stats = {"api": 0, "graphql": 0, "not_modified": 0, "asset": 0, "errors": 0, "corrupted": 0, "bytes": 0}
+
+    def _count(self, key, amount=1):
+        with self._lock:
+            self.stats[key] += amount
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def add_release(self, repo, tag, assets, updated_at="2024-01-01T00:00:00Z", prerelease=False):
+        """
+        Publish a release; unless it is a pre-release, it becomes the repo's latest release.
+
+        :param assets: Dict mapping asset names to their bytes.
+        """
+        release_assets = []
+        for name, data in assets.items():
+            path = f"/assets/{repo}/{tag}/{name}"
+            self._assets[path] = data
+            release_assets.append(
+                {
+                    "id": int(hashlib.sha256(f"{repo}/{tag}/{name}".encode()).hexdigest()[:8], 16),
+                    "name": name,
+                    "size": len(data),
+                    "updated_at": updated_at,
+                    "digest": f"sha256:{hashlib.sha256(data).hexdigest()}",
+                    "browser_download_url": quote(path),
+                }
+            )
+        releases = self._releases.setdefault(repo, [])
+        releases.insert(0, {"tag_name": tag, "prerelease": prerelease, "draft": False, "assets": release_assets})
+
+    def _latest(self, repo):
+        return next((release for release in self._releases.get(repo, []) if not release["prerelease"]), None)
+
+    def _release_json(self, release):
+        assets = [dict(asset, browser_download_url=self.base_url + asset["browser_download_url"])
+                  for asset in release["assets"]]
+        return dict(release, assets=assets)
+
+    def _graphql_release(self, repo):
+        release = self._latest(repo)
+        if release is None:
+            return None
+        assets = self._release_json(release)["assets"]
+        return {
+            "latestRelease": {
+                "tagName": release["tag_name"],
+                "releaseAssets": {
+                    "pageInfo": {"hasNextPage": False},
+                    "nodes": [
+                        {
+                            "databaseId": asset["id"],
+                            "name": asset["name"],
+                            "size": asset["size"],
+                            "updatedAt": asset["updated_at"],
+                            "downloadUrl": asset["browser_download_url"],
+                            "digest": asset["digest"],
+                        }
+                        for asset in assets
+                    ],
+                },
+            }
+        }
+
+    def _should_fail(self):
+        with self._lock:
+            return self.error_rate > 0 and self._random.random() < self.error_rate
+
+    def _should_corrupt(self):
+        with self._lock:
+            return self.corrupt_rate > 0 and self._random.random() < self.corrupt_rate
+
+    def _make_handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status, body=b"", headers=None):
+                self.send_response(status)
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                if body:
+                    self.wfile.write(body)
+
+            def _send_json(self, data, headers=None):
+                self._send(200, json.dumps(data).encode(), dict(headers or {}, **{"Content-Type": "application/json"}))
+
+            def _begin(self):
+                if fake.latency:
+                    time.sleep(fake.latency)
+                if fake._should_fail():
+                    fake._count("errors")
+                    headers = {} if fake.retry_after is None else {"Retry-After": str(fake.retry_after)}
+                    self._send(fake.error_status, b"injected error", headers)
+                    return False
+                return True
+
+            def do_GET(self):
+                path = unquote(urlparse(self.path).path)
+                if path.startswith("/repos/") and "/releases" in path:
+                    repo, _, release_path = path[len("/repos/"):].partition("/releases")
+                    self._releases(repo, release_path)
+                elif path in fake._assets:
+                    self._asset(path)
+                else:
+                    self._send(404, b'{"message": "Not Found"}')
+
+            def do_POST(self):
+                if urlparse(self.path).path != "/graphql":
+                    self._send(404, b'{"message": "Not Found"}')
+                    return
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                fake._count("graphql")
+                if not self._begin():
+                    return
+                variables = json.loads(body).get("variables", {})
+                data = {}
+                index = 0
+                while f"owner{index}" in variables:
+                    repo = f"{variables[f'owner{index}']}/{variables[f'name{index}']}"
+                    data[f"r{index}"] = fake._graphql_release(repo)
+                    index += 1
+                self._send_json({"data": data})
+
+            def _releases(self, repo, release_path):
+                fake._count("api")
+                if not self._begin():
+                    return
+                releases = fake._releases.get(repo, [])
+                if release_path == "":
+                    data = [fake._release_json(release) for release in releases]
+                elif release_path == "/latest":
+                    latest = fake._latest(repo)
+                    data = fake._release_json(latest) if latest else None
+                elif release_path.startswith("/tags/"):
+                    tag = release_path[len("/tags/"):]
+                    data = next((fake._release_json(r) for r in releases if r["tag_name"] == tag), None)
+                else:
+                    data = None
+                if data is None:
+                    self._send(404, b'{"message": "Not Found"}')
+                    return
+                body = json.dumps(data).encode()
+                etag = '"%s"' % hashlib.sha256(body).hexdigest()[:32]
+                if self.headers.get("If-None-Match") == etag:
+                    fake._count("not_modified")
+                    self._send(304, headers={"ETag": etag})
+                    return
+                self._send(200, body, {"ETag": etag, "Content-Type": "application/json"})
+
+            def _asset(self, path):
+                fake._count("asset")
+                if not self._begin():
+                    return
+                data = fake._assets[path]
+                if data and fake._should_corrupt():
+                    fake._count("corrupted")
+                    data = bytes([data[0] ^ 0xFF]) + data[1:]
+                start, end = 0, len(data) - 1
+                status = 200
+                range_header = self.headers.get("Range")
+                if range_header and range_header.startswith("bytes="):
+                    first, _, last = range_header[len("bytes="):].partition("-")
+                    start = int(first)
+                    end = min(int(last), len(data) - 1) if last else len(data) - 1
+                    status = 206
+                    if start >= len(data):
+                        self.send_response(416)
+                        self.send_header("Content-Range", f"bytes */{len(data)}")
+                        self.send_header("Content-Length", "0")
+                        self.end_headers()
+                        return
+                self.send_response(status)
+                self.send_header("Accept-Ranges", "bytes")
+                self.send_header("Content-Length", str(end + 1 - start))
+                if status == 206:
+                    self.send_header("Content-Range", f"bytes {start}-{end}/{len(data)}")
+                self.end_headers()
+                try:
+                    for offset in range(start, end + 1, WRITE_CHUNK_SIZE):
+                        chunk = data[offset:min(offset + WRITE_CHUNK_SIZE, end + 1)]
+                        self.wfile.write(chunk)
+                        fake._count("bytes", len(chunk))
+                        if fake.bandwidth:
+                            time.sleep(len(chunk) / fake.bandwidth)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+        return Handler
+
+    def start(self):
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._make_handler())
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="fake-github", daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
@@ -0,0 +1,104 @@
+import io
+import random
+import zipfile
+
+import py7zr
+
+KIB = 1024
+
+
+def _payload(rng, size, compressible=0.5):
+    """Return size bytes where roughly the given fraction compresses well, like real firmware files."""
+    repeated = int(size * compressible)
+    pattern = bytes(rng.getrandbits(8) for _ in range(64))
+    data = (pattern * (repeated // 64 + 1))[:repeated]
+    return data + rng.randbytes(size - repeated)
+
+
+def _zip(files):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, data in files.items():
+            archive.writestr(name, data)
+    return buffer.getvalue()
+
+
+def _7z(files):
+    buffer = io.BytesIO()
+    with py7zr.SevenZipFile(buffer, "w") as archive:
+        for name, data in files.items():
+            archive.writef(io.BytesIO(data), name)
+    return buffer.getvalue()
+
+
+def atmosphere_files(rng, scale=1):
+    files = {
+        "atmosphere/package3": _payload(rng, 900 * KIB * scale),
+        "atmosphere/stratosphere.romfs": _payload(rng, 1600 * KIB * scale),
+        "atmosphere/config_templates/system_settings.ini": _payload(rng, 12 * KIB, 0.9),
+        "atmosphere/config_templates/override_config.ini": _payload(rng, 4 * KIB, 0.9),
+        "atmosphere/hbl.nsp": _payload(rng, 120 * KIB * scale),
+        "atmosphere/reboot_payload.bin": _payload(rng, 128 * KIB),
+        "switch/daybreak.nro": _payload(rng, 600 * KIB * scale),
+        "switch/reboot_to_payload.nro": _payload(rng, 140 * KIB),
+        "hbmenu.nro": _payload(rng, 400 * KIB),
+    }
+    for index in range(6 * scale):
+        title_id = f"0100000000000{index:03X}"
+        files[f"atmosphere/contents/{title_id}/exefs.nsp"] = _payload(rng, 96 * KIB)
+        files[f"atmosphere/contents/{title_id}/flags/boot2.flag"] = b""
+    return files
+
+
+def hekate_files(rng, scale=1):
+    files = {
+        "hekate_ctcaer_6.2.0.bin": _payload(rng, 200 * KIB),
+        "bootloader/update.bin": _payload(rng, 200 * KIB),
+        "bootloader/sys/nyx.bin": _payload(rng, 700 * KIB * scale),
+        "bootloader/sys/libsys_lp0.bso": _payload(rng, 20 * KIB),
+        "bootloader/sys/res.pak": _payload(rng, 900 * KIB * scale),
+        "bootloader/res/icon_payload.bmp": _payload(rng, 50 * KIB, 0.8),
+        "bootloader/res/icon_switch.bmp": _payload(rng, 50 * KIB, 0.8),
+        "bootloader/hekate_ipl.ini": _payload(rng, 2 * KIB, 0.9),
+    }
+    for index in range(10 * scale):
+        files[f"bootloader/payloads/payload_{index}.bin"] = _payload(rng, 40 * KIB)
+    return files
+
+
+def sysmodule_files(rng, scale=1):
+    return {
+        "atmosphere/contents/00FF0000636C6BFF/exefs.nsp": _payload(rng, 300 * KIB * scale),
+        "atmosphere/contents/00FF0000636C6BFF/toolbox.json": _payload(rng, 1 * KIB, 0.9),
+        "atmosphere/contents/00FF0000636C6BFF/flags/boot2.flag": b"",
+        "switch/.overlays/sys-clk-overlay.ovl": _payload(rng, 250 * KIB),
+        "config/sys-clk/config.ini": _payload(rng, 2 * KIB, 0.9),
+    }
+
+
+def homebrew_app_files(rng, scale=1):
+    # No recognised folder, so the updater places it under switch/<archive name>.
+    return {
+        "HomebrewApp.nro": _payload(rng, 1500 * KIB * scale),
+        "data/assets.pak": _payload(rng, 800 * KIB * scale),
+    }
+
+
+def build_release_packs(scale=1, seed=0):
+    """
+    Build release assets shaped like common Switch homebrew releases.
+
+    :param scale: Multiplies the size of the large files inside each pack.
+    :return: Dict mapping repo names to {asset name: bytes}.
+    """
+    rng = random.Random(seed)
+    return {
+        "Atmosphere-NX/Atmosphere": {"atmosphere-1.7.0-master.zip": _zip(atmosphere_files(rng, scale))},
+        "CTCaer/hekate": {"hekate_ctcaer_6.2.0_Nyx_1.6.0.zip": _zip(hekate_files(rng, scale))},
+        "retronx-team/sys-clk": {"sys-clk-2.0.7z": _7z(sysmodule_files(rng, scale))},
+        "example/HomebrewApp": {"HomebrewApp.7z": _7z(homebrew_app_files(rng, scale))},
+        "example/loose": {
+            "Tool.nro": _payload(rng, 700 * KIB * scale),
+            "ovlmenu.ovl": _payload(rng, 150 * KIB),
+        },
+    }
@@ -0,0 +1,310 @@
+# Offline benchmarks: python -m benchmarks.run_benchmarks [--scale N] [--output results.json] [--compare baseline.json]
+import argparse
+import contextlib
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+from actions import metrics
+from actions.config import DOWNLOADS_DIR_NAME, GITHUB_API_URL_ENV, GITHUB_GRAPHQL_URL_ENV
+from actions.download import start_download
+from actions.process_downloads import (
+    CONFLICT_OVERWRITE,
+    extract_archives,
+    extract_archives_in_place,
+    process_downloads,
+)
+from actions.release_cache import ReleaseCache
+from actions.repo_entry import RepoEntry
+from actions.routing import load_routing_rules
+from benchmarks.fake_github import FakeGitHub
+from benchmarks.packs import build_release_packs
+
+# A timing regresses when it is this much slower than the baseline.
+DEFAULT_TOLERANCE = 0.25
+
+
+@contextlib.contextmanager
+def _quiet(enabled):
+    if not enabled:
+        yield
+        return
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull), contextlib.redirect_stderr(devnull):
+        yield
+
+
+def _median_seconds(func, repeat, setup=None):
+    timings = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def _reset_dir(path):
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path)
+
+
+def bench_download(server, entries, work_dir, repeat, segments):
+    downloads_dir = os.path.join(work_dir, DOWNLOADS_DIR_NAME)
+    cache_path = os.path.join(work_dir, "release_cache.json")
+
+    def setup():
+        _reset_dir(downloads_dir)
+        server.reset_stats()
+
+    def run():
+        start_download(
+            entries,
+            output_dir=downloads_dir,
+            segments=segments,
+            use_graphql=False,
+            release_cache=ReleaseCache(cache_path, ttl_seconds=0),
+            use_store=False,
+        )
+
+    seconds = _median_seconds(run, repeat, setup)
+    transferred = server.stats["bytes"]
+    return {
+        "seconds": round(seconds, 4),
+        "bytes": transferred,
+        "mib_per_second": round(transferred / seconds / (1024 * 1024), 2) if seconds else None,
+        "segments": segments,
+    }
+
+
+def bench_lookups(server, entries, work_dir):
+    """Count API requests for cold, fresh-cache, revalidated and GraphQL lookups of an up-to-date Downloads."""
+    downloads_dir = os.path.join(work_dir, DOWNLOADS_DIR_NAME)
+    cache_path = os.path.join(work_dir, "lookup_cache.json")
+    if os.path.exists(cache_path):
+        os.remove(cache_path)
+
+    def count(**kwargs):
+        server.reset_stats()
+        started = time.perf_counter()
+        start_download(entries, output_dir=downloads_dir, use_store=False, **kwargs)
+        stats = dict(server.stats)
+        return {
+            "seconds": round(time.perf_counter() - started, 4),
+            "api": stats["api"],
+            "not_modified": stats["not_modified"],
+            "graphql": stats["graphql"],
+            "asset": stats["asset"],
+        }
+
+    return {
+        "cold": count(use_graphql=False, release_cache=ReleaseCache(cache_path)),
+        "fresh_cache": count(use_graphql=False, release_cache=ReleaseCache(cache_path)),
+        "revalidated": count(use_graphql=False, release_cache=ReleaseCache(cache_path, ttl_seconds=0)),
+        "graphql": count(github_token="benchmark", use_cache=False),
+    }
+
+
+def bench_extraction(downloads_dir, work_dir, repeat):
+    archives = sorted(
+        os.path.join(downloads_dir, name)
+        for name in os.listdir(downloads_dir)
+        if name.lower().endswith((".zip", ".7z"))
+    )
+    processing_dir = os.path.join(work_dir, "Processing")
+    output_dir = os.path.join(work_dir, "ExtractOutput")
+    rules = load_routing_rules()
+    staged = _median_seconds(
+        lambda: extract_archives(archives, processing_dir), repeat, lambda: _reset_dir(processing_dir)
+    )
+    in_place = _median_seconds(
+        lambda: extract_archives_in_place(archives, output_dir, rules), repeat, lambda: _reset_dir(output_dir)
+    )
+    shutil.rmtree(processing_dir, ignore_errors=True)
+    shutil.rmtree(output_dir, ignore_errors=True)
+    return {
+        "archives": len(archives),
+        "archive_bytes": sum(os.path.getsize(path) for path in archives),
+        "staged_seconds": round(staged, 4),
+        "in_place_seconds": round(in_place, 4),
+    }
+
+
+def _process_run(work_dir, extract_in_place):
+    metrics.start_run("benchmark")
+    try:
+        process_downloads(extract_in_place=extract_in_place, on_conflict=CONFLICT_OVERWRITE, base_dir=work_dir)
+    finally:
+        report = metrics.current_run().report()
+        metrics.finish_run(os.path.join(work_dir, "run_report.json"))
+    return report
+
+
+def bench_process(work_dir, repeat):
+    """Time full processing into an empty Output, and a second run where every file is unchanged."""
+    output_dir = os.path.join(work_dir, "Output")
+    results = {}
+    for label, extract_in_place in (("in_place", True), ("staged", False)):
+        cold = []
+        for _ in range(repeat):
+            _reset_dir(output_dir)
+            if os.path.exists(f"{output_dir}.index.json"):
+                os.remove(f"{output_dir}.index.json")
+            cold.append(_process_run(work_dir, extract_in_place))
+        unchanged = _process_run(work_dir, extract_in_place)
+        median_run = sorted(cold, key=lambda report: report["wall_seconds"])[len(cold) // 2]
+        results[label] = {
+            "seconds": median_run["wall_seconds"],
+            "stages": {name: stage["seconds"] for name, stage in median_run["stages"].items()},
+            "files_written": sum(stage["files"] for stage in median_run["stages"].values()),
+            "unchanged_rerun_seconds": unchanged["wall_seconds"],
+        }
+    return results
+
+
+def run_benchmarks(
+    scale=1, repeat=3, segments=1, latency=0.0, bandwidth=None, error_rate=0.0, corrupt_rate=0.0, verbose=False
+):
+    """
+    Run every benchmark against a local FakeGitHub in a temporary folder.
+
+    :return: Dict of results, keyed by benchmark.
+    """
+    packs = build_release_packs(scale)
+    entries = [RepoEntry(repo) for repo in packs]
+    work_dir = tempfile.mkdtemp(prefix="switch-updater-bench-")
+    previous_env = {key: os.environ.get(key) for key in (GITHUB_API_URL_ENV, GITHUB_GRAPHQL_URL_ENV)}
+    try:
+        with FakeGitHub(
+            latency=latency, bandwidth=bandwidth, error_rate=error_rate, corrupt_rate=corrupt_rate
+        ) as server:
+            os.environ[GITHUB_API_URL_ENV] = server.base_url
+            os.environ.pop(GITHUB_GRAPHQL_URL_ENV, None)
+            for repo, assets in packs.items():
+                server.add_release(repo, "v1.0.0", assets)
+
+            results = {"settings": {"scale": scale, "repeat": repeat, "latency": latency,
+                                    "bandwidth": bandwidth, "error_rate": error_rate,
+                                    "corrupt_rate": corrupt_rate}}
+            with _quiet(not verbose):
+                results["download"] = bench_download(server, entries, work_dir, repeat, segments)
+                results["lookups"] = bench_lookups(server, entries, work_dir)
+                results["extraction"] = bench_extraction(os.path.join(work_dir, DOWNLOADS_DIR_NAME), work_dir, repeat)
+                results["process"] = bench_process(work_dir, repeat)
+    finally:
+        for key, value in previous_env.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return results
+
+
+def _timings(results, prefix=""):
+    """Flatten every "...seconds" value of a result dict into {"path.to.key": seconds}."""
+    timings = {}
+    for key, value in results.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            timings.update(_timings(value, f"{path}."))
+        elif key.endswith("seconds") and isinstance(value, (int, float)):
+            timings[path] = value
+    return timings
+
+
+def compare_results(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """
+    Return a description of every regression against a baseline result file.
+
+    Timings regress when they are more than tolerance slower; lookup counts regress when they grow.
+    """
+    regressions = []
+    current = _timings(results)
+    for path, old in _timings(baseline).items():
+        new = current.get(path)
+        if new is not None and old > 0 and new > old * (1 + tolerance):
+            regressions.append(f"{path}: {old:.4f}s -> {new:.4f}s")
+    for scenario, counts in baseline.get("lookups", {}).items():
+        for key in ("api", "graphql", "asset"):
+            old = counts.get(key)
+            new = results.get("lookups", {}).get(scenario, {}).get(key)
+            if old is not None and new is not None and new > old:
+                regressions.append(f"lookups.{scenario}.{key}: {old} -> {new} requests")
+    return regressions
+
+
+def format_results(results):
+    download = results["download"]
+    extraction = results["extraction"]
+    lines = [
+        f"Download: {download['bytes'] / (1024 * 1024):.1f} MiB in {download['seconds']:.3f}s "
+        f"({download['mib_per_second']} MiB/s, {download['segments']} segment(s))",
+        "Lookups (api / 304 / graphql / asset requests):",
+    ]
+    for scenario, counts in results["lookups"].items():
+        lines.append(
+            f"  {scenario:<12} {counts['api']:>3} / {counts['not_modified']:>3} / {counts['graphql']:>3} / "
+            f"{counts['asset']:>3}  {counts['seconds']:.3f}s"
+        )
+    lines.append(
+        f"Extraction of {extraction['archives']} archives ({extraction['archive_bytes'] / (1024 * 1024):.1f} MiB): "
+        f"staged {extraction['staged_seconds']:.3f}s, in place {extraction['in_place_seconds']:.3f}s"
+    )
+    for label, run in results["process"].items():
+        stages = ", ".join(f"{name} {seconds:.3f}s" for name, seconds in run["stages"].items())
+        lines.append(
+            f"Process ({label}): {run['seconds']:.3f}s for {run['files_written']} files [{stages}]; "
+            f"unchanged rerun {run['unchanged_rerun_seconds']:.3f}s"
+        )
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark downloads and processing against a local fake GitHub.")
+    parser.add_argument("--scale", type=int, default=1, help="Size multiplier for the generated release packs.")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per timing; the median is reported.")
+    parser.add_argument("--segments", type=int, default=1, help="Parallel range requests per large asset.")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds of latency added to every response.")
+    parser.add_argument("--bandwidth", type=float, help="Per-response bandwidth cap in MiB/s.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with a 503.")
+    parser.add_argument("--corrupt-rate", type=float, default=0.0,
+                        help="Fraction of asset downloads sent with a corrupted byte.")
+    parser.add_argument("--output", help="Write the results to this JSON file.")
+    parser.add_argument("--compare", help="Baseline JSON file; exit with 1 if anything regressed.")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help=f"Allowed slowdown against the baseline (default: {DEFAULT_TOLERANCE}).")
+    parser.add_argument("--verbose", action="store_true", help="Show the updater's own output.")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(
+        scale=args.scale,
+        repeat=max(1, args.repeat),
+        segments=args.segments,
+        latency=args.latency,
+        bandwidth=args.bandwidth * 1024 * 1024 if args.bandwidth else None,
+        error_rate=args.error_rate,
+        corrupt_rate=args.corrupt_rate,
+        verbose=args.verbose,
+    )
+    print(format_results(results))
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(results, output_file, indent=2)
+
+    if args.compare:
+        with open(args.compare, "r") as baseline_file:
+            regressions = compare_results(results, json.load(baseline_file), args.tolerance)
+        if regressions:
+            print("Regressions:\n  " + "\n  ".join(regressions))
+            return 1
+        print("No regressions against the baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,254 @@
+# Headless entry point: the same actions as the GUI, without Tkinter, printing JSON results
+import argparse
+import contextlib
+import json
+import os
+import sys
+
+from actions import metrics
+from actions.cleanup import purge_workspace_tombstones, wait_for_cleanup
+from actions.config import ConfigError, DOWNLOADS_DIR_NAME, get_project_root, load_config
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_USAGE = 2
+
+
+def _load_github_token(token=None):
+    """Return the token given on the command line, or GITHUB_TOKEN from the environment or .env."""
+    if token:
+        return token
+    env_path = os.path.join(get_project_root(), ".env")
+    if os.path.exists(env_path):
+        from dotenv import load_dotenv
+
+        load_dotenv(env_path)
+    token = os.getenv("GITHUB_TOKEN")
+    return None if token in (None, "", "None") else token
+
+
+def _select_entries(config_file, repos):
+    entries = load_config(config_file)
+    if not repos:
+        return entries
+    wanted = {repo.lower() for repo in repos}
+    return [entry for entry in entries if entry.repo.lower() in wanted or entry.release_key.lower() in wanted]
+
+
+def _summarize_extraction(result):
+    """Drop the per-member hash maps from an extraction result."""
+    summary = {key: value for key, value in result.items() if key not in ("written", "pending")}
+    summary["files"] = len(result.get("written", {})) + len(result.get("pending", {}))
+    return summary
+
+
+def _downloads_failed(results):
+    return any(
+        result["status"] == "error" or any(asset["status"] == "failed" for asset in result["assets"])
+        for result in results
+    )
+
+
+def run_download(args):
+    try:
+        entries = _select_entries(args.config, args.repos)
+    except ConfigError as error:
+        return {"error": str(error)}, EXIT_USAGE
+    if not entries:
+        return {"error": "No matching entries in config file."}, EXIT_USAGE
+
+    token = _load_github_token(args.token)
+    if args.process:
+        from actions.pipeline import download_and_process
+
+        results, extraction_results = download_and_process(entries, token, on_conflict=args.on_conflict)
+        output = {"downloads": results, "extractions": [_summarize_extraction(r) for r in extraction_results]}
+        failed = _downloads_failed(results) or any(r["status"] == "failed" for r in extraction_results)
+    else:
+        from actions.download import start_download
+
+        results = start_download(
+            entries,
+            token,
+            output_dir=os.path.join(get_project_root(), DOWNLOADS_DIR_NAME),
+            use_cache=not args.no_cache,
+            segments=args.segments,
+            use_graphql=not args.no_graphql,
+            use_store=not args.no_store,
+        )
+        output = {"downloads": results}
+        failed = _downloads_failed(results)
+    return output, EXIT_FAILED if failed else EXIT_OK
+
+
+def run_process(args):
+    from actions.process_downloads import preview_processing, process_downloads
+
+    if args.dry_run:
+        try:
+            return {"plan": preview_processing()}, EXIT_OK
+        except ValueError as error:
+            return {"error": f"Could not load routing rules: {error}"}, EXIT_FAILED
+
+    try:
+        result = process_downloads(extract_in_place=not args.staged, on_conflict=args.on_conflict)
+    except ValueError as error:
+        return {"error": f"Could not load routing rules: {error}"}, EXIT_FAILED
+    if result is None:
+        return {"extractions": [], "output_changes": None, "message": "No downloads to process."}, EXIT_OK
+
+    extractions = [_summarize_extraction(r) for r in result["extraction_results"]]
+    failed = any(r["status"] == "failed" for r in extractions)
+    return {"extractions": extractions, "output_changes": result["output_changes"]}, EXIT_FAILED if failed else EXIT_OK
+
+
+def run_clear(args):
+    output = {}
+    if args.downloads or not (args.release_cache or args.store):
+        from actions.clear_downloads import clear_downloads_contents
+
+        output["downloads_cleared"] = clear_downloads_contents(show_message=False)
+    if args.release_cache:
+        from actions.release_cache import clear_release_cache
+
+        clear_release_cache()
+        output["release_cache_cleared"] = True
+    if args.store:
+        from actions.asset_store import clear_asset_store
+
+        clear_asset_store()
+        output["asset_store_cleared"] = True
+    return output, EXIT_OK
+
+
+def run_build(args):
+    from actions.profiles import build_profiles, load_profiles
+
+    try:
+        profiles = load_profiles(args.profiles_file)
+    except ValueError as error:
+        return {"error": str(error)}, EXIT_USAGE
+    if args.names:
+        wanted = set(args.names)
+        unknown = wanted - {profile["name"] for profile in profiles}
+        if unknown:
+            return {"error": f"Unknown profile(s): {', '.join(sorted(unknown))}."}, EXIT_USAGE
+        profiles = [profile for profile in profiles if profile["name"] in wanted]
+    if not profiles:
+        return {"error": f"No profiles defined in {args.profiles_file}."}, EXIT_USAGE
+
+    result = build_profiles(
+        profiles,
+        _load_github_token(args.token),
+        on_conflict=args.on_conflict,
+        max_parallel=args.parallel,
+    )
+    builds = {
+        name: dict(
+            {key: value for key, value in build.items() if key != "extraction_results"},
+            extractions=[_summarize_extraction(r) for r in build.get("extraction_results", [])],
+        )
+        for name, build in result["builds"].items()
+    }
+    failed = _downloads_failed(result["downloads"]) or any(
+        build["status"] != "done" or any(r["status"] == "failed" for r in build["extractions"])
+        for build in builds.values()
+    )
+    return {"downloads": result["downloads"], "builds": builds}, EXIT_FAILED if failed else EXIT_OK
+
+
+def run_sync(args):
+    from actions.sd_sync import sync_output_to_target
+
+    source_dir = os.path.abspath(args.source or os.path.join(get_project_root(), "Output"))
+    if not os.path.isdir(source_dir):
+        return {"error": f"Source folder '{source_dir}' does not exist."}, EXIT_USAGE
+    report = sync_output_to_target(
+        source_dir,
+        os.path.abspath(args.target),
+        delete_stale=args.delete_stale,
+        max_workers=args.workers,
+        dry_run=args.dry_run,
+    )
+    return report, EXIT_FAILED if report["errors"] else EXIT_OK
+
+
+def build_parser():
+    from actions.process_downloads import CONFLICT_OVERWRITE, CONFLICT_SKIP
+    from actions.sd_sync import SYNC_WORKERS
+
+    parser = argparse.ArgumentParser(
+        description="Download and organize Nintendo Switch homebrew releases without the GUI.",
+    )
+    parser.add_argument("--report", help="Where to write the JSON run report (default: .cache/run_report.json).")
+    parser.add_argument("--profile", action="append", default=[], choices=metrics.STAGES, metavar="STAGE",
+                        help="Run a stage under cProfile (repeatable): " + ", ".join(metrics.STAGES) + ".")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    download = subparsers.add_parser("download", help="Download the latest release assets of configured repos.")
+    download.add_argument("repos", nargs="*", help="Only download these repos (default: every config entry).")
+    download.add_argument("--config", default="config.txt", help="Config file (default: config.txt).")
+    download.add_argument("--token", help="GitHub token (default: GITHUB_TOKEN from the environment or .env).")
+    download.add_argument("--segments", type=int, default=1, metavar="N",
+                          help="Parallel range requests per asset of 32 MB or more (default: 1).")
+    download.add_argument("--no-cache", action="store_true", help="Ignore cached release metadata.")
+    download.add_argument("--no-store", action="store_true", help="Download even assets held in the asset store.")
+    download.add_argument("--no-graphql", action="store_true", help="Look up releases with REST calls only.")
+    download.add_argument("--process", action="store_true", help="Process each asset as soon as it is downloaded.")
+    download.add_argument("--on-conflict", choices=(CONFLICT_OVERWRITE, CONFLICT_SKIP), default=CONFLICT_SKIP,
+                          help="What to do with changed files that already exist in Output (with --process).")
+    download.set_defaults(func=run_download)
+
+    process = subparsers.add_parser("process", help="Route Downloads into Output.")
+    process.add_argument("--staged", action="store_true", help="Extract archives into Processing first.")
+    process.add_argument("--on-conflict", choices=(CONFLICT_OVERWRITE, CONFLICT_SKIP), default=CONFLICT_SKIP,
+                         help="What to do with changed files that already exist in Output (default: skip).")
+    process.add_argument("--dry-run", action="store_true", help="Only list where every file would go.")
+    process.set_defaults(func=run_process)
+
+    clear = subparsers.add_parser("clear", help="Clear Downloads, the release cache and/or the asset store.")
+    clear.add_argument("--downloads", action="store_true", help="Clear Downloads (the default).")
+    clear.add_argument("--release-cache", action="store_true", help="Clear cached release metadata.")
+    clear.add_argument("--store", action="store_true", help="Remove every stored release asset.")
+    clear.set_defaults(func=run_clear)
+
+    build = subparsers.add_parser("build", help="Download once for every profile in profiles.ini and build each Output.")
+    build.add_argument("names", nargs="*", help="Only build these profiles (default: all of them).")
+    build.add_argument("--profiles-file", default="profiles.ini", help="Profiles file (default: profiles.ini).")
+    build.add_argument("--token", help="GitHub token (default: GITHUB_TOKEN from the environment or .env).")
+    build.add_argument("--parallel", type=int, metavar="N", help="Profiles built at once (default: all, up to the CPU count).")
+    build.add_argument("--on-conflict", choices=(CONFLICT_OVERWRITE, CONFLICT_SKIP), default=CONFLICT_OVERWRITE,
+                       help="What to do with changed files already in a profile's Output (default: overwrite).")
+    build.set_defaults(func=run_build)
+
+    sync = subparsers.add_parser("sync", help="Copy new or changed Output files to an SD card.")
+    sync.add_argument("target", help="Mounted SD card root or target folder.")
+    sync.add_argument("--source", help="Folder to sync from (default: Output).")
+    sync.add_argument("--delete-stale", action="store_true", help="Remove files an earlier sync placed that are gone.")
+    sync.add_argument("--dry-run", action="store_true", help="Only report what would change.")
+    sync.add_argument("--workers", type=int, default=SYNC_WORKERS, help=f"Parallel copy workers (default: {SYNC_WORKERS}).")
+    sync.set_defaults(func=run_sync)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    # Progress messages go to stderr so stdout only carries the JSON result.
+    with contextlib.redirect_stdout(sys.stderr):
+        metrics.start_run(args.command, args.profile)
+        purge_workspace_tombstones()
+        try:
+            output, exit_code = args.func(args)
+        finally:
+            report_path = metrics.finish_run(args.report)
+            # Folders discarded during the run are deleted in the background; finish before exiting.
+            wait_for_cleanup()
+
+    json.dump(dict(output, command=args.command, ok=exit_code == EXIT_OK, report=report_path), sys.stdout, indent=2)
+    sys.stdout.write("\n")
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())